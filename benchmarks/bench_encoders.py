@@ -0,0 +1,91 @@
+# benchmarks/bench_encoders.py
+"""
+Encoder throughput benchmark: how many frames/s each recorder codec can encode
+on this machine and how many bytes/s it writes, using synthetic frames.
+
+    python benchmarks/bench_encoders.py [--size 640x480] [--seconds 3] [--fps 20]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from recorder import CODECS, open_video_writer
+
+
+def synthetic_frames(w, h, count=60, seed=0):
+    """Moving gradient plus sensor-like noise: closer to a camera than flat colour."""
+    rng = np.random.default_rng(seed)
+    xs = np.linspace(0, 255, w, dtype=np.float32)
+    ys = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    frames = []
+    for i in range(count):
+        base = (xs[None, :] * 0.6 + ys * 0.4 + i * 4) % 256
+        frame = np.dstack([base, np.roll(base, i * 3, axis=1), 255 - base])
+        frame += rng.normal(0, 6, frame.shape).astype(np.float32)
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def bench_codec(codec, frames, fps, seconds, out_dir):
+    h, w = frames[0].shape[:2]
+    writer, path = open_video_writer(os.path.join(out_dir, f"bench_{codec}"), codec, fps, (w, h))
+    if writer is None:
+        return {"codec": codec, "available": False}
+    written = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        writer.write(frames[written % len(frames)])
+        written += 1
+    writer.release()
+    elapsed = time.perf_counter() - t0
+    size = os.path.getsize(path)
+    # bytes/s at the recording rate, i.e. disk usage per second of footage
+    video_seconds = written / fps
+    return {
+        "codec": codec,
+        "available": True,
+        "encode_fps": written / elapsed,
+        "bytes_per_sec": size / video_seconds if video_seconds else 0,
+        "realtime_cameras": (written / elapsed) / fps,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--size", default="640x480")
+    ap.add_argument("--seconds", type=float, default=3.0, help="encode time per codec")
+    ap.add_argument("--fps", type=float, default=20.0, help="recording frame rate")
+    ap.add_argument("--codecs", default=",".join(CODECS), help="comma separated subset of recorder.CODECS")
+    args = ap.parse_args(argv)
+    w, h = (int(v) for v in args.size.split("x"))
+
+    frames = synthetic_frames(w, h)
+    out_dir = tempfile.mkdtemp(prefix="solosight_enc_")
+    results = []
+    try:
+        print(f"{w}x{h} synthetic frames, {args.seconds:.0f}s per codec, recording at {args.fps:g} fps")
+        for codec in args.codecs.split(","):
+            r = bench_codec(codec.strip(), frames, args.fps, args.seconds, out_dir)
+            results.append(r)
+            if not r["available"]:
+                print(f"  {codec:5s} not available on this machine")
+                continue
+            print(
+                f"  {codec:5s} {r['encode_fps']:7.1f} frames/s  "
+                f"{r['bytes_per_sec'] / 1e6:6.2f} MB/s of footage  "
+                f"~{r['realtime_cameras']:4.1f} cameras in real time"
+            )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+if __name__ == "__main__":
+    main()
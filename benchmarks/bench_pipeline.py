@@ -0,0 +1,222 @@
+# benchmarks/bench_pipeline.py
+"""
+Whole-pipeline benchmark with simulated cameras: capture threads, tile
+painting (grab_frame), and optionally recording, for 1-8 cameras on offscreen Qt.
+
+Reports per run: capture and paint rates, read/render/encode latency
+percentiles, drops, CPU use and resident memory. Results are saved as JSON
+under benchmarks/results/ (tagged with version.VERSION) so releases can be
+compared with --compare.
+
+    python benchmarks/bench_pipeline.py [--cameras 1,2,4,8] [--seconds 5] [--size 640x480] [--fps 30]
+                                        [--record] [--source synthetic|file:clip.mp4] [--compare OLD.json]
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication
+
+from camera_manager import CameraWidget
+from metrics import MetricsRegistry
+from settings_manager import DEFAULT_SETTINGS
+import version
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# (key, higher is better) compared by --compare
+COMPARED = (
+    ("capture_fps", True),
+    ("paint_fps", True),
+    ("read_p95_ms", False),
+    ("render_p95_ms", False),
+    ("encode_p95_ms", False),
+    ("cpu_percent", False),
+    ("rss_mb", False),
+)
+
+
+def rss_mb():
+    """Resident memory of this process in MB, or None if it can't be read here."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def spin(app, seconds):
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec_()
+
+
+def counters(widgets):
+    out = []
+    for cw in widgets:
+        stats = cw.worker.stats()
+        tile = stats["subscribers"].get("tile", {})
+        rec = cw.recorder.stats() if cw.recorder else {}
+        out.append({
+            "captured": stats["frames_captured"],
+            "painted": tile.get("delivered", 0) - tile.get("dropped", 0),
+            "written": rec.get("frames_written", 0),
+            "rec_dropped": rec.get("frames_dropped", 0),
+            "pool_misses": stats.get("pool", {}).get("misses", 0),
+        })
+    return out
+
+
+def run(app, n, args, out_dir):
+    w, h = (int(v) for v in args.size.split("x"))
+    spec = f"synthetic:{w}x{h}@{args.fps:g}" if args.source == "synthetic" else f"{args.source}@{args.fps:g}"
+    settings = dict(DEFAULT_SETTINGS)
+    settings["frame_sources"] = {str(i): spec for i in range(n)}
+    settings["default_capture_profile"] = {"fourcc": "", "width": 0, "height": 0, "fps": 0, "buffer_size": 0}
+    settings["prebuffer_seconds"] = args.prebuffer
+    registry = MetricsRegistry()
+    widgets = [CameraWidget(i, f"Cam {i}", settings, metrics=registry.camera(i)) for i in range(n)]
+    for cw in widgets:
+        if not cw.open():
+            raise RuntimeError(f"could not open simulated camera {cw.cam_index}: {spec}")
+        if args.record:
+            cw.start_recording(out_dir, 5, 60)
+    rss0 = rss_mb()
+    try:
+        spin(app, args.warmup)
+        before, cpu0, t0 = counters(widgets), time.process_time(), time.monotonic()
+        spin(app, args.seconds)
+        after, cpu1, t1 = counters(widgets), time.process_time(), time.monotonic()
+        rss1 = rss_mb()
+    finally:
+        for cw in widgets:
+            cw.close()
+    elapsed = t1 - t0
+
+    per_camera = []
+    for cw, b, a in zip(widgets, before, after):
+        m = cw.metrics
+        per_camera.append({
+            "capture_fps": round((a["captured"] - b["captured"]) / elapsed, 2),
+            "paint_fps": round((a["painted"] - b["painted"]) / elapsed, 2),
+            "write_fps": round((a["written"] - b["written"]) / elapsed, 2),
+            "rec_dropped": a["rec_dropped"] - b["rec_dropped"],
+            "pool_misses": a["pool_misses"] - b["pool_misses"],
+            "read_ms": m.read_ms.percentiles(),
+            "render_ms": m.render_ms.percentiles(),
+            "encode_ms": m.encode_ms.percentiles(),
+        })
+
+    def mean(key):
+        return round(sum(c[key] for c in per_camera) / n, 2)
+
+    def worst(key, q="p95"):
+        values = [c[key][q] for c in per_camera if c[key][q] is not None]
+        return max(values) if values else None
+
+    return {
+        "cameras": n,
+        "capture_fps": mean("capture_fps"),
+        "paint_fps": mean("paint_fps"),
+        "write_fps": mean("write_fps"),
+        "read_p95_ms": worst("read_ms"),
+        "render_p95_ms": worst("render_ms"),
+        "encode_p95_ms": worst("encode_ms"),
+        "rec_dropped": sum(c["rec_dropped"] for c in per_camera),
+        "pool_misses": sum(c["pool_misses"] for c in per_camera),
+        "cpu_percent": round((cpu1 - cpu0) / elapsed * 100.0, 1),
+        "rss_mb": round(rss1, 1) if rss1 is not None else None,
+        "rss_growth_mb": round(rss1 - rss0, 1) if rss1 is not None and rss0 is not None else None,
+        "per_camera": per_camera,
+    }
+
+
+def compare(results, old_path):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    old_runs = {r["cameras"]: r for r in old["runs"]}
+    print(f"\nvs {os.path.basename(old_path)} (version {old.get('version')}):")
+    for run_ in results["runs"]:
+        prev = old_runs.get(run_["cameras"])
+        if not prev:
+            continue
+        parts = []
+        for key, higher_better in COMPARED:
+            new, was = run_.get(key), prev.get(key)
+            if new is None or not was:
+                continue
+            change = (new - was) / was * 100.0
+            worse = change < -5 if higher_better else change > 5
+            parts.append(f"{key} {change:+.0f}%{' !' if worse else ''}")
+        print(f"  {run_['cameras']} cam: " + ", ".join(parts))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--cameras", default="1,2,4,8", help="comma separated camera counts")
+    ap.add_argument("--seconds", type=float, default=5.0, help="measured time per run")
+    ap.add_argument("--warmup", type=float, default=1.0)
+    ap.add_argument("--size", default="640x480")
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--source", default="synthetic", help="'synthetic' or 'file:<video>'")
+    ap.add_argument("--record", action="store_true", help="also record every camera")
+    ap.add_argument("--prebuffer", type=int, default=0, help="pre-event buffer seconds per camera")
+    ap.add_argument("--compare", help="earlier results JSON to compare against")
+    ap.add_argument("--no-save", action="store_true")
+    args = ap.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    out_dir = tempfile.mkdtemp(prefix="solosight_pipe_")
+    results = {
+        "version": version.VERSION,
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpus": os.cpu_count()},
+        "args": vars(args),
+        "runs": [],
+    }
+    try:
+        print(f"{args.source} {args.size} @ {args.fps:g} fps, {args.seconds:g}s per run"
+              f"{', recording' if args.record else ''}")
+        for n in (int(v) for v in args.cameras.split(",")):
+            r = run(app, n, args, out_dir)
+            results["runs"].append(r)
+
+            def ms(v):
+                return "-" if v is None else f"{v:.1f}"
+            print(
+                f"  {n} cam: capture {r['capture_fps']:5.1f} fps  paint {r['paint_fps']:5.1f} fps  "
+                f"read p95 {ms(r['read_p95_ms'])} ms  render p95 {ms(r['render_p95_ms'])} ms  "
+                f"encode p95 {ms(r['encode_p95_ms'])} ms  cpu {r['cpu_percent']:5.1f}%  "
+                f"rss {r['rss_mb'] if r['rss_mb'] is not None else '-'} MB"
+            )
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"pipeline_{version.VERSION}_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"saved {os.path.relpath(path, ROOT)}")
+    if args.compare:
+        compare(results, args.compare)
+    return results
+
+
+if __name__ == "__main__":
+    main()
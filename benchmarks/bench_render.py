@@ -0,0 +1,118 @@
+# benchmarks/bench_render.py
+"""
+Preview render path benchmark: the old per-tick path (overlay on the frame,
+cvtColor, QImage, QPixmap.scaled) against render.PreviewRenderer with the
+cached overlay.TextOverlay.
+
+Reports mean/p95 time per tick and peak bytes allocated per tick
+(numpy buffers are tracked by tracemalloc; Qt's own pixmap memory is not).
+
+    python benchmarks/bench_render.py [--ticks 300] [--src 640x480] [--tile 480x360]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtWidgets import QApplication
+
+from overlay import TextOverlay
+from render import PreviewRenderer
+
+
+def overlay_text(frame, text, x=10, y=20):
+    # the old camera_manager helper: rasterizes the text on every call
+    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+
+
+def legacy_tick(frame, tile_w, tile_h):
+    # what CameraWidget.grab_frame did before PreviewRenderer
+    frame = frame.copy()  # the old path drew on the frame itself; copy so runs stay comparable
+    overlay_text(frame, "Cam 0 | 640x480 | 30FPS", 8, 18)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    qimg = QImage(rgb.data, rgb.shape[1], rgb.shape[0], QImage.Format_RGB888)
+    return QPixmap.fromImage(qimg).scaled(tile_w, tile_h, Qt.KeepAspectRatio)
+
+
+def make_renderer_tick():
+    renderer = PreviewRenderer()
+    text = TextOverlay()
+
+    def tick(frame, tile_w, tile_h):
+        qimg = renderer.render(frame, tile_w, tile_h)
+        text.set_text("Cam 0 | 640x480 | 30FPS")
+        text.draw(renderer.buffer, 8, 18)
+        return QPixmap.fromImage(qimg)
+
+    return tick, renderer
+
+
+def run(name, tick, frames, tile_w, tile_h, ticks):
+    # warm up (first call allocates the reusable buffers)
+    for i in range(5):
+        tick(frames[i % len(frames)], tile_w, tile_h)
+
+    times = []
+    for i in range(ticks):
+        t0 = time.perf_counter()
+        tick(frames[i % len(frames)], tile_w, tile_h)
+        times.append(time.perf_counter() - t0)
+
+    # separate pass so the timing isn't skewed by tracemalloc
+    alloc = 0
+    tracemalloc.start()
+    for i in range(ticks):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        tick(frames[i % len(frames)], tile_w, tile_h)
+        alloc += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+
+    times.sort()
+    result = {
+        "name": name,
+        "ticks": ticks,
+        "mean_ms": statistics.mean(times) * 1000,
+        "p95_ms": times[int(len(times) * 0.95) - 1] * 1000,
+        "alloc_kb_per_tick": alloc / ticks / 1024,
+    }
+    print(
+        f"{name:10s} mean {result['mean_ms']:7.3f} ms  p95 {result['p95_ms']:7.3f} ms  "
+        f"allocated {result['alloc_kb_per_tick']:9.1f} KB/tick"
+    )
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--ticks", type=int, default=300)
+    ap.add_argument("--src", default="640x480")
+    ap.add_argument("--tile", default="480x360")
+    args = ap.parse_args(argv)
+    src_w, src_h = (int(v) for v in args.src.split("x"))
+    tile_w, tile_h = (int(v) for v in args.tile.split("x"))
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (src_h, src_w, 3), dtype=np.uint8) for _ in range(4)]
+
+    # pixmap timings depend on the platform plugin (offscreen unless QT_QPA_PLATFORM says otherwise)
+    print(f"source {src_w}x{src_h} -> tile {tile_w}x{tile_h}, {args.ticks} ticks, Qt platform {app.platformName()}")
+    results = [run("legacy", legacy_tick, frames, tile_w, tile_h, args.ticks)]
+    tick, renderer = make_renderer_tick()
+    results.append(run("renderer", tick, frames, tile_w, tile_h, args.ticks))
+    print(f"renderer buffer reallocations: {renderer.reallocations}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
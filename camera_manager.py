@@ -1,27 +1,119 @@
 # camera_manager.py
+import threading
+import time
 import cv2
 from PyQt5.QtWidgets import QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QDialog
-from PyQt5.QtCore import QTimer, Qt, QSize
-from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtCore import QTimer, Qt, QSize, QObject, pyqtSignal
+from PyQt5.QtGui import QPixmap
 from icon_loader import icon
 from recorder import CameraRecorder
+from capture_worker import CaptureWorker
+from prebuffer import PreEventBuffer
+from motion import MotionRecorder
+from metrics import CameraMetrics
+from render import PreviewRenderer
+from overlay import TextOverlay
+from capture_profiles import get_profile, open_configured
+import startup_profile
 import theme
 
-def find_available_cameras(max_scan=10):
-    """Return a list of dicts: [{'index': 0, 'name': 'Cam 0'}, ...]"""
-    cameras = []
-    for i in range(max_scan):
-        cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
+def probe_camera(index):
+    """Open index, read one frame and release. Returns {'index', 'name'} or None."""
+    cap = None
+    try:
+        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
         if cap and cap.isOpened():
             ret, _ = cap.read()
             if ret:
-                cameras.append({"index": i, "name": f"Cam {i}"})
-        cap.release()
-    return cameras
+                return {"index": index, "name": f"Cam {index}"}
+    except Exception:
+        pass
+    finally:
+        if cap is not None:
+            try:
+                cap.release()
+            except Exception:
+                pass
+    return None
+
+
+def _probe_all(indices, timeout, on_found=None):
+    """
+    Probe all indices at once, one daemon thread each. Returns the cameras found
+    within `timeout` seconds; probes still stuck in the driver are abandoned.
+    """
+    found = []
+    lock = threading.Lock()
+
+    def run(i):
+        cam = probe_camera(i)
+        if cam is None:
+            return
+        with lock:
+            found.append(cam)
+        if on_found:
+            on_found(cam)
+
+    threads = [threading.Thread(target=run, args=(i,), name=f"probe-cam{i}", daemon=True) for i in indices]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + timeout
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+    with lock:
+        return sorted(found, key=lambda c: c["index"])
+
+
+def find_available_cameras(max_scan=10, timeout=3.0):
+    """Return a list of dicts: [{'index': 0, 'name': 'Cam 0'}, ...]"""
+    return _probe_all(range(max_scan), timeout)
+
+
+class CameraDiscovery(QObject):
+    """
+    Runs find_available_cameras in the background. camera_found fires (on the
+    UI thread) as soon as each camera answers, finished once every probe is done
+    or has timed out. Indices in `skip` are already open and reported as found
+    without probing (a second open of a busy camera would fail).
+    """
+    camera_found = pyqtSignal(dict)
+    finished = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._thread = None
 
-def overlay_text(frame, text, x=10, y=20):
-    import cv2
-    cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, max_scan=10, timeout=3.0, skip=()):
+        if self.is_running():
+            return
+        skip = set(skip)
+
+        def run():
+            cams = _probe_all([i for i in range(max_scan) if i not in skip], timeout, self.camera_found.emit)
+            cams += [{"index": i, "name": f"Cam {i}"} for i in skip]
+            self.finished.emit(sorted(cams, key=lambda c: c["index"]))
+
+        self._thread = threading.Thread(target=run, name="camera-discovery", daemon=True)
+        self._thread.start()
+
+
+class CaptureOpener(QObject):
+    """
+    Opens cameras with open_configured, all at once on one daemon thread each,
+    so a slow driver neither blocks the UI nor holds up the other cameras.
+    opened fires (on the UI thread) per camera with (cam_index, (cap, profile, mode));
+    cap is None if it failed. Pass the tuple to CameraWidget.open(opened=...).
+    """
+    opened = pyqtSignal(int, object)
+
+    def open(self, settings, indices):
+        for i in indices:
+            t = threading.Thread(target=lambda i=i: self.opened.emit(i, open_configured(settings, i)),
+                                 name=f"open-cam{i}", daemon=True)
+            t.start()
 
 class ResizableFullScreenDialog(QDialog):
     def __init__(self, label_text, update_func, parent=None):
@@ -42,12 +134,19 @@ class ResizableFullScreenDialog(QDialog):
         return super().resizeEvent(event)
 
 class CameraWidget(QWidget):
-    def __init__(self, cam_index, label_text, settings, parent=None):
+    def __init__(self, cam_index, label_text, settings, parent=None, metrics=None):
         super().__init__(parent)
         self.cam_index = cam_index
         self.label_text = label_text
         self.settings = settings
+        self.metrics = metrics or CameraMetrics(cam_index)
+        self.metrics.collect = self.metrics_counters
+        self._stats_shown_at = 0.0
         self.cap = None
+        self.worker = None
+        self.bus = None          # the worker's FrameBus; outlives a reopen so subscribers stay attached
+        self.reopening = False   # a profile change is reopening the camera in the background
+        self._opener = None
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.grab_frame)
         self.recording = False
@@ -95,79 +194,287 @@ class CameraWidget(QWidget):
         self.in_fullscreen = False
         self.full_win = None
         self.full_timer = None
+        self.full_interval = 30    # fullscreen paint interval in ms (0 = paused); set by the PreviewGovernor
+        self.tile_sub = None
+        self.full_sub = None
+        self.rec_sub = None
+        self.motion = None
+        self.prebuffer = None
+        self._prebuffer_cfg = None
+        # one reusable scale buffer per view
+        self.tile_renderer = PreviewRenderer()
+        self.tile_overlay = TextOverlay()
+        self.driver_fps = 30
+        self.full_renderer = PreviewRenderer()
+        # tile paint interval in ms (0 = paused); set by the PreviewGovernor
+        self.preview_interval = 30
+        self.paint_ms = 0.0        # smoothed time grab_frame spends painting
+        self.profile = None        # requested capture profile
+        self.capture_mode = None   # what the driver negotiated
+
+    def open(self, opened=None):
+        """Start the tile; opened is a (cap, profile, mode) already opened elsewhere (CaptureOpener)."""
+        if not self._open_capture(opened):
+            return False
+        # capture runs on its own thread and reads each frame once; the tile,
+        # the fullscreen view and the recorder all subscribe to its bus
+        self.worker = CaptureWorker(
+            self.cap, self.cam_index, bus=self.bus, pool_size=self.settings.get("frame_pool_size", 16),
+            metrics=self.metrics,
+        )
+        if self.bus is None:
+            self.bus = self.worker.bus
+            self.tile_sub = self.bus.subscribe("tile")
+            self._start_prebuffer()
+        self.worker.start()
+        if self.preview_interval > 0:
+            self.timer.start(self.preview_interval)
+        return True
 
-    def open(self):
-        try:
-            self.cap = cv2.VideoCapture(self.cam_index, cv2.CAP_DSHOW)
-        except Exception:
-            self.cap = cv2.VideoCapture(self.cam_index)
-        if not self.cap.isOpened():
+    def _open_capture(self, opened=None):
+        self.cap, self.profile, self.capture_mode = opened or open_configured(self.settings, self.cam_index)
+        if self.cap is None:
             return False
-        self.timer.start(30)
+        # ask the driver once; querying it every tick is a driver round trip
+        self.driver_fps = int((self.capture_mode or {}).get("fps") or 30)
         return True
 
+    def _restart_capture(self):
+        """Reopen the camera with a new profile in the background, keeping the bus and all its subscribers."""
+        self.worker.stop()
+        self.worker = None
+        self.cap = None  # released by the worker
+        self.reopening = True
+        self.debug.setText("Reopening...")
+        if self._opener is None:
+            self._opener = CaptureOpener(self)
+            self._opener.opened.connect(self._on_reopened)
+        self._opener.open(self.settings, [self.cam_index])
+
+    def _on_reopened(self, cam_index, opened):
+        if not self.reopening:
+            # closed meanwhile
+            if opened[0] is not None:
+                opened[0].release()
+            return
+        self.reopening = False
+        if self.open(opened):
+            self.debug.setText("")
+        else:
+            self.debug.setText("Failed to open")
+
+    def _prebuffer_config(self):
+        return (
+            self.settings.get("prebuffer_seconds", 0),
+            float(self.settings.get("record_target_fps", 20.0)),
+            self.settings.get("prebuffer_memory_mb", 64),
+        )
+
+    def _start_prebuffer(self):
+        if self.prebuffer:
+            self.prebuffer.stop()
+            self.prebuffer = None
+        self._prebuffer_cfg = self._prebuffer_config()
+        seconds, fps, budget_mb = self._prebuffer_cfg
+        if seconds > 0 and self.bus:
+            # the bus, not the worker: a profile reopen may be in flight and keeps the same bus
+            self.prebuffer = PreEventBuffer(self.bus, self.cam_index, seconds=seconds, fps=fps, budget_mb=budget_mb)
+            self.prebuffer.start()
+
+    def apply_settings(self):
+        """Pick up settings changes that affect this tile; the camera is only reopened if its profile changed."""
+        if not self.worker:
+            return
+        if get_profile(self.settings, self.cam_index) != self.profile:
+            self._restart_capture()
+        if self._prebuffer_config() != self._prebuffer_cfg:
+            self._start_prebuffer()
+
     def close(self):
         self.timer.stop()
-        if self.cap:
+        self.stop_recording()
+        if self.in_fullscreen and self.full_win:
             try:
-                self.cap.release()
+                self.full_win.close()
             except Exception:
                 pass
-            self.cap = None
-        if self.in_fullscreen and self.full_win:
+            self._on_full_closed()
+        if self.prebuffer:
+            self.prebuffer.stop()
+            self.prebuffer = None
+        if self.worker:
+            # the worker owns the capture and releases it when its thread exits
+            self.worker.stop()
+            self.worker = None
+        elif self.cap:
             try:
-                self.full_timer.stop()
-                self.full_win.close()
+                self.cap.release()
             except Exception:
                 pass
-            self.in_fullscreen = False
+        self.cap = None
+        self.bus = None
+        self.reopening = False
+        self.tile_sub = None
 
     def grab_frame(self):
-        if not self.cap or not self.cap.isOpened():
-            self.debug.setText("No feed")
+        # Paint-only: takes whatever the capture worker read last, never blocks on the camera
+        if not self.worker or not self.worker.is_running():
+            if not self.reopening:
+                self.debug.setText("No feed")
             return
-        ret, frame = self.cap.read()
-        if not ret:
-            self.debug.setText("Frame grab failed")
+        frame, _ = self.tile_sub.take()
+        if frame is None:
+            if self.worker.frames_captured == 0 and self.worker.read_failures:
+                self.debug.setText("Frame grab failed")
             return
+        t0 = time.perf_counter()
+        self._update_debug_stats()
         h, w = frame.shape[:2]
-        fps_text = f"{int(self.cap.get(cv2.CAP_PROP_FPS) or 30)}FPS"
-        overlay_text(frame, f"{self.label_text} | {w}x{h} | {fps_text}", 8, 18)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        qimg = QImage(rgb.data, rgb.shape[1], rgb.shape[0], QImage.Format_RGB888)
-        pix = QPixmap.fromImage(qimg).scaled(self.video.width(), self.video.height(), Qt.KeepAspectRatio)
-        self.video.setPixmap(pix)
-        if self.recording and self.recorder:
-            self.recorder.write_frame(frame)
+        # frame is shared with the other subscribers: scale into the tile buffer and draw there
+        qimg = self.tile_renderer.render(frame, self.video.width(), self.video.height())
+        if qimg is None:
+            return
+        # re-rasterized only when the text changes; the measured rate, not what the driver claims
+        fps = round(self.metrics.capture_fps()) or self.driver_fps
+        self.tile_overlay.set_text(f"{self.label_text} | {w}x{h} | {fps}FPS")
+        self.tile_overlay.draw(self.tile_renderer.buffer, 8, 18)
+        self.video.setPixmap(QPixmap.fromImage(qimg))
+        startup_profile.finish("first_frame")
+        elapsed = (time.perf_counter() - t0) * 1000.0
+        self.metrics.render_ms.add(elapsed)
+        self.paint_ms += (elapsed - self.paint_ms) * 0.1
+
+    def set_preview_interval(self, ms):
+        """Change how often the tile repaints (0 pauses it). Capture and recording are unaffected."""
+        if ms == self.preview_interval and (ms <= 0 or self.timer.isActive() or not self.worker):
+            return
+        self.preview_interval = ms
+        if not self.worker:
+            return
+        if ms <= 0:
+            self.timer.stop()
+        else:
+            self.timer.start(ms)
+
+    def set_fullscreen_interval(self, ms):
+        """Change how often the fullscreen view repaints (0 pauses it)."""
+        if ms == self.full_interval and (ms <= 0 or not self.full_timer or self.full_timer.isActive()):
+            return
+        self.full_interval = ms
+        if not self.full_timer:
+            return
+        if ms <= 0:
+            self.full_timer.stop()
+        else:
+            self.full_timer.start(ms)
 
     def toggle_fullscreen(self):
         if not self.in_fullscreen:
-            self.full_win = ResizableFullScreenDialog(self.label_text, self._update_full, self)
+            if not self.worker:
+                return
+            self.full_sub = self.worker.bus.subscribe("fullscreen")
+            self.full_win = ResizableFullScreenDialog(
+                self.label_text, lambda: self._update_full(repaint=True), self
+            )
             self.full_label = self.full_win.full_label
+            self.full_win.finished.connect(self._on_full_closed)
             self.full_win.show()
             self.full_timer = QTimer()
             self.full_timer.timeout.connect(self._update_full)
-            self.full_timer.start(30)
+            self.full_interval = 30
+            self.full_timer.start(self.full_interval)
             self.in_fullscreen = True
         else:
-            if self.full_timer:
-                self.full_timer.stop()
             if self.full_win:
                 self.full_win.close()
-            self.in_fullscreen = False
+            self._on_full_closed()
+
+    def _on_full_closed(self):
+        # also reached when the user closes the dialog window directly
+        if self.full_timer:
+            self.full_timer.stop()
+            self.full_timer = None
+        if self.bus and self.full_sub:
+            self.bus.unsubscribe(self.full_sub)
+        self.full_sub = None
+        self.in_fullscreen = False
+
+    def metrics_counters(self):
+        """Counters of the live capture, preview and recording parts (CameraMetrics.collect)."""
+        out = {"driver_fps": self.driver_fps, "preview_interval_ms": self.preview_interval}
+        worker = self.worker
+        if worker:
+            stats = worker.stats()
+            out["frames_captured"] = stats["frames_captured"]
+            out["read_failures"] = stats["read_failures"]
+            out["preview_dropped"] = stats["subscribers"].get("tile", {}).get("dropped", 0)
+        motion = self.motion
+        recorder = motion.recorder if motion else self.recorder
+        if self.recording and recorder:
+            rec = recorder.stats()
+            out["rec_queue_depth"] = rec["queue_depth"]
+            out["rec_frames_written"] = rec["frames_written"]
+            out["rec_frames_dropped"] = rec["frames_dropped"]
+            out["bytes_written"] = rec["bytes_written"]
+        if motion:
+            m = motion.stats()
+            out["motion_score"] = m["score"]
+            out["motion_cost_ms"] = m["cost_ms"]
+            out["motion_events"] = m["events"]
+        return out
+
+    def _stats_text(self):
+        def ms(p):
+            return "-" if p is None else f"{p:.1f}"
+        m = self.metrics
+        c = self.metrics_counters()
+        read, render, enc = m.read_ms.percentiles(), m.render_ms.percentiles(), m.encode_ms.percentiles()
+        text = (f"{m.capture_fps():.1f} fps | read p50/p95 {ms(read['p50'])}/{ms(read['p95'])} ms"
+                f" | render p95 {ms(render['p95'])} ms | drop {c.get('preview_dropped', 0)}")
+        if "rec_queue_depth" in c:
+            text += (f"\nenc p95 {ms(enc['p95'])} ms | queue {c['rec_queue_depth']} | rec drop"
+                     f" {c['rec_frames_dropped']} | {c['bytes_written'] / 1e6:.1f} MB")
+        return text
 
-    def _update_full(self):
-        if not self.cap or not self.cap.isOpened():
+    def _update_debug_stats(self):
+        if self.settings.get("show_stats_overlay", False):
+            # percentiles aren't free; twice a second is plenty for reading
+            now = time.monotonic()
+            if now - self._stats_shown_at >= 0.5:
+                self._stats_shown_at = now
+                self.debug.setText(self._stats_text())
             return
-        ret, frame = self.cap.read()
-        if not ret:
+        stats = self.worker.stats()
+        tile = stats["subscribers"].get("tile", {})
+        text = f"Dropped {tile.get('dropped', 0)} / {stats['frames_captured']} frames"
+        pool = stats.get("pool")
+        if pool:
+            text += f" | pool {pool['hits']} hit / {pool['misses']} miss"
+        if self.preview_interval > 30:
+            text += f" | preview {1000 / self.preview_interval:.0f} fps"
+        if self.motion:
+            m = self.motion.stats()
+            text += (f" | motion {m['score']:.3f}/{m['trigger']:.3f} (sens {m['sensitivity']:.2f},"
+                     f" {m['cost_ms']:.2f} ms){' REC' if m['recording'] else ''}")
+        elif self.recording and self.recorder:
+            rec = self.recorder.stats()
+            if rec["error"]:
+                text += f" | RECORDING STOPPED: {rec['error']}"
+            else:
+                text += f" | rec queue {rec['queue_depth']}/{rec['queue_size']}, dropped {rec['frames_dropped']}"
+        self.debug.setText(text)
+
+    def _update_full(self, repaint=False):
+        if not self.full_sub:
+            return
+        frame, _ = self.full_sub.take()
+        if frame is None and repaint:
+            frame, _ = self.full_sub.latest()
+        if frame is None:
             return
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        qimg = QImage(rgb.data, rgb.shape[1], rgb.shape[0], QImage.Format_RGB888)
-        pix = QPixmap.fromImage(qimg).scaled(self.full_label.width(), self.full_label.height(), Qt.KeepAspectRatio)
-        self.full_label.setPixmap(pix)
-        if self.recording and self.recorder:
-            self.recorder.write_frame(frame)
+        qimg = self.full_renderer.render(frame, self.full_label.width(), self.full_label.height())
+        if qimg is not None:
+            self.full_label.setPixmap(QPixmap.fromImage(qimg))
 
     def edit_label(self):
         from PyQt5.QtWidgets import QInputDialog, QLineEdit
@@ -176,16 +483,59 @@ class CameraWidget(QWidget):
             self.label_text = text
             self.label.setText(text)
 
-    def start_recording(self, save_dir, chunk_minutes, max_minutes):
+    def start_recording(self, save_dir, chunk_minutes, max_minutes, storage=None):
         if self.recording:
             return
-        self.recorder = CameraRecorder(save_dir, self.cam_index, chunk_minutes=chunk_minutes, max_minutes=max_minutes)
+
+        def make_recorder():
+            return self._make_recorder(save_dir, chunk_minutes, max_minutes, storage)
+
+        if self.settings.get("record_trigger") == "motion" and self.worker:
+            # armed: a recording runs only while there is activity (plus pre/post-roll)
+            self.recorder = None
+            self.motion = MotionRecorder(
+                self.worker.bus, self.cam_index, make_recorder,
+                sensitivity=self.motion_sensitivity(),
+                post_roll=self.settings.get("motion_post_roll", 5),
+                fps=self.settings.get("motion_fps", 5),
+            )
+            self.motion.start()
+            self.recording = True
+            return
+        self.recorder = make_recorder()
         self.recorder.start()
+        if self.worker:
+            # the recorder gets every captured frame, independent of what the previews paint
+            recorder = self.recorder
+            self.rec_sub = self.worker.bus.subscribe(
+                "recorder", policy="callback", fn=lambda frame, ts: recorder.write_frame(frame, ts)
+            )
         self.recording = True
 
+    def motion_sensitivity(self):
+        return float((self.settings.get("motion_sensitivities") or {}).get(str(self.cam_index),
+                                                                          self.settings.get("motion_sensitivity", 0.5)))
+
+    def _make_recorder(self, save_dir, chunk_minutes, max_minutes, storage):
+        motion = self.settings.get("record_trigger") == "motion"
+        return CameraRecorder.from_settings(
+            save_dir, self.cam_index, self.settings, chunk_minutes, max_minutes,
+            preroll=self.prebuffer.ring if self.prebuffer else None,
+            preroll_seconds=self.settings.get("motion_pre_roll", 5) if motion else None,
+            storage=storage,
+            metrics=self.metrics,
+            frames=self.bus,
+        )
+
     def stop_recording(self):
         if not self.recording:
             return
+        if self.motion:
+            self.motion.stop()
+            self.motion = None
+        if self.bus and self.rec_sub:
+            self.bus.unsubscribe(self.rec_sub)
+        self.rec_sub = None
         if self.recorder:
             self.recorder.stop()
         self.recording = False
@@ -0,0 +1,181 @@
+# capture_profiles.py
+"""
+Per-camera capture format negotiation.
+
+A profile says which mode to ask the driver for:
+    {"fourcc": "MJPG", "width": 640, "height": 480, "fps": 30, "buffer_size": 1}
+fourcc "" (or a 0 width/height/fps) leaves that property at the driver default.
+Profiles live in settings["capture_profiles"] keyed by camera index, falling
+back to settings["default_capture_profile"].
+
+Run this file to list the modes a camera supports and the fps it really delivers:
+    python capture_profiles.py 0 1 2 3
+"""
+import sys
+import time
+
+import cv2
+
+DEFAULT_PROFILE = {"fourcc": "MJPG", "width": 640, "height": 480, "fps": 30, "buffer_size": 1}
+
+# Modes tried by probe_modes
+PROBE_FOURCCS = ("MJPG", "YUY2")
+PROBE_SIZES = ((320, 240), (640, 480), (800, 600), (1280, 720), (1920, 1080))
+
+# Rough usable isochronous bandwidth of one USB 2.0 hub, bytes/s
+USB2_BUDGET = 35 * 1000 * 1000
+# Typical MJPG compression vs raw YUY2 for webcam scenes; only used for estimates
+MJPG_RATIO = 0.1
+
+
+def get_profile(settings, cam_index):
+    """Profile for cam_index: default profile overlaid with the camera's own entries."""
+    profile = dict(DEFAULT_PROFILE)
+    profile.update(settings.get("default_capture_profile") or {})
+    profile.update((settings.get("capture_profiles") or {}).get(str(cam_index)) or {})
+    return profile
+
+
+def fourcc_to_str(value):
+    value = int(value)
+    if value <= 0:
+        return ""
+    return "".join(chr((value >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def read_mode(cap):
+    """The mode the driver actually settled on."""
+    return {
+        "fourcc": fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": float(cap.get(cv2.CAP_PROP_FPS) or 0),
+    }
+
+
+def apply_profile(cap, profile):
+    """
+    Ask an open capture for the profile's mode and return what it negotiated.
+    Order matters on DirectShow: fourcc first, then size, then fps.
+    """
+    try:
+        fourcc = profile.get("fourcc") or ""
+        if len(fourcc) == 4:
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+        if profile.get("width") and profile.get("height"):
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, int(profile["width"]))
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, int(profile["height"]))
+        if profile.get("fps"):
+            cap.set(cv2.CAP_PROP_FPS, float(profile["fps"]))
+        if profile.get("buffer_size"):
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, int(profile["buffer_size"]))
+        return read_mode(cap)
+    except Exception as e:
+        print("Failed to apply capture profile:", e)
+        return None
+
+
+def estimate_bandwidth(mode):
+    """Approximate bytes/s a mode puts on the USB bus."""
+    raw = mode["width"] * mode["height"] * 2 * (mode.get("measured_fps") or mode["fps"] or 30)
+    return raw * MJPG_RATIO if mode.get("fourcc") == "MJPG" else raw
+
+
+def measure_fps(cap, seconds=1.0):
+    """Frames per second the camera delivers right now (after a short warm-up)."""
+    for _ in range(3):
+        cap.read()
+    frames = 0
+    t0 = time.monotonic()
+    while time.monotonic() - t0 < seconds:
+        ret, _ = cap.read()
+        if ret:
+            frames += 1
+    elapsed = time.monotonic() - t0
+    return frames / elapsed if elapsed > 0 else 0.0
+
+
+def open_capture(cam_index):
+    try:
+        return cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
+    except Exception:
+        return cv2.VideoCapture(cam_index)
+
+
+def open_configured(settings, cam_index):
+    """
+    Open a camera the way the settings describe it: a frame_sources stand-in
+    (see frame_sources.py) or the webcam, with its capture profile applied.
+    Returns (cap, profile, negotiated mode); cap is None if it didn't open.
+    """
+    profile = get_profile(settings, cam_index)
+    spec = (settings.get("frame_sources") or {}).get(str(cam_index))
+    try:
+        if spec:
+            from frame_sources import open_source
+            cap = open_source(spec)
+        else:
+            cap = open_capture(cam_index)
+    except Exception as e:
+        print(f"Cam {cam_index}: could not open {spec or 'camera'}:", e)
+        return None, profile, None
+    if not cap.isOpened():
+        cap.release()
+        return None, profile, None
+    # negotiate the mode before the first read (MJPG keeps four cams within USB 2.0)
+    return cap, profile, apply_profile(cap, profile)
+
+
+def probe_modes(cam_index, fourccs=PROBE_FOURCCS, sizes=PROBE_SIZES, fps=30, measure_seconds=1.0):
+    """
+    Try each fourcc/size on a camera that isn't in use elsewhere and return the
+    modes the driver accepted, with the fps it reports and the fps it delivers.
+    """
+    cap = open_capture(cam_index)
+    modes = []
+    try:
+        if not cap.isOpened():
+            return modes
+        for fourcc in fourccs:
+            for w, h in sizes:
+                got = apply_profile(cap, {"fourcc": fourcc, "width": w, "height": h, "fps": fps})
+                if not got or (got["width"], got["height"]) != (w, h) or (got["fourcc"] and got["fourcc"] != fourcc):
+                    continue
+                got["measured_fps"] = round(measure_fps(cap, measure_seconds), 1)
+                got["bandwidth"] = int(estimate_bandwidth(got))
+                modes.append(got)
+    finally:
+        cap.release()
+    return modes
+
+
+def fits_usb2(modes):
+    """True if the chosen modes (one per camera) should share one USB 2.0 hub."""
+    return sum(estimate_bandwidth(m) for m in modes) <= USB2_BUDGET
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    indices = [int(a) for a in argv] or [0]
+    for cam_index in indices:
+        print(f"Cam {cam_index}:")
+        modes = probe_modes(cam_index)
+        if not modes:
+            print("  could not open, or no mode accepted")
+        for m in modes:
+            print(
+                f"  {m['fourcc'] or '?':4s} {m['width']:>4d}x{m['height']:<4d} "
+                f"reported {m['fps']:5.1f} fps  measured {m['measured_fps']:5.1f} fps  "
+                f"~{m['bandwidth'] / 1e6:5.1f} MB/s"
+            )
+    # how the configured profiles add up on one hub
+    from settings_manager import load_settings
+    settings = load_settings()
+    configured = [get_profile(settings, i) for i in indices]
+    total = sum(estimate_bandwidth(p) for p in configured)
+    verdict = "fits" if fits_usb2(configured) else "does NOT fit"
+    print(f"Configured profiles need ~{total / 1e6:.1f} MB/s: {verdict} one USB 2.0 hub (~{USB2_BUDGET / 1e6:.0f} MB/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# capture_worker.py
+import threading
+import time
+
+from frame_bus import FrameBus
+from frame_pool import FramePool
+
+
+class CaptureWorker:
+    """
+    Per-camera capture thread. Calls cap.read() off the UI thread, exactly once
+    per frame, stamps it with time.monotonic() and publishes it on a FrameBus.
+    Frames are read into reusable buffers from a FramePool (pool_size=0 turns
+    that off); a buffer is reused once every holder has released it (see
+    frame_pool.py), so subscribers must treat frames as read-only.
+    Use:
+        w = CaptureWorker(cap, cam_index)
+        sub = w.bus.subscribe("tile")   # latest-frame mailbox
+        w.start()
+        frame, ts = sub.take()          # called from the UI paint timer
+        w.stop()                        # stops the thread and releases the capture
+    """
+
+    def __init__(self, cap, cam_index, bus=None, pool_size=16, metrics=None):
+        self.cap = cap
+        self.cam_index = cam_index
+        self.metrics = metrics  # metrics.CameraMetrics: read latency and real capture rate
+        self.bus = bus or FrameBus()
+        self.pool = FramePool(pool_size) if pool_size else None
+        # subscribers hold and release frames through the bus (it outlives a reopen, the pool doesn't)
+        self.bus.pool = self.pool
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # counters (read with stats())
+        self.frames_captured = 0
+        self.read_failures = 0
+        self.last_frame_ts = None
+        self.last_error = ""
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"capture-cam{self.cam_index}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            buf = self.pool.acquire() if self.pool else None
+            t_read = time.perf_counter()
+            try:
+                ret, frame = self.cap.read(buf) if buf is not None else self.cap.read()
+            except Exception as e:
+                ret, frame = False, None
+                self.last_error = str(e)
+            ts = time.monotonic()
+            if self.pool:
+                frame = self.pool.returned(buf, frame if ret else None)
+            buf = None
+            if not ret or frame is None:
+                with self._lock:
+                    self.read_failures += 1
+                # avoid spinning on a dead camera
+                time.sleep(0.05)
+                continue
+            with self._lock:
+                self.frames_captured += 1
+                self.last_frame_ts = ts
+            if self.metrics is not None:
+                self.metrics.read_ms.add((time.perf_counter() - t_read) * 1000.0)
+                self.metrics.capture.tick(ts)
+            self.bus.publish(frame, ts)
+            # only subscribers hold the buffer from here on
+            if self.pool:
+                self.pool.release(frame)
+            frame = None
+        # the capture belongs to this thread; release it here so release() never
+        # races a read() that is still in flight
+        try:
+            self.cap.release()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Capture counters plus per-subscriber delivered/dropped counts."""
+        with self._lock:
+            out = {
+                "frames_captured": self.frames_captured,
+                "read_failures": self.read_failures,
+            }
+        if self.pool:
+            out["pool"] = self.pool.stats()
+        out["subscribers"] = self.bus.stats()
+        return out
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,226 @@
+# chunk_index.py
+"""
+Sidecar index per recorded chunk, and a disk cache of chunk thumbnails.
+
+CameraRecorder writes cam0_20240101_120000.mp4.idx.json next to each chunk
+when it is closed:
+    {"camera": "0", "file": "cam0_20240101_120000.mp4", "codec": "mp4v",
+     "fps": 20.0, "frames": 6000, "size": [640, 480],
+     "start_ts": 1234.5, "end_ts": 1534.4,           # capture clock (time.monotonic)
+     "start_wall": 1704106800.0, "end_wall": ...,    # time.time() of first/last frame
+     "keyframe_interval": 12, "keyframes": "verified"}
+Frame n of the file shows the moment start_wall + n / fps. Keyframe positions
+are read from the finished file's packet flags (with_keyframes, no decoding):
+"verified" means a keyframe every keyframe_interval frames was found; an
+irregular GOP is stored as the list of frame numbers; "assumed" means the file
+couldn't be scanned (OpenCV without FFmpeg, or a chunk without a sidecar) and
+keyframe_interval is FFmpeg's default GOP of 12 (every frame for MJPG).
+"""
+import json
+import os
+from bisect import bisect_right
+from datetime import datetime
+
+import cv2
+
+from storage import CHUNK_RE, INDEX_SUFFIX, THUMB_DIR
+# Frames between keyframes as written by OpenCV's FFmpeg backend
+KEYFRAME_INTERVAL = {"mjpg": 1}
+DEFAULT_KEYFRAME_INTERVAL = 12
+
+
+def index_path(video_path):
+    return video_path + INDEX_SUFFIX
+
+
+def write_index(video_path, info):
+    """Write the sidecar for a finished chunk (temp file + rename, so it is never half written)."""
+    info = dict(info, file=os.path.basename(video_path))
+    path = index_path(video_path)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(info, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError as e:
+        print("Failed to write chunk index:", e)
+
+
+def load_index(video_path):
+    """
+    The chunk's index; for chunks without a sidecar (older recordings, the
+    chunk still being written) one is estimated from the file name and the
+    container's frame count and rate. Returns None if the file can't be read.
+    """
+    try:
+        with open(index_path(video_path), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        info["path"] = video_path
+        return info
+    except (OSError, ValueError):
+        pass
+    m = CHUNK_RE.match(os.path.basename(video_path))
+    if not m:
+        return None
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        size = [int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))]
+    finally:
+        cap.release()
+    start = datetime.strptime(m.group(2)[:15], "%Y%m%d_%H%M%S").timestamp()
+    ext = m.group(3)
+    return {
+        "camera": m.group(1),
+        "file": os.path.basename(video_path),
+        "path": video_path,
+        "codec": "mjpg" if ext == "avi" else "mp4v",
+        "fps": fps,
+        "frames": frames,
+        "size": size,
+        "start_ts": None,
+        "end_ts": None,
+        "start_wall": start,
+        "end_wall": start + frames / fps,
+        "keyframe_interval": DEFAULT_KEYFRAME_INTERVAL if ext != "avi" else 1,
+        "keyframes": "assumed",
+        "estimated": True,
+    }
+
+
+def scan_indexes(save_dir):
+    """Indexes of every chunk in save_dir, oldest first."""
+    out = []
+    try:
+        names = sorted(os.listdir(save_dir))
+    except OSError:
+        return out
+    for name in names:
+        if CHUNK_RE.match(name):
+            info = load_index(os.path.join(save_dir, name))
+            if info and info.get("frames"):
+                out.append(info)
+    out.sort(key=lambda i: i["start_wall"])
+    return out
+
+
+def scan_keyframes(video_path):
+    """Frame numbers of the keyframes in a finished file, from packet flags; None if it can't be read that way."""
+    prop = getattr(cv2, "CAP_PROP_LRF_HAS_KEY_FRAME", None)
+    if prop is None:
+        return None
+    try:
+        # CAP_PROP_FORMAT -1: read() returns the encoded packets, nothing is decoded
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    except cv2.error:
+        return None
+    try:
+        if not cap.isOpened():
+            return None
+        found = []
+        n = 0
+        while True:
+            ok, _ = cap.read()
+            if not ok:
+                break
+            if cap.get(prop):
+                found.append(n)
+            n += 1
+    finally:
+        cap.release()
+    return found if found and found[0] == 0 else None
+
+
+def with_keyframes(video_path, info):
+    """info plus the file's real keyframe positions (see the module docstring); runs off the hot paths."""
+    info = dict(info)
+    found = scan_keyframes(video_path)
+    if found is None:
+        info["keyframe_interval"] = KEYFRAME_INTERVAL.get(info.get("codec"), DEFAULT_KEYFRAME_INTERVAL)
+        info["keyframes"] = "assumed"
+        return info
+    step = found[1] - found[0] if len(found) > 1 else max(1, int(info.get("frames") or 1))
+    if found == list(range(0, found[-1] + 1, step)) and found[-1] + step >= int(info.get("frames") or 0):
+        info["keyframe_interval"] = step
+        info["keyframes"] = "verified"
+    else:
+        info["keyframe_interval"] = max(1, round(found[-1] / max(1, len(found) - 1)))
+        info["keyframes"] = found
+    return info
+
+
+def keyframes(info):
+    if isinstance(info.get("keyframes"), list):
+        return info["keyframes"]
+    return range(0, info["frames"], max(1, int(info.get("keyframe_interval") or DEFAULT_KEYFRAME_INTERVAL)))
+
+
+def frame_at(info, wall_time):
+    """Frame number showing wall_time, or None if the chunk doesn't cover it."""
+    n = int((wall_time - info["start_wall"]) * info["fps"])
+    if n < 0 or n >= info["frames"]:
+        return None
+    return n
+
+
+def keyframe_before(info, frame):
+    found = info.get("keyframes")
+    if isinstance(found, list):
+        return found[max(0, bisect_right(found, frame) - 1)]
+    step = max(1, int(info.get("keyframe_interval") or DEFAULT_KEYFRAME_INTERVAL))
+    return frame - frame % step
+
+
+class ThumbnailCache:
+    """
+    Small JPEG thumbnails of chunk frames, decoded on first request and kept in
+    save_dir/.thumbs. Requests snap to the keyframe at or before the frame, so
+    a miss costs one seek and one decode and nearby requests share a file.
+    """
+
+    def __init__(self, save_dir, size=(160, 120), memory_items=256):
+        self.dir = os.path.join(save_dir, THUMB_DIR)
+        self.size = size
+        self.memory_items = memory_items
+        self._memory = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, info, frame):
+        """BGR thumbnail near `frame` of the chunk, or None if it can't be decoded."""
+        kf = keyframe_before(info, frame)
+        path = os.path.join(self.dir, f"{info['file']}_{kf}.jpg")
+        thumb = self._memory.get(path)
+        if thumb is None and os.path.exists(path):
+            thumb = cv2.imread(path)
+        if thumb is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            thumb = self._decode(info, kf)
+            if thumb is None:
+                return None
+            try:
+                os.makedirs(self.dir, exist_ok=True)
+                cv2.imwrite(path, thumb, [cv2.IMWRITE_JPEG_QUALITY, 75])
+            except Exception as e:
+                print("Failed to cache thumbnail:", e)
+        if len(self._memory) >= self.memory_items:
+            self._memory.pop(next(iter(self._memory)))
+        self._memory[path] = thumb
+        return thumb
+
+    def _decode(self, info, frame):
+        cap = cv2.VideoCapture(info["path"])
+        try:
+            if frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+            ret, img = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            return None
+        return cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
@@ -0,0 +1,302 @@
+# encoder_process.py
+"""
+Video encoding in a separate process, so a recorder's cv2.VideoWriter doesn't
+compete with the Qt event loop and the other cameras for one interpreter.
+
+Frames go through a multiprocessing.shared_memory ring of preallocated slots:
+the recorder copies a frame into a free slot and sends only (slot, shape) over
+the control queue, nothing is pickled. The encoder process hands the slot back
+once the frame is written. Opening a chunk, finalizing it and shutting down
+are control messages too. Several writers can be open at once (the next chunk
+is opened before the boundary), and finalizing one runs on a thread in the
+encoder process so frames of the next chunk keep flowing meanwhile.
+
+EncoderProcess.open_writer() returns an object with the cv2.VideoWriter
+methods CameraRecorder uses (write, release, isOpened), so the recorder's
+pacing and chunking logic is the same for both backends.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Reply timeout for control messages (open/close), seconds
+CONTROL_TIMEOUT = 10.0
+# Waits check this often whether the encoder process is still alive, seconds
+POLL_SECONDS = 0.1
+
+
+def _encoder_main(ctrl, done):
+    """Encoder process loop. Owns the cv2.VideoWriters, by writer id."""
+    import cv2
+    from multiprocessing import shared_memory
+
+    def finalize(wid, writer):
+        writer.release()
+        done.put(("closed", wid))
+
+    shm = None
+    ring = None
+    writers = {}
+    finalizers = []
+    while True:
+        msg = ctrl.get()
+        kind = msg[0]
+        try:
+            if kind == "frame":
+                _, wid, slot, shape = msg
+                n = shape[0] * shape[1] * shape[2]
+                writer = writers.get(wid)
+                if writer is not None:
+                    writer.write(ring[slot, :n].reshape(shape))
+                done.put(("free", slot))
+            elif kind == "ring":
+                _, name, slots, slot_bytes = msg
+                if shm is not None:
+                    ring = None
+                    shm.close()
+                # spawned children share the parent's resource tracker, so the
+                # parent's unlink() is the only cleanup the segment needs
+                shm = shared_memory.SharedMemory(name=name)
+                ring = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=shm.buf)
+                done.put(("ring_ok", None))
+            elif kind == "open":
+                _, wid, path, fourcc, fps, size = msg
+                writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, tuple(size))
+                ok = writer.isOpened()
+                if ok:
+                    writers[wid] = writer
+                else:
+                    writer.release()
+                done.put(("opened", wid, ok))
+            elif kind == "close":
+                _, wid = msg
+                writer = writers.pop(wid, None)
+                if writer is None:
+                    done.put(("closed", wid))
+                else:
+                    # every frame of this writer is already written (the queue is ordered);
+                    # finalizing the file must not hold up the other writers' frames
+                    t = threading.Thread(target=finalize, args=(wid, writer), daemon=True)
+                    t.start()
+                    finalizers.append(t)
+            elif kind == "stop":
+                break
+        except Exception as e:
+            done.put(("error", str(e)))
+            if kind == "frame":
+                done.put(("free", msg[2]))
+    for t in finalizers:
+        t.join()
+    for writer in writers.values():
+        writer.release()
+    ring = None
+    if shm is not None:
+        shm.close()
+
+
+class ProcessVideoWriter:
+    """cv2.VideoWriter look-alike that forwards to an EncoderProcess."""
+
+    def __init__(self, encoder, wid, fps):
+        self._encoder = encoder
+        self._wid = wid
+        self._open = True
+        # a frame waits at most one frame interval for a free slot
+        self._slot_timeout = 1.0 / max(1.0, fps)
+
+    def isOpened(self):
+        # False once the encoder process has died, like a writer that failed
+        return self._open and self._encoder.is_alive()
+
+    def write(self, frame):
+        if self._open:
+            self._encoder._send_frame(self._wid, frame, self._slot_timeout)
+
+    def release(self):
+        if self._open:
+            self._open = False
+            self._encoder._close_writer(self._wid)
+
+
+class EncoderProcess:
+    """
+    One encoder worker process with its shared-memory frame ring.
+    Use:
+        enc = EncoderProcess("cam0")
+        enc.start()
+        writer = enc.open_writer(path, "mp4v", 20.0, (w, h))  # None if the codec won't open
+        writer.write(frame); writer.release()
+        enc.stop()
+    """
+
+    def __init__(self, name, slots=4):
+        self.name = name
+        self.slots = max(2, int(slots))
+        self._ctx = multiprocessing.get_context("spawn")
+        self._proc = None
+        self._ctrl = None
+        self._done = None
+        self._replies = {}          # (reply kind, writer id) -> queue.Queue
+        self._replies_lock = threading.Lock()
+        self._next_wid = 0
+        self._free = queue.Queue()
+        self._reader = None
+        self._shm = None
+        self._ring = None
+        self._ring_lock = threading.Lock()
+        self._slot_bytes = 0
+
+        # counters (read with stats())
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.errors = 0
+
+    def start(self):
+        if self._proc is not None:
+            return
+        self._ctrl = self._ctx.Queue()
+        self._done = self._ctx.Queue()
+        self._proc = self._ctx.Process(
+            target=_encoder_main, args=(self._ctrl, self._done), name=f"encoder-{self.name}", daemon=True
+        )
+        self._proc.start()
+        self._reader = threading.Thread(target=self._read_replies, name=f"encoder-{self.name}-replies", daemon=True)
+        self._reader.start()
+
+    def _read_replies(self):
+        while True:
+            try:
+                msg = self._done.get()
+            except (EOFError, OSError):
+                return
+            if msg is None:
+                return
+            if msg[0] == "free":
+                self._free.put(msg[1])
+            elif msg[0] == "error":
+                self.errors += 1
+                if self.errors == 1:
+                    print(f"Encoder process {self.name} error:", msg[1])
+            else:
+                self._reply_queue(msg[:2]).put(msg)
+
+    def _reply_queue(self, key):
+        with self._replies_lock:
+            return self._replies.setdefault(key, queue.Queue())
+
+    def _get(self, q, timeout=CONTROL_TIMEOUT):
+        """q.get() that gives up right away once the encoder process has died. Raises queue.Empty."""
+        deadline = time.monotonic() + timeout
+        while True:
+            if not self.is_alive():
+                # whatever it sent before dying has been read already
+                return q.get_nowait()
+            try:
+                return q.get(timeout=max(0.0, min(POLL_SECONDS, deadline - time.monotonic())))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise
+
+    def _request(self, msg, expect):
+        """Send msg and wait for its reply; expect is (reply kind, writer id). Thread safe."""
+        if not self.is_alive():
+            return None
+        replies = self._reply_queue(expect)
+        self._ctrl.put(msg)
+        try:
+            return self._get(replies)
+        except queue.Empty:
+            return None
+        finally:
+            with self._replies_lock:
+                self._replies.pop(expect, None)
+
+    def _ensure_ring(self, frame_bytes):
+        if self._ring is not None and frame_bytes <= self._slot_bytes:
+            return True
+        from multiprocessing import shared_memory
+        # wait until the process has handed back every slot of the old ring
+        if self._ring is not None:
+            for _ in range(self.slots):
+                try:
+                    self._get(self._free)
+                except queue.Empty:
+                    return False
+        old = self._shm
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slots * frame_bytes)
+        self._ring = np.ndarray((self.slots, frame_bytes), dtype=np.uint8, buffer=self._shm.buf)
+        self._slot_bytes = frame_bytes
+        ok = self._request(("ring", self._shm.name, self.slots, frame_bytes), ("ring_ok", None)) is not None
+        if old is not None:
+            old.close()
+            old.unlink()
+        while not self._free.empty():
+            self._free.get_nowait()
+        for i in range(self.slots):
+            self._free.put(i)
+        return ok
+
+    def open_writer(self, path, fourcc, fps, size):
+        w, h = size
+        with self._replies_lock:
+            wid = self._next_wid
+            self._next_wid += 1
+        with self._ring_lock:
+            if not self._ensure_ring(w * h * 3):
+                return None
+        reply = self._request(("open", wid, path, fourcc, float(fps), (w, h)), ("opened", wid))
+        if not reply or not reply[2]:
+            return None
+        return ProcessVideoWriter(self, wid, float(fps))
+
+    def _send_frame(self, wid, frame, timeout):
+        # under the ring lock: open_writer on another thread may be swapping the ring
+        with self._ring_lock:
+            try:
+                # an encoder that falls behind costs this frame, not the recorder's queue
+                slot = self._get(self._free, timeout)
+            except queue.Empty:
+                self.frames_dropped += 1
+                return
+            n = frame.size
+            np.copyto(self._ring[slot, :n].reshape(frame.shape), frame)
+            self._ctrl.put(("frame", wid, slot, frame.shape))
+        self.frames_sent += 1
+
+    def _close_writer(self, wid):
+        # the reply arrives after every queued frame has been written and the file is finalized
+        self._request(("close", wid), ("closed", wid))
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def stats(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "free_slots": self._free.qsize(),
+            "errors": self.errors,
+        }
+
+    def stop(self, timeout=5.0):
+        if self._proc is None:
+            return
+        try:
+            self._ctrl.put(("stop",))
+            self._proc.join(timeout)
+        finally:
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._proc = None
+            self._done.put(None)
+            # Wait for the reply thread, or interpreter exit can tear the queue down under its get()
+            self._reader.join(timeout)
+            self._reader = None
+            self._ring = None
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+                self._shm = None
@@ -0,0 +1,225 @@
+# frame_bus.py
+import threading
+from collections import deque
+
+
+class LatestSubscription:
+    """
+    Mailbox that only keeps the newest frame. Good for previews: a slow painter
+    just skips frames. Frames overwritten before take() are counted as drops.
+    A frame returned by take() or latest() stays valid until the next call.
+    """
+
+    def __init__(self, name, bus):
+        self.name = name
+        self._bus = bus
+        self._lock = threading.Lock()
+        self._frame = None
+        self._ts = None
+        self._fresh = False
+        self._taken = None   # what the consumer is using, held until its next call
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def _deliver(self, frame, ts):
+        with self._lock:
+            if self._closed:
+                # unsubscribed while a publish was in flight
+                return
+            if self._fresh:
+                self.dropped += 1
+            self._bus.hold(frame)
+            self._bus.release(self._frame)
+            self._frame = frame
+            self._ts = ts
+            self._fresh = True
+            self.delivered += 1
+
+    def _hand_out(self):
+        self._bus.hold(self._frame)
+        self._bus.release(self._taken)
+        self._taken = self._frame
+        return self._frame, self._ts
+
+    def take(self):
+        """Return (frame, ts) if a new frame arrived since the last take(), else (None, None)."""
+        with self._lock:
+            if not self._fresh:
+                return None, None
+            self._fresh = False
+            return self._hand_out()
+
+    def latest(self):
+        """Return the newest (frame, ts) without marking it consumed."""
+        with self._lock:
+            return self._hand_out()
+
+    def _close(self):
+        with self._lock:
+            self._bus.release(self._frame)
+            self._bus.release(self._taken)
+            self._frame = self._taken = None
+            self._closed = True
+
+    def stats(self):
+        with self._lock:
+            return {"delivered": self.delivered, "dropped": self.dropped}
+
+
+class QueueSubscription:
+    """
+    Bounded FIFO for consumers that want every frame (encoders, analyzers).
+    When full, drop='oldest' discards the head, drop='newest' discards the incoming frame.
+    The capture thread never waits on a queue subscriber.
+    A frame returned by get() stays valid until the next get().
+    """
+
+    def __init__(self, name, bus, maxsize=30, drop="oldest"):
+        if drop not in ("oldest", "newest"):
+            raise ValueError(f"Unknown drop policy: {drop}")
+        self.name = name
+        self._bus = bus
+        self.maxsize = max(1, int(maxsize))
+        self.drop = drop
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._taken = None   # what the consumer is using, held until its next get()
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def _deliver(self, frame, ts):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.drop == "newest":
+                    return
+                self._bus.release(self._items.popleft()[0])
+            self._bus.hold(frame)
+            self._items.append((frame, ts))
+            self.delivered += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest (frame, ts); returns (None, None) on timeout."""
+        with self._cond:
+            # the queue's hold on the popped frame passes to the consumer
+            self._bus.release(self._taken)
+            self._taken = None
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None, None
+            item = self._items.popleft()
+            self._taken = item[0]
+            return item
+
+    def _close(self):
+        with self._cond:
+            for frame, _ in self._items:
+                self._bus.release(frame)
+            self._items.clear()
+            self._bus.release(self._taken)
+            self._taken = None
+            self._closed = True
+
+    def qsize(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self):
+        with self._cond:
+            return {"delivered": self.delivered, "dropped": self.dropped, "depth": len(self._items)}
+
+
+class CallbackSubscription:
+    """
+    Calls fn(frame, ts) directly on the capture thread. Only for consumers that
+    return immediately (e.g. ones that push into their own queue). The frame is
+    held only for the call: a consumer that keeps it holds it through the bus.
+    """
+
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self.delivered = 0
+        self.errors = 0
+
+    def _deliver(self, frame, ts):
+        try:
+            self.fn(frame, ts)
+            self.delivered += 1
+        except Exception as e:
+            self.errors += 1
+            if self.errors == 1:
+                print(f"Frame subscriber '{self.name}' failed:", e)
+
+    def stats(self):
+        return {"delivered": self.delivered, "errors": self.errors}
+
+    def _close(self):
+        pass
+
+
+class FrameBus:
+    """
+    Per-camera fan-out. The capture worker reads each frame once and publishes it
+    here; every subscriber (grid tile, fullscreen view, recorder, analyzers) gets
+    the same frame through its own drop policy, so opening more views never
+    splits the camera's frame rate.
+
+    Frames are shared between subscribers and must be treated as read-only;
+    copy before drawing on them. When the capture worker reads into pooled
+    buffers, hold() and release() lease a frame from its FramePool so the
+    buffer isn't refilled while someone still uses it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = ()
+        self.pool = None  # FramePool of the current capture worker, set by CaptureWorker
+
+    def hold(self, frame):
+        pool = self.pool
+        if pool is not None and frame is not None:
+            pool.hold(frame)
+
+    def release(self, frame):
+        pool = self.pool
+        if pool is not None and frame is not None:
+            pool.release(frame)
+
+    def subscribe(self, name, policy="latest", fn=None, maxsize=30, drop="oldest"):
+        if policy == "latest":
+            sub = LatestSubscription(name, self)
+        elif policy == "queue":
+            sub = QueueSubscription(name, self, maxsize=maxsize, drop=drop)
+        elif policy == "callback":
+            if fn is None:
+                raise ValueError("callback subscription needs fn")
+            sub = CallbackSubscription(name, fn)
+        else:
+            raise ValueError(f"Unknown subscription policy: {policy}")
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+        # gives back whatever it held; its consumer must be done with the frames
+        sub._close()
+
+    def publish(self, frame, ts):
+        # copy-on-write tuple: publishing never holds the lock while delivering
+        for sub in self._subs:
+            sub._deliver(frame, ts)
+
+    def subscribers(self):
+        return list(self._subs)
+
+    def stats(self):
+        return {sub.name: sub.stats() for sub in self._subs}
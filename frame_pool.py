@@ -0,0 +1,98 @@
+# frame_pool.py
+import threading
+
+
+class FramePool:
+    """
+    Reusable frame buffers for one camera, so cap.read(image=buf) can fill an
+    existing array instead of allocating a new one every frame.
+
+    Buffers are leased explicitly: every place that keeps a frame past the call
+    it got it in holds it with hold() and gives it back with release(), and a
+    buffer is reused only once its hold count is back to zero. The capture
+    thread holds the buffer it reads into until the frame is published; the
+    FrameBus subscriptions hold what they store and what their consumer last
+    took (see frame_bus.py), and CameraRecorder holds its queued frames.
+    hold() and release() ignore arrays that aren't pooled buffers (copies,
+    decoded preroll, mosaic canvases), so consumers don't need to tell them
+    apart. Views of a frame are not tracked: copy what you keep.
+
+    The pool grows to max_buffers on its own; past that a read allocates as
+    before. hits/misses count reads that did/didn't land in a pooled buffer,
+    so a steady state with misses flat means no per-frame allocation.
+    Use (capture thread):
+        buf = pool.acquire()                       # None until the first frame sets the shape
+        ret, frame = cap.read(buf) if buf is not None else cap.read()
+        frame = pool.returned(buf, frame)          # held once, by the capture thread
+        bus.publish(frame, ts)
+        pool.release(frame)
+    """
+
+    def __init__(self, max_buffers=16):
+        self.max_buffers = max(1, int(max_buffers))
+        self._buffers = []
+        self._holds = {}   # id(buffer) -> [buffer, hold count]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self):
+        """A pooled buffer nobody holds, now held once by the caller; None if all are in use."""
+        with self._lock:
+            for buf in self._buffers:
+                entry = self._holds[id(buf)]
+                if entry[1] == 0:
+                    entry[1] = 1
+                    return buf
+        return None
+
+    def returned(self, buf, frame):
+        """
+        Book-keeping after a read into buf: count it, adopt a newly allocated
+        frame and hand back buf if the read didn't use it. Returns frame, held
+        once by the caller when it is pooled.
+        """
+        with self._lock:
+            if buf is not None and frame is buf:
+                self.hits += 1
+                return frame
+            if buf is not None:
+                self._release(buf)
+            if frame is None:
+                return None
+            self.misses += 1
+            if self._buffers and self._buffers[0].shape != frame.shape:
+                # the camera changed mode: buffers of the old size are useless now
+                # (ones still held are simply dropped when their holders let go)
+                for old in self._buffers:
+                    del self._holds[id(old)]
+                self._buffers = []
+            if len(self._buffers) < self.max_buffers:
+                self._buffers.append(frame)
+                self._holds[id(frame)] = [frame, 1]
+        return frame
+
+    def hold(self, frame):
+        """Keep frame from being reused until a matching release()."""
+        with self._lock:
+            entry = self._holds.get(id(frame))
+            if entry is not None and entry[0] is frame:
+                entry[1] += 1
+
+    def release(self, frame):
+        with self._lock:
+            self._release(frame)
+
+    def _release(self, frame):
+        entry = self._holds.get(id(frame))
+        if entry is not None and entry[0] is frame and entry[1] > 0:
+            entry[1] -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "buffers": len(self._buffers),
+                "in_use": sum(1 for _, held in self._holds.values() if held),
+            }
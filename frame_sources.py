@@ -0,0 +1,183 @@
+# frame_sources.py
+"""
+Camera stand-ins with the cv2.VideoCapture methods the app uses (isOpened,
+read, get, set, release), so CameraWidget, CaptureWorker and the benchmarks
+run without webcams.
+
+    SyntheticSource - moving test pattern at any size and fps
+    ReplaySource    - a video file played back in real time, looped
+
+Both pace read() to their fps like a real camera blocks until the next frame.
+Sources are configured by spec string, e.g. in settings["frame_sources"]
+(camera index -> spec):
+    "synthetic:640x480@30"
+    "file:C:/clips/trail.mp4@20"     (fps optional; defaults to the file's)
+"""
+import time
+
+import cv2
+import numpy as np
+
+
+class _PacedSource:
+    """Frame pacing and the VideoCapture property surface shared by the sources."""
+
+    def __init__(self, width, height, fps):
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = max(1.0, float(fps))
+        self.frame_index = 0
+        self._next_ts = None
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+    def _pace(self):
+        now = time.monotonic()
+        if self._next_ts is None or now - self._next_ts > 1.0:
+            # first frame, or resuming after a long stall: restart the clock
+            self._next_ts = now
+        elif now < self._next_ts:
+            time.sleep(self._next_ts - now)
+        self._next_ts += 1.0 / self.fps
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frame_index)
+        return 0.0
+
+    def set(self, prop, value):
+        # accept a negotiated mode like a driver would
+        if prop == cv2.CAP_PROP_FRAME_WIDTH and value > 0:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT and value > 0:
+            self.height = int(value)
+        elif prop == cv2.CAP_PROP_FPS and value > 0:
+            self.fps = float(value)
+        else:
+            return False
+        return True
+
+    def _output(self, frame, image):
+        """Hand out frame, into image when it has the right shape (cap.read(image=...))."""
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            return image
+        return frame.copy()
+
+
+class SyntheticSource(_PacedSource):
+    """
+    Moving diagonal gradient with a bouncing block: every frame differs, so
+    encoders and the motion detector see realistic work. The pattern is built
+    once per size; each read is a window copy out of it.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, seed=0):
+        super().__init__(width, height, fps)
+        self.seed = seed
+        self._pattern = None
+
+    def _build(self):
+        w, h = self.width, self.height
+        xs = np.linspace(0, 255, 2 * w, dtype=np.float32)
+        ys = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+        base = (xs[None, :] * 0.6 + ys * 0.4) % 256
+        pattern = np.dstack([base, np.roll(base, w // 3, axis=1), 255 - base])
+        rng = np.random.default_rng(self.seed)
+        pattern += rng.normal(0, 6, pattern.shape).astype(np.float32)
+        self._pattern = np.clip(pattern, 0, 255).astype(np.uint8)
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        if self._pattern is None or self._pattern.shape[:2] != (self.height, 2 * self.width):
+            self._build()
+        self._pace()
+        w, h = self.width, self.height
+        off = (self.frame_index * 4) % w
+        frame = self._output(self._pattern[:, off:off + w], image)
+        # a block bouncing across the frame
+        bw, bh = max(8, w // 8), max(8, h // 6)
+        span = max(1, w - bw)
+        x = self.frame_index * 6 % (2 * span)
+        x = x if x < span else 2 * span - x
+        y = h // 2 - bh // 2
+        frame[y:y + bh, x:x + bw] = 255
+        self.frame_index += 1
+        return True, frame
+
+
+class ReplaySource(_PacedSource):
+    """A video file played at its own (or the given) frame rate, looping at the end."""
+
+    def __init__(self, path, fps=None, loop=True):
+        self.path = path
+        self.loop = loop
+        self._cap = cv2.VideoCapture(path)
+        file_fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        super().__init__(
+            self._cap.get(cv2.CAP_PROP_FRAME_WIDTH), self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT), fps or file_fps
+        )
+        self._opened = self._cap.isOpened()
+        self._native = (self.width, self.height)
+        self._scaled = None
+
+    def read(self, image=None):
+        if not self._opened:
+            return False, None
+        self._pace()
+        native = (self.width, self.height) == self._native
+        # at native size the decoder can fill the caller's buffer directly
+        ret, frame = self._cap.read(image if native else None)
+        if not ret and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read(image if native else None)
+        if not ret:
+            return False, None
+        self.frame_index += 1
+        if native:
+            return True, frame
+        # a profile asked for another size: scale like a camera mode change would
+        if self._scaled is None or self._scaled.shape[:2] != (self.height, self.width):
+            self._scaled = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        cv2.resize(frame, (self.width, self.height), dst=self._scaled, interpolation=cv2.INTER_LINEAR)
+        return True, self._output(self._scaled, image)
+
+    def release(self):
+        super().release()
+        self._cap.release()
+
+
+def parse_spec(spec):
+    """'synthetic:640x480@30' / 'file:path@fps' -> (kind, arg, fps or None)."""
+    kind, _, rest = spec.partition(":")
+    arg, fps = rest, None
+    if "@" in rest:
+        arg, _, fps_text = rest.rpartition("@")
+        try:
+            fps = float(fps_text)
+        except ValueError:
+            arg, fps = rest, None
+    return kind.strip().lower(), arg.strip(), fps
+
+
+def open_source(spec):
+    """Frame source for a spec string; raises ValueError for an unknown kind."""
+    kind, arg, fps = parse_spec(spec)
+    if kind == "synthetic":
+        w, h = (int(v) for v in (arg or "640x480").lower().split("x"))
+        return SyntheticSource(w, h, fps or 30.0)
+    if kind == "file":
+        return ReplaySource(arg, fps)
+    raise ValueError(f"Unknown frame source: {spec}")
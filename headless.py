@@ -0,0 +1,322 @@
+# headless.py
+"""
+Record without the UI: no Qt, no previews, just capture threads and the
+recorders, configured from settings.json like the app.
+
+    python headless.py [--cameras 0,1] [--save-path D:/trail] [--stats 10] [--idle]
+    SoloSight.exe --headless ...
+
+Recording starts right away unless --idle is given. Control it with a line on
+stdin ("start", "stop", "rotate", "stats", "quit") or, where the OS has them,
+signals: SIGUSR1 start, SIGUSR2 stop, SIGHUP rotate, SIGINT/SIGTERM quit
+(SIGBREAK, Ctrl+Break, rotates on Windows).
+"""
+import argparse
+import queue
+import signal
+import sys
+import threading
+import time
+
+from capture_profiles import open_configured
+from capture_worker import CaptureWorker
+from metrics import MetricsExporter, MetricsRegistry
+from mosaic import MosaicRecorder
+from motion import MotionRecorder
+from prebuffer import PreEventBuffer
+from recorder import CameraRecorder
+from settings_manager import load_settings
+from storage import StorageManager
+from transcode import TranscodeQueue
+
+COMMANDS = ("start", "stop", "rotate", "stats", "quit")
+
+
+class HeadlessCamera:
+    """One camera's capture thread, pre-event buffer and recorder, without a widget."""
+
+    def __init__(self, cam_index, settings, metrics=None):
+        self.cam_index = cam_index
+        self.settings = settings
+        self.metrics = metrics
+        self.worker = None
+        self.prebuffer = None
+        self.recorder = None
+        self.motion = None
+        self._rec_sub = None
+
+    def open(self):
+        cap, _, mode = open_configured(self.settings, self.cam_index)
+        if cap is None:
+            return False
+        self.worker = CaptureWorker(
+            cap, self.cam_index, pool_size=self.settings.get("frame_pool_size", 16), metrics=self.metrics
+        )
+        seconds = self.settings.get("prebuffer_seconds", 0)
+        if seconds > 0:
+            self.prebuffer = PreEventBuffer(
+                self.worker.bus, self.cam_index, seconds=seconds,
+                fps=float(self.settings.get("record_target_fps", 20.0)),
+                budget_mb=self.settings.get("prebuffer_memory_mb", 64),
+            )
+            self.prebuffer.start()
+        self.worker.start()
+        if mode:
+            print(f"Cam {self.cam_index}: {mode['fourcc'] or '?'} {mode['width']}x{mode['height']} @ {mode['fps']:g}")
+        return True
+
+    @property
+    def recording(self):
+        return self.recorder is not None or self.motion is not None
+
+    def _make_recorder(self, save_dir, storage):
+        motion = self.settings.get("record_trigger") == "motion"
+        return CameraRecorder.from_settings(
+            save_dir, self.cam_index, self.settings,
+            preroll=self.prebuffer.ring if self.prebuffer else None,
+            preroll_seconds=self.settings.get("motion_pre_roll", 5) if motion else None,
+            storage=storage,
+            metrics=self.metrics,
+            frames=self.worker.bus,
+        )
+
+    def start_recording(self, save_dir, storage=None):
+        if self.recording or not self.worker:
+            return
+        if self.settings.get("record_trigger") == "motion":
+            sens = (self.settings.get("motion_sensitivities") or {}).get(
+                str(self.cam_index), self.settings.get("motion_sensitivity", 0.5))
+            self.motion = MotionRecorder(
+                self.worker.bus, self.cam_index, lambda: self._make_recorder(save_dir, storage),
+                sensitivity=float(sens), post_roll=self.settings.get("motion_post_roll", 5),
+                fps=self.settings.get("motion_fps", 5),
+            )
+            self.motion.start()
+            return
+        recorder = self._make_recorder(save_dir, storage)
+        recorder.start()
+        self._rec_sub = self.worker.bus.subscribe(
+            "recorder", policy="callback", fn=lambda frame, ts: recorder.write_frame(frame, ts)
+        )
+        self.recorder = recorder
+
+    def stop_recording(self):
+        if self.motion:
+            self.motion.stop()
+            self.motion = None
+        if self._rec_sub:
+            self.worker.bus.unsubscribe(self._rec_sub)
+            self._rec_sub = None
+        if self.recorder:
+            self.recorder.stop()
+            self.recorder = None
+
+    def rotate(self):
+        recorder = self.motion.recorder if self.motion else self.recorder
+        if recorder:
+            recorder.rotate()
+
+    def close(self):
+        self.stop_recording()
+        if self.prebuffer:
+            self.prebuffer.stop()
+            self.prebuffer = None
+        if self.worker:
+            self.worker.stop()
+            self.worker = None
+
+
+class HeadlessRecorder:
+    """
+    All enabled cameras recording to save_path, driven by commands.
+    Use:
+        h = HeadlessRecorder(load_settings())
+        h.open()
+        h.run(record=True)  # until "quit" / SIGINT
+    """
+
+    def __init__(self, settings, save_path=None, cameras=None, stats_interval=10.0):
+        self.settings = settings
+        self.save_path = save_path or settings.get("save_path", "recordings")
+        self.stats_interval = max(1.0, float(stats_interval))
+        if cameras is None:
+            cameras = sorted(int(k) for k, on in (settings.get("enabled_cameras") or {}).items() if on)
+            cameras += [int(k) for k in (settings.get("frame_sources") or {}) if int(k) not in cameras]
+        self.cam_indices = cameras
+        self.cameras = []
+        self.storage = None
+        self.mosaic = None
+        self.metrics = MetricsRegistry()
+        self.exporter = MetricsExporter(
+            self.metrics, self.save_path,
+            interval=settings.get("metrics_interval", 10), fmt=settings.get("metrics_export", "jsonl"),
+        )
+        self.transcoder = None
+        if settings.get("transcode_enabled", False):
+            self.transcoder = TranscodeQueue(
+                self.save_path, codec=settings.get("transcode_codec", "h264"),
+                workers=settings.get("transcode_workers", 1), cpu_limit=settings.get("transcode_cpu_limit", 70),
+                recording=lambda: self.recording, storage=lambda: self.storage,
+            )
+        self.commands = queue.Queue()
+        self._last = {}  # cam_index -> (time, frames captured, frames written) at the last stats line
+
+    def open(self):
+        for cam_index in self.cam_indices:
+            cam = HeadlessCamera(cam_index, self.settings, metrics=self.metrics.camera(cam_index))
+            if cam.open():
+                self.cameras.append(cam)
+            else:
+                print(f"Cam {cam_index}: failed to open")
+        if self.transcoder:
+            self.transcoder.start()
+        return bool(self.cameras)
+
+    @property
+    def recording(self):
+        return self.mosaic is not None or any(cam.recording for cam in self.cameras)
+
+    def start(self):
+        if self.recording:
+            return
+        # loop mode: one shared index so quotas apply across all cameras (None otherwise, nothing is deleted)
+        self.storage = StorageManager.from_settings(self.save_path, self.settings)
+        if self.storage:
+            self.storage.enforce()
+        if self.settings.get("mosaic_recording", False):
+            fps = float(self.settings.get("record_target_fps", 20.0))
+            recorder = CameraRecorder.from_settings(
+                self.save_path, "mosaic", self.settings, fps=fps, fps_mode="pace", queue_size=8,
+                storage=self.storage, metrics=self.metrics.camera("mosaic"),
+            )
+            recorder.start()
+            cell_w, cell_h = self.settings.get("mosaic_cell_size", [640, 480])
+            self.mosaic = MosaicRecorder(recorder, fps=fps, cell_size=(int(cell_w), int(cell_h)))
+            labels = self.settings.get("camera_labels_map") or {}
+            self.mosaic.set_sources([
+                (cam.cam_index, labels.get(str(cam.cam_index)) or f"Cam {cam.cam_index}", cam.worker.bus)
+                for cam in self.cameras
+            ])
+            self.mosaic.start()
+        else:
+            for cam in self.cameras:
+                cam.start_recording(self.save_path, self.storage)
+        # metrics are only written while recording
+        self.exporter.start()
+        print(f"Recording {len(self.cameras)} camera(s) to {self.save_path}")
+
+    def stop(self):
+        if not self.recording:
+            return
+        if self.mosaic:
+            self.mosaic.stop()
+            self.mosaic = None
+        for cam in self.cameras:
+            cam.stop_recording()
+        self.exporter.stop()
+        if self.transcoder:
+            self.transcoder.scan()
+        print("Recording stopped")
+
+    def rotate(self):
+        if self.mosaic:
+            self.mosaic.recorder.rotate()
+        for cam in self.cameras:
+            cam.rotate()
+        print("Rotating to new chunks")
+
+    def print_stats(self):
+        now = time.monotonic()
+        for cam in self.cameras:
+            stats = cam.worker.stats()
+            recorder = self.mosaic.recorder if self.mosaic else (cam.motion.recorder if cam.motion else cam.recorder)
+            rec = recorder.stats() if recorder else None
+            written = rec["frames_written"] if rec else 0
+            t, captured0, written0 = self._last.get(cam.cam_index, (now, stats["frames_captured"], written))
+            dt = now - t
+            line = f"Cam {cam.cam_index}: capture {self.metrics.camera(cam.cam_index).capture_fps():5.1f} fps"
+            if rec:
+                write_fps = (written - written0) / dt if dt > 0 and written >= written0 else 0.0
+                line += (f" | write {write_fps:5.1f} fps | queue {rec['queue_depth']}/{rec['queue_size']}"
+                         f" | dropped {rec['frames_dropped']} | {rec['bytes_written'] / 1e6:.1f} MB")
+            elif cam.motion:
+                m = cam.motion.stats()
+                line += f" | armed, motion {m['score']:.3f}/{m['trigger']:.3f}"
+            if stats["read_failures"]:
+                line += f" | read failures {stats['read_failures']}"
+            print(line)
+            self._last[cam.cam_index] = (now, stats["frames_captured"], written)
+        sys.stdout.flush()
+
+    def _install_signals(self):
+        handlers = {"SIGUSR1": "start", "SIGUSR2": "stop", "SIGHUP": "rotate", "SIGBREAK": "rotate",
+                    "SIGINT": "quit", "SIGTERM": "quit"}
+        for name, command in handlers.items():
+            sig = getattr(signal, name, None)
+            if sig is not None:
+                signal.signal(sig, lambda *_, c=command: self.commands.put(c))
+
+    def _read_stdin(self):
+        for line in sys.stdin:
+            command = line.strip().lower()
+            if command in COMMANDS:
+                self.commands.put(command)
+            elif command:
+                print(f"Unknown command {command!r}; use one of: {', '.join(COMMANDS)}")
+
+    def run(self, record=True):
+        self._install_signals()
+        threading.Thread(target=self._read_stdin, name="headless-stdin", daemon=True).start()
+        if record:
+            self.start()
+        next_stats = time.monotonic() + self.stats_interval
+        try:
+            while True:
+                try:
+                    # short timeout so Python gets to run signal handlers on Windows too
+                    command = self.commands.get(timeout=min(0.5, max(0.0, next_stats - time.monotonic())))
+                except queue.Empty:
+                    command = None
+                if command == "quit":
+                    break
+                if command == "start":
+                    self.start()
+                elif command == "stop":
+                    self.stop()
+                elif command == "rotate":
+                    self.rotate()
+                if command == "stats" or time.monotonic() >= next_stats:
+                    self.print_stats()
+                    next_stats = time.monotonic() + self.stats_interval
+        finally:
+            self.close()
+
+    def close(self):
+        self.stop()
+        for cam in self.cameras:
+            cam.close()
+        self.cameras = []
+        self.exporter.stop()
+        if self.transcoder:
+            self.transcoder.stop()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Record the enabled cameras without the UI.")
+    ap.add_argument("--cameras", help="comma separated camera indices (default: enabled cameras)")
+    ap.add_argument("--save-path", help="recordings folder (default: save_path setting)")
+    ap.add_argument("--stats", type=float, default=10.0, help="seconds between stats lines")
+    ap.add_argument("--idle", action="store_true", help="don't record until told to start")
+    args = ap.parse_args(argv)
+
+    cameras = [int(v) for v in args.cameras.split(",")] if args.cameras else None
+    h = HeadlessRecorder(load_settings(), save_path=args.save_path, cameras=cameras, stats_interval=args.stats)
+    if not h.open():
+        print("No cameras could be opened")
+        return 1
+    h.run(record=not args.idle)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
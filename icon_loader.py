@@ -1,11 +1,16 @@
 import os
 import sys
-from PyQt5.QtGui import QIcon
+from PyQt5.QtGui import QGuiApplication, QIcon
 import theme
 
 # Project-relative icons folder
 ICON_DIR = os.path.join(os.path.dirname(__file__), "icons")
 
+# (name, size) -> QIcon; every tile asks for the same few icons
+_cache = {}
+# icon name -> path, from one listing of ICON_DIR
+_paths = None
+
 def resource_path(relative_path: str) -> str:
     """Return absolute path to resource; works in dev and PyInstaller."""
     try:
@@ -15,15 +20,41 @@ def resource_path(relative_path: str) -> str:
         base_path = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(base_path, relative_path)
 
+def _icon_paths():
+    global _paths
+    if _paths is None:
+        try:
+            _paths = {
+                os.path.splitext(f)[0]: os.path.join(ICON_DIR, f) for f in os.listdir(ICON_DIR) if f.endswith(".svg")
+            }
+        except OSError:
+            _paths = {}
+    return _paths
+
 def icon(name: str, size: int = None) -> QIcon:
     """
     Load an SVG icon from the /icons folder inside the project.
-    If size is provided, returns the icon as-is (size handled in QPushButton setIconSize).
+    With a size, the SVG is rasterized once at that size (and the screen's
+    pixel ratio) and the same QIcon is returned on every later call;
+    without one the icon is left to Qt's SVG engine.
     """
-    path = os.path.join(ICON_DIR, f"{name}.svg")
-    if not os.path.exists(path):
-        print(f"Icon not found: {path}")
-        return QIcon()
-    qicon = QIcon(path)
+    key = (name, size)
+    qicon = _cache.get(key)
+    if qicon is not None:
+        return qicon
+    path = _icon_paths().get(name)
+    if path is None:
+        print(f"Icon not found: {os.path.join(ICON_DIR, name + '.svg')}")
+        qicon = QIcon()
+    elif size:
+        app = QGuiApplication.instance()
+        ratio = app.devicePixelRatio() if app is not None else 1.0
+        # full device pixels on HiDPI screens, laid out at `size` logical pixels
+        pixels = round(size * ratio)
+        pixmap = QIcon(path).pixmap(pixels, pixels)
+        pixmap.setDevicePixelRatio(ratio)
+        qicon = QIcon(pixmap)
+    else:
+        qicon = QIcon(path)
+    _cache[key] = qicon
     return qicon
-
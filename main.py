@@ -1,13 +1,25 @@
 # main.py
+import startup_profile  # first: its import is the startup clock's zero
+import multiprocessing
 import sys
-from PyQt5.QtWidgets import QApplication
-from ui_main import MainWindow
 
 def main():
+    if "--headless" in sys.argv:
+        # recording only: no window, no previews, Qt is never imported (see headless.py)
+        import headless
+        sys.exit(headless.main([a for a in sys.argv[1:] if a not in ("--headless", "--profile-startup")]))
+    from PyQt5.QtWidgets import QApplication
+    startup_profile.mark("qt_imported")
+    from ui_main import MainWindow
+    startup_profile.mark("ui_imported")
     app = QApplication(sys.argv)
+    startup_profile.mark("qapp")
     w = MainWindow()
+    startup_profile.mark("window_built")
     w.show()
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # encoder processes are spawned from this executable in frozen builds
+    multiprocessing.freeze_support()
     main()
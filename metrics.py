@@ -0,0 +1,221 @@
+# metrics.py
+"""
+Per-camera pipeline metrics.
+
+Hot paths record into a CameraMetrics (read latency, render and encode time,
+capture timestamps); everything else (drops, queue depth, bytes written) is
+pulled from the components' own stats() when a snapshot is taken. While
+recording, a MetricsExporter thread appends snapshots to metrics.jsonl (rotated
+to metrics.jsonl.1 at METRICS_MAX_BYTES, so at most twice that is kept) and/or
+rewrites metrics.prom (Prometheus text format) in the recordings folder, so a
+trip's field problems can be read back afterwards.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+EXPORT_FORMATS = ("off", "jsonl", "prom", "both")
+# metrics.jsonl is moved to metrics.jsonl.1 (replacing the older one) once it reaches this size
+METRICS_MAX_BYTES = 5 * 1024 * 1024
+
+
+class LatencyWindow:
+    """The last `size` samples (ms) in a fixed numpy ring, for percentiles."""
+
+    def __init__(self, size=512):
+        self._values = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, ms):
+        with self._lock:
+            self._values[self._next] = ms
+            self._next = (self._next + 1) % self._values.size
+            self._count = min(self._count + 1, self._values.size)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        with self._lock:
+            if not self._count:
+                return {f"p{q}": None for q in qs}
+            values = np.percentile(self._values[:self._count], qs)
+        return {f"p{q}": round(float(v), 3) for q, v in zip(qs, values)}
+
+
+class RateMeter:
+    """Events per second over a sliding window of timestamps."""
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self._stamps = np.zeros(256, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def tick(self, ts):
+        with self._lock:
+            self._stamps[self._next] = ts
+            self._next = (self._next + 1) % self._stamps.size
+            self._count = min(self._count + 1, self._stamps.size)
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._count < 2:
+                return 0.0
+            stamps = self._stamps[:self._count]
+            recent = stamps[stamps >= now - self.window]
+        if recent.size < 2:
+            return 0.0
+        span = recent.max() - recent.min()
+        return (recent.size - 1) / span if span > 0 else 0.0
+
+
+class CameraMetrics:
+    """
+    Metrics of one camera. The capture worker, tile and recorder record into
+    read_ms / render_ms / encode_ms / rollover_ms / capture; `collect` returns the counters
+    of the live components (set by whoever owns them).
+    """
+
+    def __init__(self, cam_index):
+        self.cam_index = cam_index
+        self.read_ms = LatencyWindow()
+        self.render_ms = LatencyWindow()
+        self.encode_ms = LatencyWindow()
+        self.rollover_ms = LatencyWindow()  # writer stall at chunk boundaries
+        self.capture = RateMeter()
+        self.collect = None
+
+    def capture_fps(self):
+        return self.capture.rate()
+
+    def snapshot(self):
+        out = {
+            "capture_fps": round(self.capture_fps(), 2),
+            "read_ms": self.read_ms.percentiles(),
+            "render_ms": self.render_ms.percentiles(),
+            "encode_ms": self.encode_ms.percentiles(),
+            "rollover_ms": self.rollover_ms.percentiles(),
+        }
+        if self.collect is not None:
+            try:
+                out.update(self.collect())
+            except Exception as e:
+                out["collect_error"] = str(e)
+        return out
+
+
+class MetricsRegistry:
+    """CameraMetrics by camera index (or any key, e.g. "mosaic")."""
+
+    def __init__(self):
+        self._cameras = {}
+        self._lock = threading.Lock()
+
+    def camera(self, cam_index):
+        with self._lock:
+            if cam_index not in self._cameras:
+                self._cameras[cam_index] = CameraMetrics(cam_index)
+            return self._cameras[cam_index]
+
+    def remove(self, cam_index):
+        with self._lock:
+            self._cameras.pop(cam_index, None)
+
+    def snapshot(self):
+        with self._lock:
+            cameras = list(self._cameras.values())
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "cameras": {str(m.cam_index): m.snapshot() for m in cameras},
+        }
+
+
+def _samples(name, value, labels):
+    """(metric, labels, number) for a snapshot value; percentile dicts become quantile labels."""
+    if isinstance(value, bool):
+        yield name, labels, int(value)
+    elif isinstance(value, (int, float)):
+        yield name, labels, value
+    elif isinstance(value, dict):
+        for key, v in value.items():
+            if key[:1] == "p" and key[1:].isdigit():
+                yield from _samples(name, v, f'{labels},quantile="0.{key[1:]}"')
+            else:
+                yield from _samples(f"{name}_{key}", v, labels)
+
+
+def to_prometheus(snapshot):
+    """Prometheus text exposition of a registry snapshot (non-numeric values are left out)."""
+    metrics = {}
+    for cam, values in snapshot["cameras"].items():
+        for key, value in values.items():
+            for name, labels, v in _samples(f"solosight_{key}", value, f'camera="{cam}"'):
+                metrics.setdefault(name, []).append(f"{name}{{{labels}}} {v}")
+    lines = []
+    for name, samples in metrics.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """Writes a registry snapshot every `interval` seconds to save_dir."""
+
+    def __init__(self, registry, save_dir, interval=10.0, fmt="jsonl"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown metrics format: {fmt}")
+        self.registry = registry
+        self.save_dir = save_dir
+        self.interval = max(1.0, float(interval))
+        self.fmt = fmt
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.exports = 0
+
+    def start(self):
+        if self._thread is not None or self.fmt == "off":
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        snapshot = self.registry.snapshot()
+        try:
+            os.makedirs(self.save_dir, exist_ok=True)
+            if self.fmt in ("jsonl", "both"):
+                path = os.path.join(self.save_dir, "metrics.jsonl")
+                try:
+                    if os.path.getsize(path) >= METRICS_MAX_BYTES:
+                        os.replace(path, path + ".1")
+                except OSError:
+                    pass
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(snapshot) + "\n")
+            if self.fmt in ("prom", "both"):
+                path = os.path.join(self.save_dir, "metrics.prom")
+                tmp = path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(to_prometheus(snapshot))
+                os.replace(tmp, path)
+            self.exports += 1
+        except Exception as e:
+            print("Failed to export metrics:", e)
+
+    def stop(self, timeout=1.0):
+        """Stop the thread; a final snapshot is written so short sessions are covered too."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+            self.export()
@@ -0,0 +1,136 @@
+# mosaic.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from overlay import TextOverlay, fit_size
+
+
+class MosaicRecorder:
+    """
+    Records all cameras as one grid video. A fixed clock takes the latest frame
+    from each camera's FrameBus, scales it into its cell of a preallocated
+    canvas and hands the canvas to a single CameraRecorder, so every camera is
+    on the same timestamp, in the same file, with one encoder and one rollover.
+
+    Use:
+        m = MosaicRecorder(recorder, fps=20)
+        m.set_sources([(cam_index, label, bus), ...])
+        m.start()
+        m.stop()  # also stops the recorder
+    """
+
+    def __init__(self, recorder, fps=20.0, cell_size=(640, 480), cols=2):
+        self.recorder = recorder
+        self.fps = max(1.0, float(fps))
+        self.cell_w, self.cell_h = cell_size
+        self.cols = max(1, int(cols))
+
+        self._lock = threading.Lock()
+        self._sources = []     # (cam_index, bus, subscription, TextOverlay)
+        self._canvases = []
+        self._next_canvas = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # counters (read with stats())
+        self.ticks = 0
+        self.late_ticks = 0
+        self.stale_cells = 0
+
+    def set_sources(self, sources):
+        """(Re)attach to cameras: iterable of (cam_index, label, bus). Safe while running."""
+        with self._lock:
+            for _, bus, sub, _ in self._sources:
+                bus.unsubscribe(sub)
+            self._sources = []
+            for cam_index, label, bus in sources:
+                text = TextOverlay()
+                text.set_text(label)
+                self._sources.append((cam_index, bus, bus.subscribe("mosaic"), text))
+            self._alloc_canvases()
+
+    def _alloc_canvases(self):
+        n = max(1, len(self._sources))
+        rows = (n + self.cols - 1) // self.cols
+        cols = min(n, self.cols)
+        shape = (rows * self.cell_h, cols * self.cell_w, 3)
+        # The recorder queues canvases by reference, so rotate through enough of
+        # them that one is never redrawn while the recorder still holds it: every
+        # queue slot, the one being encoded, the one being drawn here, and the
+        # last written one it keeps as _last_frame to repeat for pace-mode duplicates.
+        count = self.recorder.queue_size + 3
+        self._canvases = [np.zeros(shape, dtype=np.uint8) for _ in range(count)]
+        self._next_canvas = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="mosaic", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            if now < next_tick:
+                self._stop_event.wait(next_tick - now)
+                continue
+            if now - next_tick > interval:
+                # fell more than a tick behind: skip ahead instead of bursting
+                self.late_ticks += 1
+                next_tick = now
+            ts = next_tick
+            next_tick += interval
+            with self._lock:
+                canvas = self._compose()
+            if canvas is not None:
+                self.recorder.write_frame(canvas, ts)
+            self.ticks += 1
+
+    def _compose(self):
+        if not self._canvases:
+            return None
+        canvas = self._canvases[self._next_canvas]
+        self._next_canvas = (self._next_canvas + 1) % len(self._canvases)
+        for i, (cam_index, bus, sub, text) in enumerate(self._sources):
+            y0 = (i // self.cols) * self.cell_h
+            x0 = (i % self.cols) * self.cell_w
+            cell = canvas[y0:y0 + self.cell_h, x0:x0 + self.cell_w]
+            frame, _ = sub.latest()
+            if frame is None:
+                self.stale_cells += 1
+                cell[...] = 0
+            else:
+                src_h, src_w = frame.shape[:2]
+                w, h = fit_size(src_w, src_h, self.cell_w, self.cell_h)
+                if (w, h) != (self.cell_w, self.cell_h):
+                    cell[...] = 0  # letterbox
+                oy, ox = (self.cell_h - h) // 2, (self.cell_w - w) // 2
+                cv2.resize(frame, (w, h), dst=cell[oy:oy + h, ox:ox + w], interpolation=cv2.INTER_LINEAR)
+            text.draw(cell, 8, 18)
+        return canvas
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "stale_cells": self.stale_cells,
+            "cameras": [s[0] for s in self._sources],
+            "recorder": self.recorder.stats(),
+        }
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            for _, bus, sub, _ in self._sources:
+                bus.unsubscribe(sub)
+            self._sources = []
+        self.recorder.stop()
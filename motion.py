@@ -0,0 +1,192 @@
+# motion.py
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+def sensitivity_thresholds(sensitivity):
+    """(pixel difference, fraction of the frame) that count as motion for a 0..1 sensitivity."""
+    s = min(1.0, max(0.0, float(sensitivity)))
+    return int(12 + (1.0 - s) * 40), 0.002 + (1.0 - s) * 0.05
+
+
+class MotionDetector:
+    """
+    Cheap activity score for one camera. Frames from its FrameBus are sampled
+    down to `fps`, shrunk to a tiny grayscale image and compared against a
+    running-average background; the score is the fraction of pixels that
+    changed by more than the pixel threshold. Everything runs in OpenCV on
+    preallocated buffers on this object's own thread, so the capture thread
+    only pays for a queue append.
+
+    listener(score, active, ts) is called after every sample.
+    """
+
+    def __init__(self, bus, cam_index, sensitivity=0.5, fps=5.0, size=(80, 60), listener=None):
+        self.bus = bus
+        self.cam_index = cam_index
+        self.sensitivity = sensitivity
+        self.pixel_threshold, self.trigger = sensitivity_thresholds(sensitivity)
+        self.fps = max(0.5, float(fps))
+        self.size = size
+        self.listener = listener
+
+        w, h = size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._gray = np.empty((h, w), dtype=np.uint8)
+        self._bg = None                                   # float32 running average
+        self._bg8 = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._interval = 1.0 / self.fps
+        self._next_ts = None
+        self._sub = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # read with stats()
+        self.score = 0.0
+        self.active = False
+        self.samples = 0
+        self.cost_ms = 0.0     # smoothed detector time per sampled frame
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._sub = self.bus.subscribe("motion", policy="queue", maxsize=2, drop="oldest")
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"motion-cam{self.cam_index}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        sub = self._sub
+        while not self._stop_event.is_set():
+            frame, ts = sub.get(timeout=0.2)
+            if frame is None:
+                continue
+            if self._next_ts is not None and ts < self._next_ts:
+                continue
+            self._next_ts = ts + self._interval
+            t0 = time.perf_counter()
+            self.score = self._score(frame)
+            self.active = self.score >= self.trigger
+            self.cost_ms += ((time.perf_counter() - t0) * 1000.0 - self.cost_ms) * 0.1
+            self.samples += 1
+            if self.listener is not None:
+                self.listener(self.score, self.active, ts)
+
+    def _score(self, frame):
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        cv2.GaussianBlur(self._gray, (5, 5), 0, dst=self._gray)
+        if self._bg is None or self._bg.shape != self._gray.shape:
+            self._bg = self._gray.astype(np.float32)
+            return 0.0
+        cv2.convertScaleAbs(self._bg, dst=self._bg8)
+        cv2.absdiff(self._gray, self._bg8, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)
+        # slow background: lighting drifts are absorbed, people walking through are not
+        cv2.accumulateWeighted(self._gray, self._bg, 0.05)
+        return cv2.countNonZero(self._diff) / self._diff.size
+
+    def stats(self):
+        return {
+            "score": round(self.score, 4),
+            "trigger": round(self.trigger, 4),
+            "sensitivity": self.sensitivity,
+            "active": self.active,
+            "samples": self.samples,
+            "cost_ms": round(self.cost_ms, 3),
+            "dropped": self._sub.stats()["dropped"] if self._sub is not None else 0,
+        }
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # after the thread: unsubscribing gives back the frame it was working on
+        if self._sub is not None:
+            self.bus.unsubscribe(self._sub)
+            self._sub = None
+
+
+class MotionRecorder:
+    """
+    Motion-triggered recording for one camera. While armed, a CameraRecorder
+    from make_recorder() is started when the detector sees activity and
+    stopped once there has been none for post_roll seconds. Pre-roll comes
+    from the recorder's preroll ring (see CameraRecorder preroll_seconds).
+    Use:
+        m = MotionRecorder(bus, cam_index, make_recorder, sensitivity=0.5, post_roll=5)
+        m.start()  # arm
+        m.stop()   # disarm, finishing any event in progress
+    """
+
+    def __init__(self, bus, cam_index, make_recorder, sensitivity=0.5, post_roll=5.0, fps=5.0):
+        self.bus = bus
+        self.cam_index = cam_index
+        self.make_recorder = make_recorder
+        self.post_roll = max(0.0, float(post_roll))
+        self.detector = MotionDetector(bus, cam_index, sensitivity, fps, listener=self._on_sample)
+        self._lock = threading.Lock()
+        self.recorder = None
+        self._rec_sub = None
+        self._last_motion_ts = None
+        self._armed = False
+        self.events = 0
+
+    @property
+    def recording(self):
+        return self.recorder is not None
+
+    def start(self):
+        self._armed = True
+        self.detector.start()
+
+    def _on_sample(self, score, active, ts):
+        with self._lock:
+            if not self._armed:
+                return
+            if active:
+                self._last_motion_ts = ts
+                if self.recorder is None:
+                    self._start_event()
+            elif self.recorder is not None and ts - self._last_motion_ts >= self.post_roll:
+                self._end_event()
+
+    def _start_event(self):
+        recorder = self.make_recorder()
+        recorder.start()
+        self._rec_sub = self.bus.subscribe(
+            "recorder", policy="callback", fn=lambda frame, ts: recorder.write_frame(frame, ts)
+        )
+        self.recorder = recorder
+        self.events += 1
+
+    def _end_event(self, wait=False):
+        self.bus.unsubscribe(self._rec_sub)
+        self._rec_sub = None
+        recorder, self.recorder = self.recorder, None
+        if wait:
+            recorder.stop()
+        else:
+            # draining the encoder queue must not stall detection
+            threading.Thread(target=recorder.stop, name=f"motion-stop-cam{self.cam_index}", daemon=True).start()
+
+    def stats(self):
+        out = self.detector.stats()
+        out["events"] = self.events
+        out["recording"] = self.recording
+        if self.recorder is not None:
+            out["recorder"] = self.recorder.stats()
+        return out
+
+    def stop(self):
+        with self._lock:
+            self._armed = False
+        self.detector.stop()
+        with self._lock:
+            if self.recorder is not None:
+                self._end_event(wait=True)
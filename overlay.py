@@ -0,0 +1,73 @@
+# overlay.py
+import cv2
+import numpy as np
+
+
+def fit_size(src_w, src_h, dst_w, dst_h):
+    """Largest (w, h) with the source aspect ratio that fits dst (like Qt.KeepAspectRatio)."""
+    if src_w <= 0 or src_h <= 0 or dst_w <= 0 or dst_h <= 0:
+        return 0, 0
+    scale = min(dst_w / src_w, dst_h / src_h)
+    return max(1, int(src_w * scale)), max(1, int(src_h * scale))
+
+
+class TextOverlay:
+    """
+    One line of text rasterized once into an alpha patch and blended onto
+    frames. cv2.putText only runs again when the text changes; drawing is a
+    small in-place blend into preallocated scratch, so it costs almost nothing
+    per tick. Draw onto a display or scratch buffer, never the shared camera frame.
+    """
+
+    def __init__(self, font_scale=0.6, thickness=1, color=(255, 255, 255)):
+        self.font_scale = font_scale
+        self.thickness = thickness
+        self.color = color
+        self.text = None
+        self._alpha = None      # (h, w, 3) float32 coverage
+        self._inv_alpha = None  # 1 - alpha
+        self._premult = None    # color * alpha
+        self._scratch = None
+        self._baseline_offset = 0
+        self._pad = 0
+        self.rebuilds = 0
+
+    def set_text(self, text):
+        if text == self.text:
+            return
+        self.text = text
+        (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, self.font_scale, self.thickness)
+        pad = self.thickness + 1
+        ph, pw = h + baseline + 2 * pad, w + 2 * pad
+        mask = np.zeros((ph, pw), dtype=np.uint8)
+        cv2.putText(mask, text, (pad, pad + h), cv2.FONT_HERSHEY_SIMPLEX,
+                    self.font_scale, 255, self.thickness, cv2.LINE_AA)
+        # full 3-channel planes: broadcasting a (h, w, 1) plane makes numpy allocate per draw
+        self._alpha = np.repeat((mask.astype(np.float32) / 255.0)[:, :, None], 3, axis=2)
+        self._inv_alpha = 1.0 - self._alpha
+        self._premult = self._alpha * np.array(self.color, dtype=np.float32)
+        self._scratch = np.empty((ph, pw, 3), dtype=np.float32)
+        self._baseline_offset = pad + h
+        self._pad = pad
+        self.rebuilds += 1
+
+    def draw(self, buf, x, y):
+        """Blend onto buf (BGR uint8) with the text baseline at (x, y), like cv2.putText."""
+        if self._alpha is None:
+            return
+        ph, pw = self._alpha.shape[:2]
+        top, left = y - self._baseline_offset, x - self._pad
+        # clip to the buffer
+        y0, x0 = max(0, top), max(0, left)
+        y1, x1 = min(buf.shape[0], top + ph), min(buf.shape[1], left + pw)
+        if y1 <= y0 or x1 <= x0:
+            return
+        py, px = y0 - top, x0 - left
+        h, w = y1 - y0, x1 - x0
+        roi = buf[y0:y1, x0:x1]
+        scratch = self._scratch[py:py + h, px:px + w]
+        # step by step so numpy never needs a temporary for the mixed-dtype math
+        np.copyto(scratch, roi, casting="unsafe")
+        scratch *= self._inv_alpha[py:py + h, px:px + w]
+        scratch += self._premult[py:py + h, px:px + w]
+        np.copyto(roi, scratch, casting="unsafe")
@@ -0,0 +1,299 @@
+# playback.py
+"""
+Synchronized playback of recorded chunks: every camera's footage for a day
+on one timeline, seeked together through the chunk indexes (chunk_index.py).
+
+Dragging the timeline shows cached keyframe thumbnails; the full decode
+happens once the slider is released. While playing, each camera's decoder
+reads forward sequentially and only seeks when the timeline jumps.
+"""
+import math
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+import cv2
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import (
+    QComboBox, QDialog, QGridLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QVBoxLayout
+)
+
+from chunk_index import ThumbnailCache, frame_at, scan_indexes
+from overlay import TextOverlay
+from render import PreviewRenderer
+import theme
+
+SPEEDS = (1, 2, 4, 8)
+TICK_MS = 40
+SLIDER_STEPS_PER_SECOND = 10
+TILE_SIZE = (400, 300)
+
+
+class ChunkPlayer:
+    """
+    One camera's chunks, read by wall time. frame(t) decodes forward from the
+    current position when t is a little ahead (cheaper than a seek, which
+    decodes from the previous keyframe anyway) and seeks otherwise.
+    """
+
+    def __init__(self, camera, chunks):
+        self.camera = camera
+        self.chunks = sorted(chunks, key=lambda c: c["start_wall"])
+        self._starts = [c["start_wall"] for c in self.chunks]
+        self._cap = None
+        self._chunk = None
+        self._pos = 0           # frame the decoder returns next
+        self._frame = None
+        self._frame_no = -1
+        self.seeks = 0
+        self.frames_decoded = 0
+
+    def chunk_at(self, t):
+        """(chunk, frame number) covering wall time t, or (None, None)."""
+        i = bisect_right(self._starts, t) - 1
+        if i < 0:
+            return None, None
+        n = frame_at(self.chunks[i], t)
+        return (self.chunks[i], n) if n is not None else (None, None)
+
+    def next_start(self, t):
+        i = bisect_right(self._starts, t)
+        return self._starts[i] if i < len(self._starts) else None
+
+    def frame(self, t):
+        chunk, n = self.chunk_at(t)
+        if chunk is None:
+            return None, None
+        if chunk is not self._chunk:
+            self._open(chunk)
+        if n == self._frame_no:
+            return chunk, self._frame
+        # forward within a couple of GOPs: decode through instead of seeking
+        if not 0 <= n - self._pos <= 2 * max(1, int(chunk.get("keyframe_interval") or 1)):
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, n)
+            self._pos = n
+            self.seeks += 1
+        while self._pos < n:
+            self._cap.grab()
+            self._pos += 1
+        ret, img = self._cap.read()
+        self._pos += 1
+        self.frames_decoded += 1
+        if not ret:
+            return chunk, None
+        self._frame, self._frame_no = img, n
+        return chunk, img
+
+    def _open(self, chunk):
+        self.close()
+        self._cap = cv2.VideoCapture(chunk["path"])
+        self._chunk = chunk
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = None
+        self._chunk = None
+        self._pos = 0
+        self._frame = None
+        self._frame_no = -1
+
+
+class PlaybackDialog(QDialog):
+    """
+    The recordings folder is scanned on a background thread (chunks without a
+    sidecar are opened to estimate theirs); the dialog fills in when it's done.
+    Use:
+        dlg = PlaybackDialog(save_path, labels=settings["camera_labels_map"], parent=self)
+        dlg.exec_()
+    """
+    indexes_ready = pyqtSignal(list)
+
+    def __init__(self, save_dir, labels=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Playback")
+        self.setStyleSheet(f"background-color: {theme.BACKGROUND}; color: {theme.FOREGROUND};")
+        self.labels = labels or {}
+        self.save_dir = save_dir
+        self.thumbs = ThumbnailCache(save_dir)
+        self.indexes = []
+        self.days = []
+        self.players = {}       # camera -> ChunkPlayer
+        self.tiles = {}         # camera -> (QLabel, PreviewRenderer, TextOverlay)
+        self.range = (0.0, 0.0)
+        self.position = 0.0
+        self.speed = 1
+        self._last_tick = None
+
+        layout = QVBoxLayout(self)
+        top = QHBoxLayout()
+        self.combo_day = QComboBox()
+        self.combo_day.currentIndexChanged.connect(self.load_day)
+        top.addWidget(self.combo_day)
+        self.btn_play = QPushButton("Play")
+        self.btn_play.setCheckable(True)
+        self.btn_play.toggled.connect(self.set_playing)
+        top.addWidget(self.btn_play)
+        self.combo_speed = QComboBox()
+        for s in SPEEDS:
+            self.combo_speed.addItem(f"{s}x", s)
+        self.combo_speed.currentIndexChanged.connect(lambda i: setattr(self, "speed", self.combo_speed.itemData(i)))
+        top.addWidget(self.combo_speed)
+        self.lbl_time = QLabel("")
+        top.addWidget(self.lbl_time, 1)
+        layout.addLayout(top)
+
+        self.grid = QGridLayout()
+        layout.addLayout(self.grid, 1)
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.sliderMoved.connect(lambda v: self.preview_at(self._slider_time(v)))
+        self.slider.sliderReleased.connect(lambda: self.seek(self._slider_time(self.slider.value())))
+        self.slider.valueChanged.connect(self._on_slider_value)
+        layout.addWidget(self.slider)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self._tick)
+
+        self.lbl_time.setText("Scanning recordings...")
+        self.btn_play.setEnabled(False)
+        self.indexes_ready.connect(self._on_indexes)
+
+        def scan():
+            indexes = scan_indexes(save_dir)
+            try:
+                self.indexes_ready.emit(indexes)
+            except RuntimeError:
+                pass  # dialog closed and deleted meanwhile
+
+        threading.Thread(target=scan, name="playback-scan", daemon=True).start()
+
+    def _on_indexes(self, indexes):
+        self.indexes = indexes
+        self.days = sorted({datetime.fromtimestamp(i["start_wall"]).date() for i in indexes}, reverse=True)
+        if not self.days:
+            self.lbl_time.setText("No recordings in " + self.save_dir)
+            return
+        self.combo_day.blockSignals(True)
+        for day in self.days:
+            self.combo_day.addItem(day.isoformat())
+        self.combo_day.blockSignals(False)
+        self.btn_play.setEnabled(True)
+        self.load_day(0)
+
+    # --- timeline ---
+    def load_day(self, i):
+        self.set_playing(False)
+        day = self.days[i]
+        chunks = [c for c in self.indexes if datetime.fromtimestamp(c["start_wall"]).date() == day]
+        by_cam = {}
+        for c in chunks:
+            by_cam.setdefault(c["camera"], []).append(c)
+        for player in self.players.values():
+            player.close()
+        self.players = {cam: ChunkPlayer(cam, cs) for cam, cs in sorted(by_cam.items())}
+        self._build_tiles()
+        self.range = (min(c["start_wall"] for c in chunks), max(c["end_wall"] for c in chunks))
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, int((self.range[1] - self.range[0]) * SLIDER_STEPS_PER_SECOND))
+        self.slider.blockSignals(False)
+        self.seek(self.range[0])
+
+    def _build_tiles(self):
+        for label, _, _ in self.tiles.values():
+            self.grid.removeWidget(label)
+            label.deleteLater()
+        self.tiles = {}
+        cols = max(1, math.ceil(math.sqrt(len(self.players))))
+        for i, cam in enumerate(self.players):
+            label = QLabel("No recording")
+            label.setAlignment(Qt.AlignCenter)
+            label.setFixedSize(*TILE_SIZE)
+            label.setStyleSheet("background: black;")
+            overlay = TextOverlay()
+            overlay.set_text(self.labels.get(cam) or f"Cam {cam}")
+            self.grid.addWidget(label, i // cols, i % cols)
+            self.tiles[cam] = (label, PreviewRenderer(), overlay)
+
+    def _slider_time(self, value):
+        return self.range[0] + value / SLIDER_STEPS_PER_SECOND
+
+    def _on_slider_value(self, value):
+        # clicks and keyboard steps; drags are handled by sliderMoved/sliderReleased
+        if not self.slider.isSliderDown():
+            self.seek(self._slider_time(value))
+
+    def _set_position(self, t):
+        self.position = t
+        self.lbl_time.setText(datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S"))
+        self.slider.blockSignals(True)
+        self.slider.setValue(int((t - self.range[0]) * SLIDER_STEPS_PER_SECOND))
+        self.slider.blockSignals(False)
+
+    def seek(self, t):
+        self._set_position(t)
+        for cam, player in self.players.items():
+            _, frame = player.frame(t)
+            self._show(cam, frame)
+
+    def preview_at(self, t):
+        """Keyframe thumbnails at t, cheap enough to follow a dragged slider."""
+        self.position = t
+        self.lbl_time.setText(datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S"))
+        for cam, player in self.players.items():
+            chunk, n = player.chunk_at(t)
+            self._show(cam, self.thumbs.get(chunk, n) if chunk else None)
+
+    # --- playing ---
+    def set_playing(self, playing):
+        if self.btn_play.isChecked() != playing:
+            self.btn_play.setChecked(playing)  # re-enters through toggled
+            return
+        self.btn_play.setText("Pause" if playing else "Play")
+        if playing:
+            self._last_tick = time.monotonic()
+            self.timer.start(TICK_MS)
+        else:
+            self.timer.stop()
+
+    def _tick(self):
+        now = time.monotonic()
+        t = self.position + (now - self._last_tick) * self.speed
+        self._last_tick = now
+        if not any(p.chunk_at(t)[0] for p in self.players.values()):
+            # nothing recorded here: skip ahead to the next chunk of any camera
+            starts = [s for s in (p.next_start(t) for p in self.players.values()) if s is not None]
+            if not starts:
+                self.set_playing(False)
+                return
+            t = min(starts)
+        if t >= self.range[1]:
+            self.set_playing(False)
+            t = self.range[1]
+        self.seek(t)
+
+    def _show(self, cam, frame):
+        label, renderer, overlay = self.tiles[cam]
+        if frame is None:
+            label.clear()
+            label.setText("No recording")
+            return
+        qimg = renderer.render(frame, label.width(), label.height())
+        if qimg is None:
+            return
+        overlay.draw(renderer.buffer, 8, 18)
+        label.setPixmap(QPixmap.fromImage(qimg))
+
+    def closeEvent(self, event):
+        self.timer.stop()
+        for player in self.players.values():
+            player.close()
+        super().closeEvent(event)
+
+    def done(self, result):
+        self.timer.stop()
+        for player in self.players.values():
+            player.close()
+        super().done(result)
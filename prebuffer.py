@@ -0,0 +1,164 @@
+# prebuffer.py
+import threading
+
+import cv2
+import numpy as np
+
+
+class JpegRingBuffer:
+    """
+    Fixed-size ring of JPEG-encoded frames. All storage is one preallocated
+    byte arena split into equal slots, so memory use is exactly budget_bytes
+    no matter how long it runs. Frames that don't fit a slot are re-encoded at
+    lower quality, and skipped if they still don't fit.
+    """
+
+    def __init__(self, slots, budget_bytes, quality=80):
+        self.slots = max(1, int(slots))
+        self.slot_bytes = max(1024, int(budget_bytes) // self.slots)
+        self.quality = int(quality)
+
+        self._arena = np.zeros((self.slots, self.slot_bytes), dtype=np.uint8)
+        self._lengths = np.zeros(self.slots, dtype=np.int64)
+        self._ts = np.zeros(self.slots, dtype=np.float64)
+        self._head = 0      # next slot to write
+        self._count = 0
+        self._lock = threading.Lock()
+
+        # counters (read with stats())
+        self.frames_stored = 0
+        self.frames_too_big = 0
+        self.bytes_stored = 0
+
+    def push(self, frame, ts):
+        """Encode and store a BGR frame. Returns False if it didn't fit a slot."""
+        data = self._encode(frame, self.quality)
+        if data is not None and data.size > self.slot_bytes:
+            data = self._encode(frame, max(20, self.quality // 2))
+        if data is None or data.size > self.slot_bytes:
+            self.frames_too_big += 1
+            return False
+        n = data.size
+        with self._lock:
+            i = self._head
+            self._arena[i, :n] = data.ravel()
+            self._lengths[i] = n
+            self._ts[i] = ts
+            self._head = (i + 1) % self.slots
+            self._count = min(self._count + 1, self.slots)
+            self.frames_stored += 1
+            self.bytes_stored += n
+        return True
+
+    @staticmethod
+    def _encode(frame, quality):
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return data if ok else None
+
+    def read_after(self, ts=None, limit=30):
+        """
+        Return up to `limit` (jpeg_bytes, ts) entries newer than ts, oldest first.
+        Bytes are copied out, so the caller may keep them after the slot is reused.
+        """
+        out = []
+        with self._lock:
+            start = (self._head - self._count) % self.slots
+            for k in range(self._count):
+                i = (start + k) % self.slots
+                slot_ts = float(self._ts[i])
+                if ts is not None and slot_ts <= ts:
+                    continue
+                out.append((self._arena[i, :self._lengths[i]].copy(), slot_ts))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+    def stats(self):
+        with self._lock:
+            filled = np.arange(self._head - self._count, self._head) % self.slots
+            used = int(self._lengths[filled].sum())
+            span = 0.0
+            if self._count > 1:
+                newest = self._ts[(self._head - 1) % self.slots]
+                oldest = self._ts[(self._head - self._count) % self.slots]
+                span = float(newest - oldest)
+            return {
+                "slots": self.slots,
+                "slot_bytes": self.slot_bytes,
+                "budget_bytes": self.slots * self.slot_bytes,
+                "frames_buffered": self._count,
+                "bytes_used": used,
+                "seconds_buffered": round(span, 2),
+                "frames_stored": self.frames_stored,
+                "frames_too_big": self.frames_too_big,
+            }
+
+
+class PreEventBuffer:
+    """
+    Always-on buffer of the last `seconds` of a camera, fed from its FrameBus.
+    Frames are sampled down to `fps` and JPEG-encoded on this object's own
+    thread, so the capture thread only pays for a queue append.
+    CameraRecorder reads the ring when recording starts (see its preroll argument).
+    """
+
+    def __init__(self, bus, cam_index, seconds=30, fps=20.0, budget_mb=64, quality=80):
+        self.bus = bus
+        self.cam_index = cam_index
+        self.seconds = float(seconds)
+        self.fps = max(1.0, float(fps))
+        self.ring = JpegRingBuffer(
+            slots=int(self.seconds * self.fps), budget_bytes=int(budget_mb * 1024 * 1024), quality=quality
+        )
+        self._interval = 1.0 / self.fps
+        self._next_ts = None
+        self._sub = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # small queue: if JPEG encoding falls behind, newer frames matter more
+        self._sub = self.bus.subscribe("prebuffer", policy="queue", maxsize=4, drop="oldest")
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"prebuffer-cam{self.cam_index}", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        sub = self._sub
+        while not self._stop_event.is_set():
+            frame, ts = sub.get(timeout=0.2)
+            if frame is None:
+                continue
+            if self._next_ts is not None and ts < self._next_ts:
+                continue
+            # keep a steady sample clock; resync after a stall
+            if self._next_ts is None or ts - self._next_ts > self._interval:
+                self._next_ts = ts + self._interval
+            else:
+                self._next_ts += self._interval
+            self.ring.push(frame, ts)
+
+    def stats(self):
+        out = self.ring.stats()
+        if self._sub is not None:
+            out["dropped"] = self._sub.stats()["dropped"]
+        return out
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # after the thread: unsubscribing gives back the frame it was working on
+        if self._sub is not None:
+            self.bus.unsubscribe(self._sub)
+            self._sub = None
@@ -0,0 +1,190 @@
+# preview_governor.py
+import os
+import sys
+import time
+
+from PyQt5.QtCore import QTimer
+
+# Base preview interval of a tile the user is looking at, ms
+FOCUSED_MS = 30
+# CPU load of this process (fraction of all cores) above which previews slow down,
+# and below which they speed back up
+HIGH_LOAD = 0.75
+LOW_LOAD = 0.5
+# Event loop lateness of the governor's own timer that counts as "UI is struggling", ms
+LAG_MS = 50
+# Previews never slow down more than this factor because of load
+MAX_SCALE = 4.0
+# On battery every preview interval is multiplied by this (30 ms -> 15 fps)
+BATTERY_SCALE = 2.0
+# How often the power source is checked, seconds
+POWER_CHECK_SECONDS = 10.0
+
+
+def _windows_on_battery():
+    import ctypes
+
+    class SYSTEM_POWER_STATUS(ctypes.Structure):
+        _fields_ = [
+            ("ACLineStatus", ctypes.c_ubyte), ("BatteryFlag", ctypes.c_ubyte),
+            ("BatteryLifePercent", ctypes.c_ubyte), ("SystemStatusFlag", ctypes.c_ubyte),
+            ("BatteryLifeTime", ctypes.c_ulong), ("BatteryFullLifeTime", ctypes.c_ulong),
+        ]
+
+    status = SYSTEM_POWER_STATUS()
+    if not ctypes.windll.kernel32.GetSystemPowerStatus(ctypes.byref(status)):
+        return None
+    # 0 offline, 1 online, 255 unknown
+    return {0: True, 1: False}.get(status.ACLineStatus)
+
+
+def _linux_on_battery(root="/sys/class/power_supply"):
+    mains, battery = [], False
+    for name in os.listdir(root):
+        try:
+            with open(os.path.join(root, name, "type")) as f:
+                kind = f.read().strip()
+            if kind == "Battery":
+                battery = True
+            elif kind == "Mains":
+                with open(os.path.join(root, name, "online")) as f:
+                    mains.append(f.read().strip() == "1")
+        except OSError:
+            continue
+    if not battery or not mains:
+        # desktops have no battery; without a mains supply there is nothing to tell
+        return None
+    return not any(mains)
+
+
+def on_battery():
+    """True when running on battery, False on mains power, None where it can't be told."""
+    try:
+        import psutil
+        battery = psutil.sensors_battery()
+        return None if battery is None or battery.power_plugged is None else not battery.power_plugged
+    except (ImportError, AttributeError):
+        pass
+    try:
+        if sys.platform == "win32":
+            return _windows_on_battery()
+        return _linux_on_battery()
+    except (AttributeError, OSError):
+        return None
+
+
+class PreviewGovernor:
+    """
+    Picks a paint interval for every camera tile. Only the preview timers are
+    touched; capture threads and recorders keep running at full rate.
+
+    Per tile:
+      - main window minimized/hidden, or the tile scrolled out of view: paused
+      - covered by another camera's fullscreen view, or the window unfocused:
+        background rate
+      - otherwise (and the fullscreen camera itself): full rate
+    A fullscreen view's own timer follows the same rules: paused while its
+    window is minimized, background rate while another window has focus.
+    On top of that every interval is multiplied by a load scale that grows
+    while this process uses most of the CPU, the event loop runs late or tiles
+    take longer to paint than their interval allows, and shrinks back to 1
+    once there is headroom again; on battery (on_battery(), checked every
+    POWER_CHECK_SECONDS) it is multiplied by BATTERY_SCALE as well.
+    Use:
+        g = PreviewGovernor(main_window, background_fps=5)
+        g.start()
+        g.update()  # re-evaluate immediately, e.g. on a window state change
+    """
+
+    def __init__(self, window, background_fps=5, interval_ms=500):
+        self.window = window
+        self.background_ms = int(1000 / max(0.5, float(background_fps)))
+        self.interval_ms = interval_ms
+        self.enabled = True
+        self.scale = 1.0
+        self.load = 0.0
+        self.lag_ms = 0.0
+        self.paint_ms = 0.0
+        self.battery = None   # see on_battery()
+        self._power_checked = None
+        self._cpus = os.cpu_count() or 1
+        self._last_wall = None
+        self._last_cpu = None
+        self._timer = QTimer()
+        self._timer.timeout.connect(self._tick)
+
+    def start(self):
+        self._last_wall = time.monotonic()
+        self._last_cpu = time.process_time()
+        self._timer.start(self.interval_ms)
+
+    def stop(self):
+        self._timer.stop()
+
+    def _tick(self):
+        now = time.monotonic()
+        cpu = time.process_time()
+        wall = now - self._last_wall
+        if wall > 0:
+            self.load = (cpu - self._last_cpu) / wall / self._cpus
+            self.lag_ms = max(0.0, (wall * 1000.0) - self.interval_ms)
+        self._last_wall, self._last_cpu = now, cpu
+        if self._power_checked is None or now - self._power_checked >= POWER_CHECK_SECONDS:
+            self._power_checked = now
+            self.battery = on_battery()
+        self._adapt()
+        self.update()
+
+    def _adapt(self):
+        widgets = self.window.camera_widgets
+        self.paint_ms = max((cw.paint_ms for cw in widgets), default=0.0)
+        # all tiles together shouldn't need more than half of a tick to paint
+        busy_paint = self.paint_ms * len(widgets) > FOCUSED_MS * self.scale / 2
+        if self.load > HIGH_LOAD or self.lag_ms > LAG_MS or busy_paint:
+            self.scale = min(MAX_SCALE, self.scale * 1.5)
+        elif self.load < LOW_LOAD and self.lag_ms < LAG_MS / 2:
+            self.scale = max(1.0, self.scale / 1.25)
+
+    def target_interval(self, cw):
+        """Paint interval for a tile in ms; 0 means paused."""
+        if not self.enabled:
+            return FOCUSED_MS
+        win = self.window
+        if win.isMinimized() or not win.isVisible() or cw.video.visibleRegion().isEmpty():
+            return 0
+        fullscreen = [w for w in win.camera_widgets if w.in_fullscreen]
+        if fullscreen and cw not in fullscreen:
+            base = self.background_ms
+        elif not fullscreen and not win.isActiveWindow():
+            base = self.background_ms
+        else:
+            base = FOCUSED_MS
+        return self._scaled(base)
+
+    def fullscreen_interval(self, cw):
+        """Paint interval for a tile's fullscreen view in ms; 0 means paused."""
+        if not self.enabled:
+            return FOCUSED_MS
+        full = cw.full_win
+        if full is None or full.isMinimized() or not full.isVisible():
+            return 0
+        return self._scaled(FOCUSED_MS if full.isActiveWindow() else self.background_ms)
+
+    def _scaled(self, base):
+        return int(base * self.scale * (BATTERY_SCALE if self.battery else 1.0))
+
+    def update(self):
+        for cw in self.window.camera_widgets:
+            cw.set_preview_interval(self.target_interval(cw))
+            if cw.in_fullscreen:
+                cw.set_fullscreen_interval(self.fullscreen_interval(cw))
+
+    def stats(self):
+        return {
+            "scale": round(self.scale, 2),
+            "load": round(self.load, 2),
+            "lag_ms": round(self.lag_ms, 1),
+            "paint_ms": round(self.paint_ms, 2),
+            "battery": self.battery,
+            "intervals": {cw.cam_index: cw.preview_interval for cw in self.window.camera_widgets},
+        }
@@ -1,101 +1,790 @@
 # recorder.py
 import os
 import cv2
+from collections import deque
 from datetime import datetime, timedelta
+import queue
 import threading
+import time
+
+from chunk_index import with_keyframes, write_index
+from encoder_process import EncoderProcess
+from overlay import TextOverlay
+
+# What write_frame does when the encoder queue is full
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# How the file frame rate is matched to wall-clock time:
+#   "pace"    - write at a fixed target fps, duplicating/dropping frames by capture timestamp
+#   "measure" - measure the real capture rate at chunk start and write every frame at that rate
+FPS_MODES = ("pace", "measure")
+
+# Recording codecs: name -> (fourcc, container extension)
+#   mp4v - MPEG-4 Part 2 in MP4, works everywhere, CPU-hungry and large
+#   mjpg - Motion JPEG in AVI, very cheap to encode, largest files
+#   h264 - H.264 in MP4 through the FFmpeg backend, smallest files where available
+#   xvid - MPEG-4 Part 2 in AVI
+CODECS = {
+    "mp4v": ("mp4v", ".mp4"),
+    "mjpg": ("MJPG", ".avi"),
+    "h264": ("avc1", ".mp4"),
+    "xvid": ("XVID", ".avi"),
+}
+# Tried in order when the requested codec's VideoWriter fails to open
+CODEC_FALLBACKS = ("mp4v", "mjpg")
+
+# Where cv2.VideoWriter runs:
+#   "thread"  - on the recorder's writer thread, in this process
+#   "process" - in a dedicated encoder process fed through shared memory (encoder_process.py)
+ENCODER_BACKENDS = ("thread", "process")
+
+# Chunk rollover: the next chunk's writer is opened this many seconds of capture
+# time before the boundary, and the finished file is finalized in the background
+PREOPEN_SECONDS = 3.0
+# How long a boundary waits for a pre-open that is still running before opening inline
+PREOPEN_WAIT = 0.5
+# How long the preroll handoff waits for the ring to catch up with frames it turned away, seconds
+PREROLL_TAIL_WAIT = 0.5
+
+
+def open_video_writer(path, codec, fps, size):
+    """Open a cv2.VideoWriter for a CODECS entry; returns None if the backend refuses it."""
+    fourcc, ext = CODECS[codec]
+    path = os.path.splitext(path)[0] + ext
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        writer.release()
+        return None, path
+    return writer, path
+
 
 class CameraRecorder:
     """
-    Per-camera recorder that writes frames passed to it, chunking into MP4 files.
+    Per-camera recorder that writes frames passed to it, chunking into video files
+    (MP4 by default; see CODECS). If the requested codec can't be opened on this
+    machine the recorder falls back through CODEC_FALLBACKS.
+    Frames are queued and encoded on a dedicated writer thread, so write_frame
+    never waits on cv2.VideoWriter (unless backpressure='block').
+    Every frame carries its monotonic capture timestamp; chunk length and the
+    file frame rate are derived from those timestamps (see FPS_MODES), so a
+    chunk plays back as long as it took to record.
+    With preroll (a prebuffer.JpegRingBuffer), the buffered seconds before
+    start() are written first (only the last preroll_seconds of it, if set);
+    live frames take over once the writer has caught up with the ring.
+    With loop=True the session never ends (max_minutes is ignored); pair it with
+    a storage.StorageManager, which is told about every finished chunk and
+    deletes the oldest ones when a quota is hit.
+    Frames are recorded exactly as captured; burn_timestamp=True stamps the
+    capture wall-clock time into the file (on a scratch copy, not the shared frame).
+    With encoder="process" the VideoWriter lives in its own process (see
+    encoder_process.py); pacing, chunking and fallback work the same way.
+    With frames (the camera's frame_bus.FrameBus) the recorder holds every
+    frame it keeps (queued, measuring, repeated for pace-mode gaps) until it
+    is done with it, so the capture pool doesn't refill the buffer meanwhile.
+    Chunk rollover doesn't stall the writer thread: the next file is opened
+    PREOPEN_SECONDS ahead and the finished one is released, indexed and handed
+    to storage on a background thread. chunk_offset shortens the first chunk
+    so cameras started together don't all roll over at the same moment; each
+    rollover's stall and capture gap are in the chunk reports and stats().
     Use:
         r = CameraRecorder(save_dir, cam_index, chunk_minutes, max_minutes)
-        r.start()  # initializes bookkeeping
-        r.write_frame(frame)  # called from UI thread whenever new frame arrives
-        r.stop()  # stops and flushes current writer
+        r.start()  # initializes bookkeeping and starts the writer thread
+        r.write_frame(frame, ts)  # called from the capture thread for every new frame
+        r.stop()  # drains the queue, stops and flushes current writer
     """
 
-    def __init__(self, save_dir, cam_index, chunk_minutes=5, max_minutes=60, fourcc_str='mp4v', fps=20.0):
+    def __init__(self, save_dir, cam_index, chunk_minutes=5, max_minutes=60, codec="mp4v", fps=20.0,
+                 queue_size=60, backpressure="drop_oldest", fps_mode="pace", measure_seconds=1.0,
+                 preroll=None, loop=False, storage=None, burn_timestamp=False, encoder="thread",
+                 preroll_seconds=None, metrics=None, chunk_offset=0, frames=None):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {backpressure}")
+        if fps_mode not in FPS_MODES:
+            raise ValueError(f"Unknown fps mode: {fps_mode}")
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        if encoder not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown encoder backend: {encoder}")
         self.save_dir = save_dir
         self.cam_index = cam_index
         self.chunk_minutes = max(1, int(chunk_minutes))
+        # seconds cut from the first chunk (at most half a chunk) to stagger rollovers across cameras
+        self.chunk_offset = min(max(0.0, float(chunk_offset)), self.chunk_minutes * 30.0)
+        self._chunk_seconds = self.chunk_minutes * 60.0  # length of the current chunk
         self.max_minutes = int(max_minutes)
-        self.fourcc_str = fourcc_str
-        self.fps = fps
+        self.codec = codec            # requested codec (see CODECS)
+        self.active_codec = codec     # codec actually in use after any fallback
+        self.fps = fps  # target fps for "pace", fallback for "measure"
+        self.fps_mode = fps_mode
+        self.measure_seconds = max(0.2, float(measure_seconds))
+        self.queue_size = max(1, int(queue_size))
+        self.backpressure = backpressure
+        self.preroll = preroll
+        self.preroll_seconds = preroll_seconds
+        self._preroll_from = None  # oldest ring timestamp to write, fixed at start()
+        self.loop = loop
+        self.storage = storage
+        self.burn_timestamp = burn_timestamp
+        self._stamp = TextOverlay() if burn_timestamp else None
+        self._stamp_buf = None
+        self._wall_offset = 0.0  # time.time() - time.monotonic(), fixed at start()
+        self.encoder = encoder
+        self._encoder_proc = None
+        self.metrics = metrics  # metrics.CameraMetrics: time spent in VideoWriter.write
+        self.frames = frames    # FrameBus the frames are leased from, or None
 
         self.writer = None
+        self._writer_shape = None
         self.chunk_start_time = None
         self.session_start_time = None
         self.minutes_recorded = 0
         self.lock = threading.Lock()
+
+        # per-chunk timing, all in capture timestamps (time.monotonic())
+        self.chunk_start_ts = None
+        self.chunk_last_ts = None
+        self.chunk_fps = None          # rate the current file is written at
+        self.chunk_frames_in = 0       # frames received for this chunk
+        self.chunk_frames_out = 0      # frames written to the file (incl. duplicates)
+        self.chunk_duplicated = 0
+        self.chunk_paced_drops = 0
+        self._last_frame = None
+        self._measure_buf = []         # "measure" mode: frames held until the rate is known
+        self.chunk_reports = []        # one dict per finished chunk, see _finish_chunk_report
+
+        # rollover: pre-opened next writer, background finalizing, gap measurement
+        self._next = None              # see _preopen_next
+        self._jobs = queue.Queue()     # callables for the background thread
+        self._jobs_thread = None
+        self._bytes_lock = threading.Lock()
+        self._rollover = None          # {"stall_ms", "last_ts", "preopened"} until the new chunk's first frame
+        self._chunk_rollover = None    # how the current chunk started, see _note_rollover
+        self.last_rollover = None
+        self.max_rollover_ms = 0.0
+
+        # encoder queue, guarded by its own condition so producers never wait on the encoder lock
+        self._queue = deque()
+        self._queue_cond = threading.Condition()
+        self._accepting = False
+        self._thread = None
+        # while the preroll is being written, live frames are covered by the ring
+        self._in_preroll = False
+        self._live_after_ts = None
+        self._turned_away_ts = None  # newest live frame write_frame left to the ring
+
+        # counters (read with stats())
+        self.frames_queued = 0
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.max_queue_depth = 0
+        self.preroll_frames = 0
+        self.bytes_written = 0         # size of finished chunks
+        self.error = None              # why recording stopped on its own (no codec opened, encoder died)
+        self._rotate_requested = False
         os.makedirs(self.save_dir, exist_ok=True)
 
-    def _new_filename(self):
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return os.path.join(self.save_dir, f"cam{self.cam_index}_{ts}.mp4")
+    @classmethod
+    def from_settings(cls, save_dir, cam_index, settings, chunk_minutes=None, max_minutes=None, **kwargs):
+        """Recorder configured from the app settings (record_* keys); keyword arguments override them."""
+        codec = (settings.get("record_codecs") or {}).get(str(cam_index)) or settings.get("record_codec", "mp4v")
+        opts = {
+            "codec": codec if codec in CODECS else "mp4v",
+            "queue_size": settings.get("record_queue_size", 60),
+            "backpressure": settings.get("record_backpressure", "drop_oldest"),
+            "fps": float(settings.get("record_target_fps", 20.0)),
+            "fps_mode": settings.get("record_fps_mode", "pace"),
+            "loop": bool(settings.get("loop_recording", False)),
+            "burn_timestamp": bool(settings.get("record_burn_timestamp", False)),
+            "encoder": settings.get("record_encoder", "thread"),
+        }
+        if isinstance(cam_index, int):
+            # cameras started together roll over a few seconds apart
+            opts["chunk_offset"] = (cam_index % 8) * float(settings.get("record_rollover_stagger", 2.0))
+        opts.update(kwargs)
+        return cls(
+            save_dir, cam_index,
+            chunk_minutes=settings.get("record_chunk_minutes", 5) if chunk_minutes is None else chunk_minutes,
+            max_minutes=settings.get("max_record_minutes", 60) if max_minutes is None else max_minutes,
+            **opts,
+        )
+
+    def _new_filename(self, when=None):
+        ts = (when or datetime.now()).strftime("%Y%m%d_%H%M%S")
+        ext = CODECS[self.active_codec][1]
+        base = os.path.join(self.save_dir, f"cam{self.cam_index}_{ts}")
+        path, n = base + ext, 1
+        # two chunks in the same second (rotate, size change) must not overwrite each other
+        while os.path.exists(path):
+            path = f"{base}_{n}{ext}"
+            n += 1
+        return path
+
+    def _hold(self, frame):
+        if self.frames is not None:
+            self.frames.hold(frame)
+
+    def _release(self, frame):
+        if self.frames is not None:
+            self.frames.release(frame)
+
+    def _clear_measure_buf(self):
+        for frame, _ in self._measure_buf:
+            self._release(frame)
+        self._measure_buf = []
+
+    def _clear_queue(self):
+        # with _queue_cond held
+        for frame, _ in self._queue:
+            self._release(frame)
+        self._queue.clear()
 
     def start(self):
         with self.lock:
+            self.error = None
+            self._wall_offset = time.time() - time.monotonic()
             self.session_start_time = datetime.now()
             self.minutes_recorded = 0
             self._start_new_chunk_if_needed(new_session=True)
+        with self._queue_cond:
+            self._accepting = True
+            self._in_preroll = self.preroll is not None
+            self._turned_away_ts = None
+            if self.preroll_seconds is not None:
+                self._preroll_from = time.monotonic() - float(self.preroll_seconds)
+            self._live_after_ts = None
+        if self.encoder == "process" and self._encoder_proc is None:
+            self._encoder_proc = EncoderProcess(f"cam{self.cam_index}")
+            self._encoder_proc.start()
+        if self._jobs_thread is None:
+            self._jobs_thread = threading.Thread(
+                target=self._jobs_loop, name=f"recorder-cam{self.cam_index}-rollover", daemon=True
+            )
+            self._jobs_thread.start()
+        self._thread = threading.Thread(
+            target=self._writer_loop, name=f"recorder-cam{self.cam_index}", daemon=True
+        )
+        self._thread.start()
 
     def _start_new_chunk_if_needed(self, new_session=False):
-        # closes old writer if exists and opens a new one
-        if self.writer:
-            try:
-                self.writer.release()
-            except Exception:
-                pass
-            self.writer = None
+        # hands the old writer to the background thread and switches to the pre-opened one, if any
+        rollover = self.writer is not None and not new_session
+        t0 = time.perf_counter()
+        last_ts = self.chunk_last_ts
+        self._release_writer()
+        self._finish_chunk_report()
 
         self.chunk_start_time = datetime.now()
+        self.chunk_start_ts = None
+        self.chunk_last_ts = None
+        self.chunk_frames_in = 0
+        self.chunk_frames_out = 0
+        self.chunk_duplicated = 0
+        self.chunk_paced_drops = 0
+        self._chunk_rollover = None
+        self._clear_measure_buf()
+        if new_session:
+            self.chunk_fps = None
+        self._chunk_seconds = self.chunk_minutes * 60.0 - (self.chunk_offset if new_session else 0.0)
+        nxt = self._take_next()
+        # only the switch itself: release hand-off and taking the pre-opened writer
+        # (without one, _open_writer adds the inline open when the next frame comes)
+        self._rollover = {
+            "stall_ms": (time.perf_counter() - t0) * 1000.0, "last_ts": last_ts, "preopened": nxt is not None,
+        } if rollover else None
+        if nxt is not None:
+            self.writer = nxt["writer"]
+            self.current_filename = nxt["path"]
+            self._writer_shape = nxt["shape"]
+            self.chunk_fps = nxt["fps"]
+            return
         filename = self._new_filename()
         # writer will be created when first frame arrives (since width/height required)
         self.current_filename = filename
         self.writer = None  # remain None until frame with shape arrives
 
-    def write_frame(self, frame):
+    def write_frame(self, frame, ts=None):
         """
-        frame: numpy BGR frame
+        frame: numpy BGR frame (not modified or copied; the caller must not reuse it)
+        ts: monotonic capture timestamp, defaults to now
+        Returns False if the frame was rejected or dropped.
         """
         if self._session_exceeded():
             # ignore further frames
             return False
+        if ts is None:
+            ts = time.monotonic()
+
+        with self._queue_cond:
+            if not self._accepting:
+                # stopped (or never started); a late frame must not reopen a file
+                return False
+            if self._in_preroll:
+                # the preroll ring holds this moment; _drain_preroll reads it from there
+                self._turned_away_ts = ts
+                return True
+            if self._live_after_ts is not None and ts <= self._live_after_ts:
+                # the preroll ring already holds this moment
+                return True
+            if len(self._queue) >= self.queue_size:
+                if self.backpressure == "drop_newest":
+                    self.frames_dropped += 1
+                    return False
+                if self.backpressure == "drop_oldest":
+                    self._release(self._queue.popleft()[0])
+                    self.frames_dropped += 1
+                else:
+                    # block: wait for the writer thread to make room
+                    while self._accepting and len(self._queue) >= self.queue_size:
+                        self._queue_cond.wait(0.1)
+                    if not self._accepting:
+                        return False
+            self._hold(frame)
+            self._queue.append((frame, ts))
+            self.frames_queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._queue_cond.notify_all()
+        return True
+
+    def _drain_preroll(self):
+        """Write the ring's frames, following it until only live frames are left."""
+        last_ts = self._preroll_from
+        while True:
+            with self._queue_cond:
+                if not self._accepting:
+                    break
+            entries = self.preroll.read_after(last_ts)
+            for data, ts in entries:
+                frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                if frame is not None:
+                    self._encode(frame, ts)
+                last_ts = ts
+            if len(entries) <= 1:
+                # caught up with the ring
+                break
+        with self._queue_cond:
+            self._in_preroll = False
+            self._live_after_ts = last_ts
+            turned_away = self._turned_away_ts
+        # frames write_frame turned away after the last read are only in the ring (which
+        # may lag the bus a little): write them too, so the handoff leaves no gap
+        deadline = time.monotonic() + PREROLL_TAIL_WAIT
+        while turned_away is not None and last_ts < turned_away and time.monotonic() < deadline:
+            entries = self.preroll.read_after(last_ts)
+            for data, ts in entries:
+                if ts > turned_away:
+                    # newer ones came through the live queue
+                    break
+                frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                if frame is not None:
+                    self._encode(frame, ts)
+                last_ts = ts
+            if any(ts > turned_away for _, ts in entries):
+                break
+            time.sleep(0.01)
+        self.preroll_frames = self.chunk_frames_in
+
+    def _writer_loop(self):
+        if self.preroll is not None:
+            self._drain_preroll()
+        while True:
+            with self._queue_cond:
+                while not self._queue and self._accepting:
+                    self._queue_cond.wait(0.5)
+                if not self._queue:
+                    # stopped and drained
+                    return
+                frame, ts = self._queue.popleft()
+                # wake a producer blocked on a full queue
+                self._queue_cond.notify_all()
+            self._encode(frame, ts)
+            # the queue's hold; _encode holds the frame again if it keeps it
+            self._release(frame)
+
+    def _create_writer(self, path, codec, fps, size):
+        if self._encoder_proc is not None:
+            fourcc, ext = CODECS[codec]
+            path = os.path.splitext(path)[0] + ext
+            return self._encoder_proc.open_writer(path, fourcc, fps, size), path
+        return open_video_writer(path, codec, fps, size)
 
+    def _fail(self, error):
+        """Stop recording on the writer thread: keep what was written, refuse further frames."""
+        print(f"cam{self.cam_index}: recording stopped:", error)
+        self.error = error
+        self._discard_next()
+        self._release_writer()
+        self._clear_measure_buf()
+        with self._queue_cond:
+            self._accepting = False
+            self._clear_queue()
+            self._queue_cond.notify_all()
+
+    def _open_writer(self, frame, fps):
+        """Open the current chunk's writer; False (and the recorder stopped) if no codec opens."""
+        t0 = time.perf_counter()
         h, w = frame.shape[:2]
-        with self.lock:
-            if self.writer is None:
-                fourcc = cv2.VideoWriter_fourcc(*self.fourcc_str)
-                self.writer = cv2.VideoWriter(self.current_filename, fourcc, self.fps, (w, h))
+        tried = []
+        for codec in (self.active_codec,) + CODEC_FALLBACKS:
+            if codec in tried:
+                continue
+            tried.append(codec)
+            writer, path = self._create_writer(self.current_filename, codec, fps, (w, h))
+            if writer is not None:
+                break
+        if writer is None:
+            dead = self._encoder_proc is not None and not self._encoder_proc.is_alive()
+            self._fail("encoder process exited" if dead else f"no video codec could be opened (tried {', '.join(tried)})")
+            return False
+        if codec != self.active_codec:
+            print(f"cam{self.cam_index}: codec {self.active_codec} unavailable, recording with {codec}")
+            self.active_codec = codec
+        self.writer = writer
+        self.current_filename = path
+        self._writer_shape = (h, w)
+        self.chunk_fps = fps
+        if self._rollover is not None:
+            # no pre-opened writer at the boundary: this open held up the encoder too
+            self._rollover["stall_ms"] += (time.perf_counter() - t0) * 1000.0
+        return True
+
+    def _burn(self, frame, ts):
+        """Copy frame into the reused scratch buffer and stamp its capture time on it."""
+        if self._stamp_buf is None or self._stamp_buf.shape != frame.shape:
+            self._stamp_buf = frame.copy()
+        else:
+            self._stamp_buf[...] = frame
+        wall = datetime.fromtimestamp(ts + self._wall_offset)
+        self._stamp.set_text(wall.strftime("%Y-%m-%d %H:%M:%S"))
+        self._stamp.draw(self._stamp_buf, 8, frame.shape[0] - 10)
+        return self._stamp_buf
 
-            # write and check chunk time
+    def _write(self, frame, ts):
+        if self.writer is None:
+            return
+        if not self.writer.isOpened():
+            # only a process writer closes under us: its encoder process died
+            self._fail("encoder process exited")
+            return
+        if self._stamp is not None:
+            frame = self._burn(frame, ts)
+        if self.metrics is not None:
+            t0 = time.perf_counter()
             self.writer.write(frame)
+            self.metrics.encode_ms.add((time.perf_counter() - t0) * 1000.0)
+        else:
+            self.writer.write(frame)
+        self.chunk_frames_out += 1
+        self.frames_written += 1
+
+    def _write_paced(self, frame, ts):
+        # number of frames the file should hold once this frame is shown
+        due = int((ts - self.chunk_start_ts) * self.chunk_fps) + 1
+        if self.chunk_frames_out >= due:
+            # arrived faster than the file rate
+            self.chunk_paced_drops += 1
+            return
+        # capture fell behind: hold the previous frame on screen for the gap
+        while self.chunk_frames_out < due - 1 and self._last_frame is not None and self.error is None:
+            self._write(self._last_frame, self.chunk_start_ts + self.chunk_frames_out / self.chunk_fps)
+            self.chunk_duplicated += 1
+        self._write(frame, ts)
+        self._hold(frame)
+        self._release(self._last_frame)
+        self._last_frame = frame
+
+    def _encode(self, frame, ts):
+        with self.lock:
+            if self.session_start_time is None or self.error is not None:
+                return
+            if self.writer is not None and frame.shape[:2] != self._writer_shape:
+                # camera switched resolution (new capture profile): a file can't change size
+                self._discard_next()
+                self._start_new_chunk_if_needed()
+            elif self._rotate_requested and self.writer is not None:
+                self._start_new_chunk_if_needed()
+            self._rotate_requested = False
+            if self.chunk_start_ts is None:
+                self.chunk_start_ts = ts
+            self.chunk_last_ts = ts
+            self.chunk_frames_in += 1
+
+            if self.writer is None:
+                if self.fps_mode == "pace":
+                    if not self._open_writer(frame, self.fps):
+                        return
+                elif self.chunk_fps is not None:
+                    # later chunks reuse the rate the previous chunk actually achieved
+                    if not self._open_writer(frame, self.chunk_fps):
+                        return
+                else:
+                    self._hold(frame)
+                    self._measure_buf.append((frame, ts))
+                    span = ts - self.chunk_start_ts
+                    if span < self.measure_seconds:
+                        return
+                    fps = (len(self._measure_buf) - 1) / span if span > 0 else self.fps
+                    if not self._open_writer(frame, min(120.0, max(1.0, fps))):
+                        return
+                    for buffered, buffered_ts in self._measure_buf:
+                        self._write(buffered, buffered_ts)
+                    self._clear_measure_buf()
+                    frame = None
+            if frame is not None:
+                if self.fps_mode == "pace":
+                    self._write_paced(frame, ts)
+                else:
+                    self._write(frame, ts)
+            if self.error is not None:
+                return
+            if self._rollover is not None and self.chunk_frames_out:
+                self._note_rollover()
 
-            elapsed = (datetime.now() - self.chunk_start_time).total_seconds()
-            if elapsed >= self.chunk_minutes * 60:
+            # chunk length follows capture time, not encoder time
+            elapsed = ts - self.chunk_start_ts
+            if elapsed >= self._chunk_seconds - PREOPEN_SECONDS and self._next is None:
+                self._preopen_next()
+            if elapsed >= self._chunk_seconds:
                 # increment recorded minutes approx
                 self.minutes_recorded += self.chunk_minutes
                 if not self._session_exceeded():
                     self._start_new_chunk_if_needed()
                 else:
-                    # stop recording altogether
-                    self.stop()
-        return True
+                    # session over: finish the file and refuse further frames
+                    self._discard_next()
+                    self._release_writer()
+                    with self._queue_cond:
+                        self._accepting = False
+                        self._clear_queue()
+                        self._queue_cond.notify_all()
+
+    def _finish_chunk_report(self):
+        """Record achieved vs target rate for the chunk that is being closed."""
+        if self.chunk_start_ts is None or self.chunk_frames_out == 0:
+            return
+        wall = self.chunk_last_ts - self.chunk_start_ts
+        achieved = (self.chunk_frames_in - 1) / wall if wall > 0 else 0.0
+        file_fps = self.chunk_fps or self.fps
+        report = {
+            "file": self.current_filename,
+            "fps_mode": self.fps_mode,
+            "target_fps": round(file_fps, 3),
+            "achieved_fps": round(achieved, 3),
+            "wall_seconds": round(wall, 3),
+            "playback_seconds": round(self.chunk_frames_out / file_fps, 3),
+            "frames_in": self.chunk_frames_in,
+            "frames_out": self.chunk_frames_out,
+            "duplicated": self.chunk_duplicated,
+            "paced_drops": self.chunk_paced_drops,
+            "rollover": self._chunk_rollover,
+        }
+        if self.fps_mode == "measure":
+            # next chunk starts at the rate this one actually ran at
+            if achieved > 0:
+                self.chunk_fps = min(120.0, max(1.0, achieved))
+        self.chunk_reports.append(report)
+        self.chunk_start_ts = None
 
     def _session_exceeded(self):
-        if self.session_start_time is None:
+        if self.session_start_time is None or self.loop:
             return False
         elapsed_mins = (datetime.now() - self.session_start_time).total_seconds() / 60.0
         return elapsed_mins >= self.max_minutes
 
+    def _release_writer(self, background=True):
+        """Close the current file; releasing, indexing and storage bookkeeping run on the rollover thread."""
+        if self.writer:
+            writer, path, index = self.writer, self.current_filename, self._index_info()
+            self.writer = None
+            if background and self._jobs_thread is not None:
+                self._jobs.put(lambda: self._finalize(writer, path, index))
+            else:
+                self._finalize(writer, path, index)
+
+    def _finalize(self, writer, path, index):
+        try:
+            writer.release()
+        except Exception:
+            pass
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        with self._bytes_lock:
+            self.bytes_written += size
+        if index is not None and size:
+            # keyframe positions come from the finished file (packet flags only, no decoding)
+            write_index(path, with_keyframes(path, index))
+        if self.storage is not None:
+            self.storage.add_chunk(path, self.cam_index)
+
+    def _jobs_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                job()
+            except Exception as e:
+                print(f"cam{self.cam_index}: chunk rollover failed:", e)
+
+    def _preopen_next(self):
+        """Start opening the next chunk's file on the rollover thread, named for the expected boundary."""
+        if self.writer is None or not self.writer.isOpened():
+            return
+        fps = self.chunk_fps or self.fps
+        if self.fps_mode == "measure":
+            # the next chunk is written at the rate this one is achieving
+            span = self.chunk_last_ts - self.chunk_start_ts
+            if span > 0 and self.chunk_frames_in > 1:
+                fps = min(120.0, max(1.0, (self.chunk_frames_in - 1) / span))
+        boundary = datetime.fromtimestamp(self.chunk_start_ts + self._chunk_seconds + self._wall_offset)
+        nxt = {
+            "path": self._new_filename(boundary), "codec": self.active_codec, "fps": fps,
+            "shape": self._writer_shape, "writer": None, "ready": threading.Event(), "abandoned": False,
+        }
+        self._next = nxt
+
+        def open_next():
+            h, w = nxt["shape"]
+            nxt["writer"], nxt["path"] = self._create_writer(nxt["path"], nxt["codec"], nxt["fps"], (w, h))
+            nxt["ready"].set()
+            if nxt["abandoned"]:
+                self._close_unused(nxt)
+        self._jobs.put(open_next)
+
+    def _take_next(self):
+        """The pre-opened writer for the chunk starting now, or None (the first frame opens one inline)."""
+        nxt, self._next = self._next, None
+        if nxt is None:
+            return None
+        if not nxt["ready"].wait(PREOPEN_WAIT):
+            nxt["abandoned"] = True
+            if nxt["ready"].is_set():
+                self._close_unused(nxt)
+            return None
+        if nxt["writer"] is None:
+            return None
+        return nxt
+
+    def _discard_next(self):
+        nxt, self._next = self._next, None
+        if nxt is not None:
+            nxt["abandoned"] = True
+            if nxt["ready"].is_set():
+                self._close_unused(nxt)
+
+    def _close_unused(self, nxt):
+        """Release a pre-opened writer that never got a frame and delete its empty file."""
+        writer = nxt.pop("writer", None)
+        if writer is None:
+            return
+        try:
+            writer.release()
+            os.remove(nxt["path"])
+        except Exception:
+            pass
+
+    def _note_rollover(self):
+        """
+        First frame of a new chunk is written: record the rollover.
+        stall_ms is how long the switch held up the encoder (not the wait for the
+        next capture); gap_ms is the capture time between the old chunk's last
+        frame and the new chunk's first, normally one frame interval.
+        """
+        rollover, self._rollover = self._rollover, None
+        stall_ms, last_ts = rollover["stall_ms"], rollover["last_ts"]
+        gap_ms = (self.chunk_start_ts - last_ts) * 1000.0 if last_ts is not None else None
+        self.last_rollover = self._chunk_rollover = {
+            "stall_ms": round(stall_ms, 3),
+            "gap_ms": round(gap_ms, 2) if gap_ms is not None else None,
+            "preopened": rollover["preopened"],
+        }
+        self.max_rollover_ms = max(self.max_rollover_ms, stall_ms)
+        if self.metrics is not None:
+            self.metrics.rollover_ms.add(stall_ms)
+
+    def _index_info(self):
+        """Sidecar with the chunk's time span, for playback (chunk_index.py); keyframes are added in _finalize."""
+        if self.chunk_start_ts is None or self.chunk_frames_out == 0 or self._writer_shape is None:
+            return None
+        fps = self.chunk_fps or self.fps
+        h, w = self._writer_shape
+        return {
+            "camera": str(self.cam_index),
+            "codec": self.active_codec,
+            "fps": round(fps, 3),
+            "frames": self.chunk_frames_out,
+            "size": [w, h],
+            "start_ts": round(self.chunk_start_ts, 3),
+            "end_ts": round(self.chunk_last_ts, 3),
+            "start_wall": round(self.chunk_start_ts + self._wall_offset, 3),
+            "end_wall": round(self.chunk_last_ts + self._wall_offset, 3),
+        }
+
+    def rotate(self):
+        """Close the current chunk at the next frame and carry on in a new file."""
+        self._rotate_requested = True
+
+    def queue_depth(self):
+        with self._queue_cond:
+            return len(self._queue)
+
+    def stats(self):
+        # the open chunk counts as far as the encoder has flushed it
+        current = 0
+        if self.writer is not None:
+            try:
+                current = os.path.getsize(self.current_filename)
+            except OSError:
+                pass
+        with self._queue_cond:
+            return {
+                "codec": self.active_codec,
+                "queue_depth": len(self._queue),
+                "queue_size": self.queue_size,
+                "max_queue_depth": self.max_queue_depth,
+                "frames_queued": self.frames_queued,
+                "frames_written": self.frames_written,
+                "frames_dropped": self.frames_dropped,
+                "preroll_frames": self.preroll_frames,
+                "bytes_written": self.bytes_written + current,
+                "last_chunk": self.chunk_reports[-1] if self.chunk_reports else None,
+                "last_rollover": self.last_rollover,
+                "max_rollover_ms": round(self.max_rollover_ms, 2),
+                "error": self.error,
+                "encoder": self._encoder_proc.stats() if self._encoder_proc is not None else self.encoder,
+            }
+
     def stop(self):
+        # stop accepting, let the writer thread drain what is already queued
+        with self._queue_cond:
+            self._accepting = False
+            self._queue_cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
         with self.lock:
-            if self.writer:
-                try:
-                    self.writer.release()
-                except Exception:
-                    pass
-                self.writer = None
+            if self.writer is None and self._measure_buf:
+                # stopped before the rate was measured: write what we have
+                span = (self.chunk_last_ts or 0) - (self.chunk_start_ts or 0)
+                fps = (len(self._measure_buf) - 1) / span if span > 0 else self.fps
+                if self._open_writer(self._measure_buf[0][0], min(120.0, max(1.0, fps))):
+                    for buffered, buffered_ts in self._measure_buf:
+                        self._write(buffered, buffered_ts)
+                self._clear_measure_buf()
+            self._discard_next()
+            self._release_writer()
+            self._finish_chunk_report()
+            # wait for background finalizing, so every file is complete when stop() returns
+            if self._jobs_thread is not None:
+                self._jobs.put(None)
+                self._jobs_thread.join()
+                self._jobs_thread = None
+            if self._encoder_proc is not None:
+                self._encoder_proc.stop()
+                self._encoder_proc = None
+            self._release(self._last_frame)
+            self._last_frame = None
             self.session_start_time = None
             self.minutes_recorded = 0
             self.chunk_start_time = None
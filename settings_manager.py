@@ -1,15 +1,59 @@
 # settings_manager.py
+import atexit
+import copy
 import json
 import os
+import sys
+import threading
+import time
 
 SETTINGS_FILE = "settings.json"
+APP_DIR = "SoloSight"
 
 DEFAULT_SETTINGS = {
     "camera_labels": [],             # if empty, labels will be auto-filled "Cam 0", etc
+    "camera_labels_map": {},         # camera_index -> label set with the tile's edit icon
     "enabled_cameras": {},           # map of camera_index->bool (all disabled by default)
     "save_path": "recordings",
     "record_chunk_minutes": 5,
     "max_record_minutes": 60,
+    "record_codec": "mp4v",          # see recorder.CODECS: mp4v, mjpg, h264, xvid
+    "record_codecs": {},             # camera_index -> codec override
+    "mosaic_recording": False,       # one grid video of all cameras instead of one file each
+    "mosaic_cell_size": [640, 480],  # size of each camera's cell in the mosaic
+    "record_queue_size": 60,         # frames buffered per camera ahead of the encoder
+    "record_backpressure": "drop_oldest",  # "block", "drop_oldest" or "drop_newest"
+    "record_fps_mode": "pace",       # "pace" (fixed target fps) or "measure" (measured capture rate)
+    "record_target_fps": 20.0,
+    "record_burn_timestamp": False,  # stamp capture time into recordings (previews never are)
+    "record_encoder": "thread",      # "thread" or "process": run the video encoder in its own process
+    "record_rollover_stagger": 2.0,  # seconds between cameras' chunk boundaries (cam N rolls over N*x sooner)
+    "transcode_enabled": False,      # re-encode finished chunks to transcode_codec in the background
+    "transcode_codec": "h264",       # see recorder.CODECS
+    "transcode_workers": 1,          # encoder processes for compaction (run at low priority)
+    "transcode_cpu_limit": 70,       # % system CPU while recording above which compaction pauses
+    "prebuffer_seconds": 30,         # pre-event buffer written in front of each recording (0 = off)
+    "prebuffer_memory_mb": 64,       # fixed JPEG ring size per camera
+    "record_trigger": "continuous",  # "continuous" or "motion" (per-camera files, not the mosaic)
+    "motion_sensitivity": 0.5,       # 0..1, higher triggers on smaller/fainter changes
+    "motion_sensitivities": {},      # camera_index -> sensitivity override
+    "motion_pre_roll": 5,            # seconds kept before the motion (needs the pre-event buffer)
+    "motion_post_roll": 5,           # seconds recorded after the last motion
+    "motion_fps": 5,                 # detector samples per second
+    "loop_recording": False,         # keep rolling chunks forever, deleting the oldest
+    "storage_quota_gb": 0,           # max size of save_path (0 = no limit)
+    "camera_quota_gb": 0,            # max size per camera (0 = no limit)
+    "min_free_gb": 2,                # free disk space to keep
+    "default_capture_profile": {"fourcc": "MJPG", "width": 640, "height": 480, "fps": 30, "buffer_size": 1},
+    "capture_profiles": {},          # camera_index -> overrides of default_capture_profile
+    "preview_governor": True,        # throttle previews of hidden/covered tiles, pause when minimized
+    "preview_background_fps": 5,     # preview rate of tiles that are covered or unfocused
+    "show_stats_overlay": False,     # per-tile fps / latency / encoder panel instead of the short debug line
+    "metrics_export": "jsonl",       # "off", "jsonl", "prom" or "both"; written to save_path while recording
+    "metrics_interval": 10,          # seconds between metrics exports
+    "frame_sources": {},             # camera_index -> "synthetic:640x480@30" or "file:clip.mp4@20" (see frame_sources.py)
+    "frame_pool_size": 16,           # reusable capture buffers per camera (0 = allocate every frame)
+    "known_cameras": [],             # last discovered cameras; lets startup skip probing
     "window_geometry": None,
     "show_welcome_dialog": True
 }
@@ -20,7 +64,7 @@ def _ensure_structure(data: dict) -> dict:
     Ensure the loaded settings have all expected keys and sensible defaults.
     In particular, enabled_cameras should be a dictionary (index->bool).
     """
-    out = dict(DEFAULT_SETTINGS)  # start with defaults
+    out = copy.deepcopy(DEFAULT_SETTINGS)  # start with defaults (nested dicts not shared)
     if not isinstance(data, dict):
         return out
 
@@ -47,35 +91,200 @@ def _ensure_structure(data: dict) -> dict:
     if not isinstance(out.get("camera_labels"), list):
         out["camera_labels"] = []
 
+    # capture profiles are dicts (see capture_profiles.py)
+    if not isinstance(out.get("default_capture_profile"), dict):
+        out["default_capture_profile"] = dict(DEFAULT_SETTINGS["default_capture_profile"])
+    if not isinstance(out.get("capture_profiles"), dict):
+        out["capture_profiles"] = {}
+    if not isinstance(out.get("camera_labels_map"), dict):
+        out["camera_labels_map"] = {}
+    if not isinstance(out.get("record_codecs"), dict):
+        out["record_codecs"] = {}
+    if not isinstance(out.get("motion_sensitivities"), dict):
+        out["motion_sensitivities"] = {}
+    if not isinstance(out.get("frame_sources"), dict):
+        out["frame_sources"] = {}
+
+    # known_cameras must be a list of {"index": int, "name": str}
+    known = out.get("known_cameras")
+    if not isinstance(known, list):
+        known = []
+    out["known_cameras"] = [
+        {"index": int(c["index"]), "name": str(c.get("name") or f"Cam {c['index']}")}
+        for c in known if isinstance(c, dict) and isinstance(c.get("index"), int)
+    ]
+
     return out
 
 
+def settings_path() -> str:
+    """
+    Where settings live: a per-user config folder, so the file doesn't depend
+    on the working directory. SOLOSIGHT_SETTINGS overrides it.
+        Windows: %APPDATA%/SoloSight/settings.json
+        macOS:   ~/Library/Application Support/SoloSight/settings.json
+        others:  $XDG_CONFIG_HOME (or ~/.config)/solosight/settings.json
+    """
+    override = os.environ.get("SOLOSIGHT_SETTINGS")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.path.join(os.environ.get("APPDATA") or os.path.expanduser("~"), APP_DIR)
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~/Library/Application Support"), APP_DIR)
+    else:
+        base = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), APP_DIR.lower())
+    return os.path.join(base, SETTINGS_FILE)
+
+
+def _legacy_paths():
+    """settings.json where older versions kept it: the working directory, or next to the app."""
+    app_dir = os.path.dirname(sys.executable if getattr(sys, "frozen", False) else os.path.abspath(__file__))
+    return [os.path.abspath(SETTINGS_FILE), os.path.join(app_dir, SETTINGS_FILE)]
+
+
+def _dump(value) -> str:
+    return json.dumps(value, sort_keys=True)
+
+
+class SettingsStore(dict):
+    """
+    The settings dict, kept in memory and written back in the background.
+    save() is cheap to call often: it compares every key with what's on disk
+    and, if any changed, (re)starts a debounce timer. A background thread
+    writes the file once changes have stopped for `debounce` seconds, to a
+    temp file that replaces the old one, so a crash never leaves half a file.
+    flush() writes pending changes right away (also run at exit).
+    Use:
+        settings = load_settings()   # the shared store; only the first call reads the disk
+        settings["save_path"] = path
+        save_settings(settings)      # or settings.save()
+    """
+
+    def __init__(self, path, data=None, debounce=1.0):
+        super().__init__(data or {})
+        self.path = path
+        self.debounce = debounce
+        self._written = {}        # key -> JSON of the value on disk
+        self._pending = None      # (file text, key -> JSON) waiting to be written
+        self._due = 0.0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self.writes = 0
+
+    @classmethod
+    def open(cls, path, debounce=1.0):
+        """Store for path; falls back to an older settings.json (migrated on the next save), then defaults."""
+        candidates = [path] if os.path.exists(path) else [p for p in _legacy_paths() if os.path.exists(p)]
+        data, source = None, None
+        for candidate in candidates:
+            try:
+                with open(candidate, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                source = candidate
+                break
+            except (OSError, ValueError) as e:
+                # keep the broken file for inspection instead of overwriting it with defaults
+                print(f"Settings file {candidate} is unreadable ({e}); using defaults")
+                try:
+                    os.replace(candidate, candidate + ".bad")
+                except OSError:
+                    pass
+        store = cls(path, _ensure_structure(data), debounce=debounce)
+        if source == path:
+            store._written = {k: _dump(v) for k, v in store.items()}
+        return store
+
+    def dirty_keys(self, data=None):
+        """Keys whose value differs from the file (nested edits included)."""
+        data = self if data is None else data
+        keys = set(data) | set(self._written)
+        return sorted(k for k in keys if k not in data or self._written.get(k) != _dump(data[k]))
+
+    def save(self):
+        """Schedule a write of the current values if anything changed. Returns the changed keys."""
+        data = _ensure_structure(self)
+        dirty = self.dirty_keys(data)
+        if not dirty:
+            return dirty
+        # serialized here, on the caller's thread, so the writer never reads a dict being edited
+        pending = (json.dumps(data, indent=2, sort_keys=False), {k: _dump(v) for k, v in data.items()})
+        with self._cond:
+            self._pending = pending
+            self._due = time.monotonic() + self.debounce
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="settings-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return dirty
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None or time.monotonic() < self._due:
+                    self._cond.wait(None if self._pending is None else self._due - time.monotonic())
+            self.flush()
+
+    def flush(self):
+        """Write pending changes now."""
+        # the write lock is taken before the pending text, so an older snapshot never lands after a newer one
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, None
+            if pending is None:
+                return
+            text, written = pending
+            tmp = self.path + ".tmp"
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except Exception as e:
+                # Keep this friendly for debugging; don't raise to avoid crashing UI.
+                print("Failed to save settings:", e)
+                return
+            self._written = written
+            self.writes += 1
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
 def load_settings() -> dict:
     """
-    Load settings from SETTINGS_FILE. If file missing or corrupted,
-    return a fresh copy of DEFAULT_SETTINGS (not the same object).
+    The app's settings (a SettingsStore). The file is read on the first call
+    only; later calls return the same in-memory store. If the file is missing
+    or corrupted, the store starts from DEFAULT_SETTINGS.
     """
-    if os.path.exists(SETTINGS_FILE):
-        try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            data = _ensure_structure(data)
-            return data
-        except Exception:
-            # If loading/parsing fails, fall back to defaults but don't overwrite file here
-            return dict(DEFAULT_SETTINGS)
-    # no file -> defaults
-    return dict(DEFAULT_SETTINGS)
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SettingsStore.open(settings_path())
+            atexit.register(_store.flush)
+            if _store.dirty_keys():
+                # defaults or a migrated legacy file: give the per-user path its own copy
+                _store.save()
+        return _store
 
 
 def save_settings(data: dict) -> None:
     """
-    Save settings to disk. Will attempt to ensure structure before saving.
+    Schedule a debounced, atomic write (see SettingsStore). A plain dict
+    replaces the shared store's contents.
     """
-    try:
-        safe = _ensure_structure(data)
-        with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(safe, f, indent=2, sort_keys=False)
-    except Exception as e:
-        # Keep this friendly for debugging; don't raise to avoid crashing UI.
-        print("Failed to save settings:", e)
+    store = data if isinstance(data, SettingsStore) else load_settings()
+    if store is not data:
+        store.clear()
+        store.update(data)
+    store.save()
+
+
+def flush_settings() -> None:
+    """Write pending settings changes now (e.g. before the window closes)."""
+    if _store is not None:
+        _store.flush()
@@ -0,0 +1,94 @@
+# startup_profile.py
+"""
+Startup timing: how long each launch phase takes, from the moment main.py
+starts to the first camera frame on screen.
+
+main.py imports this module first, so its import time is the zero point.
+Phases are marked as they happen (main.py, ui_main.py, camera_manager.py):
+    qt_imported, ui_imported, qapp, window_built,
+    window_shown (time-to-window: the first paint),
+    pipeline_imported (cv2, numpy and the capture/recording modules),
+    cameras_opened, first_frame (time-to-first-frame)
+With psutil installed, "process" adds the time before Python ran main.py
+(interpreter start, PyInstaller unpacking).
+
+Enable with --profile-startup or SOLOSIGHT_PROFILE_STARTUP=1. The report is
+printed and appended as one JSON line to startup_profile.jsonl in the
+settings folder, tagged with the version and frozen/dev, to compare builds.
+"""
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+T0 = time.perf_counter()
+ENABLED = "--profile-startup" in sys.argv or os.environ.get("SOLOSIGHT_PROFILE_STARTUP", "") not in ("", "0")
+
+_marks = {}       # phase -> seconds since T0, in the order marked
+_reported = False
+
+
+def _process_age():
+    """Seconds from process creation to T0, or None without psutil."""
+    try:
+        import psutil
+        return max(0.0, time.time() - (time.perf_counter() - T0) - psutil.Process().create_time())
+    except Exception:
+        return None
+
+
+_PROCESS = _process_age() if ENABLED else None
+
+
+def mark(phase):
+    """Record that phase finished now (only the first time)."""
+    if phase not in _marks:
+        _marks[phase] = time.perf_counter() - T0
+
+
+def finish(phase):
+    """Mark the last phase and report; cheap to call again (e.g. on every paint)."""
+    if phase in _marks:
+        return
+    mark(phase)
+    report(phase)
+
+
+def marks():
+    return dict(_marks)
+
+
+def report(reason=""):
+    """Print the phases and append them to the history file (once, and only when enabled)."""
+    global _reported
+    if not ENABLED or _reported:
+        return
+    _reported = True
+    lines = [f"Startup profile{' (' + reason + ')' if reason else ''}:"]
+    if _PROCESS is not None:
+        lines.append(f"  {'process':18s} {_PROCESS * 1000:8.0f} ms before main.py")
+    prev = 0.0
+    for phase, t in _marks.items():
+        lines.append(f"  {phase:18s} {t * 1000:8.0f} ms  (+{(t - prev) * 1000:.0f})")
+        prev = t
+    print("\n".join(lines))
+    sys.stdout.flush()
+
+    try:
+        import version
+        from settings_manager import settings_path
+        entry = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "version": version.VERSION,
+            "frozen": bool(getattr(sys, "frozen", False)),
+            "reason": reason,
+            "process_ms": round(_PROCESS * 1000, 1) if _PROCESS is not None else None,
+            "phases_ms": {phase: round(t * 1000, 1) for phase, t in _marks.items()},
+        }
+        path = os.path.join(os.path.dirname(settings_path()), "startup_profile.jsonl")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except Exception as e:
+        print("Failed to save startup profile:", e)
@@ -0,0 +1,197 @@
+# storage.py
+import glob
+import os
+import re
+import shutil
+import threading
+from collections import deque
+
+# Chunk names produced by CameraRecorder._new_filename: cam{index}_{YYYYmmdd_HHMMSS}[_n].{ext}
+CHUNK_RE = re.compile(r"^cam([^_]+)_(\d{8}_\d{6}(?:_\d+)?)\.(mp4|avi|mkv)$")
+# Files that belong to a chunk and go with it (chunk_index.py): {chunk}.idx.json, .thumbs/{chunk}_{frame}.jpg
+INDEX_SUFFIX = ".idx.json"
+THUMB_DIR = ".thumbs"
+
+GB = 1024 ** 3
+
+
+def remove_sidecars(video_path):
+    """Delete a chunk's index and cached thumbnails."""
+    folder, name = os.path.split(video_path)
+    paths = [video_path + INDEX_SUFFIX]
+    paths += glob.glob(os.path.join(folder, THUMB_DIR, glob.escape(name) + "_*.jpg"))
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class StorageManager:
+    """
+    Keeps save_path under a byte budget for loop (dashcam-style) recording.
+    The folder is scanned once on creation; after that recorders report each
+    finished chunk through add_chunk() and eviction works purely from the
+    in-memory index, never rescanning the directory.
+
+    Limits (0 disables a limit):
+        quota_bytes        - total bytes of all chunks in save_path
+        camera_quota_bytes - bytes per camera
+        min_free_bytes     - free space to keep on the drive
+    """
+
+    def __init__(self, save_dir, quota_bytes=0, camera_quota_bytes=0, min_free_bytes=0):
+        self.save_dir = save_dir
+        self.quota_bytes = int(quota_bytes)
+        self.camera_quota_bytes = int(camera_quota_bytes)
+        self.min_free_bytes = int(min_free_bytes)
+
+        self._lock = threading.Lock()
+        self._chunks = {}   # cam key -> deque of (name_ts, path, size), oldest first
+        self._cam_bytes = {}
+        self.total_bytes = 0
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        os.makedirs(self.save_dir, exist_ok=True)
+        self._scan()
+
+    @classmethod
+    def from_settings(cls, save_dir, settings):
+        """The manager for a recording session, or None when loop recording is off (nothing is ever deleted then)."""
+        if not settings.get("loop_recording", False):
+            return None
+        return cls(
+            save_dir,
+            quota_bytes=float(settings.get("storage_quota_gb", 0) or 0) * GB,
+            camera_quota_bytes=float(settings.get("camera_quota_gb", 0) or 0) * GB,
+            min_free_bytes=float(settings.get("min_free_gb", 0) or 0) * GB,
+        )
+
+    def _scan(self):
+        found = []
+        try:
+            with os.scandir(self.save_dir) as it:
+                for entry in it:
+                    m = CHUNK_RE.match(entry.name)
+                    if m and entry.is_file():
+                        found.append((m.group(2), m.group(1), entry.path, entry.stat().st_size))
+        except OSError as e:
+            print("Failed to scan recordings folder:", e)
+        # chunk names sort chronologically
+        for name_ts, cam, path, size in sorted(found):
+            self._add(cam, name_ts, path, size)
+
+    def _add(self, cam, name_ts, path, size):
+        self._chunks.setdefault(cam, deque()).append((name_ts, path, size))
+        self._cam_bytes[cam] = self._cam_bytes.get(cam, 0) + size
+        self.total_bytes += size
+
+    def add_chunk(self, path, cam_index):
+        """Register a finished chunk, then evict old chunks if a limit is exceeded."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        m = CHUNK_RE.match(os.path.basename(path))
+        name_ts = m.group(2) if m else ""
+        with self._lock:
+            self._add(str(cam_index), name_ts, path, size)
+        self.enforce()
+
+    def replace_chunk(self, old_path, new_path):
+        """
+        A chunk was rewritten in place or into a new container (transcode.py):
+        swap its path and size in the index. Not indexed (evicted meanwhile): added.
+        """
+        try:
+            size = os.path.getsize(new_path)
+        except OSError:
+            return
+        m = CHUNK_RE.match(os.path.basename(new_path))
+        if not m:
+            return
+        cam = m.group(1)
+        with self._lock:
+            q = self._chunks.get(cam) or ()
+            for i, (name_ts, path, old_size) in enumerate(q):
+                if path == old_path:
+                    q[i] = (name_ts, new_path, size)
+                    self._cam_bytes[cam] += size - old_size
+                    self.total_bytes += size - old_size
+                    return
+        self.add_chunk(new_path, cam)
+
+    def _free_bytes(self):
+        try:
+            return shutil.disk_usage(self.save_dir).free
+        except OSError:
+            return None
+
+    def _pop_oldest(self, cam=None):
+        """Remove the oldest chunk (of one camera, or overall) from the index."""
+        if cam is None:
+            heads = [(q[0][0], c) for c, q in self._chunks.items() if q]
+            if not heads:
+                return None
+            cam = min(heads)[1]
+        q = self._chunks.get(cam)
+        if not q:
+            return None
+        name_ts, path, size = q.popleft()
+        self._cam_bytes[cam] -= size
+        self.total_bytes -= size
+        return path, size
+
+    def _delete(self, path, size):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print("Failed to delete old recording:", e)
+            return
+        remove_sidecars(path)
+        self.evicted_files += 1
+        self.evicted_bytes += size
+
+    def enforce(self):
+        """Delete oldest chunks until every limit is satisfied. Returns files deleted."""
+        deleted = 0
+        with self._lock:
+            victims = []
+            if self.camera_quota_bytes > 0:
+                for cam in list(self._chunks):
+                    while self._cam_bytes.get(cam, 0) > self.camera_quota_bytes:
+                        victim = self._pop_oldest(cam)
+                        if victim is None:
+                            break
+                        victims.append(victim)
+            if self.quota_bytes > 0:
+                while self.total_bytes > self.quota_bytes:
+                    victim = self._pop_oldest()
+                    if victim is None:
+                        break
+                    victims.append(victim)
+            for path, size in victims:
+                self._delete(path, size)
+                deleted += 1
+            if self.min_free_bytes > 0:
+                free = self._free_bytes()
+                while free is not None and free < self.min_free_bytes:
+                    victim = self._pop_oldest()
+                    if victim is None:
+                        break
+                    self._delete(*victim)
+                    deleted += 1
+                    free += victim[1]
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunks": sum(len(q) for q in self._chunks.values()),
+                "total_bytes": self.total_bytes,
+                "camera_bytes": dict(self._cam_bytes),
+                "evicted_files": self.evicted_files,
+                "evicted_bytes": self.evicted_bytes,
+            }
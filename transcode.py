@@ -0,0 +1,374 @@
+# transcode.py
+"""
+Background compaction of finished chunks: live recording uses a cheap codec
+(mp4v/MJPG), and this re-encodes finished files in save_path to a smaller
+one (H.264 by default) once nothing needs the CPU more.
+
+- Jobs run on a small process pool at below-normal priority.
+- A compacted file is written next to the original and swapped in with
+  os.replace. The original is only removed once the new file is complete and
+  has every frame. If the new file isn't smaller, the original is kept.
+- Progress lives in the chunk sidecars (chunk_index.py): a compacted chunk's
+  index has a "compacted" entry. After a restart, start() queues whatever
+  wasn't done yet and deletes half-written temp files.
+- While live recording is running and system CPU is above cpu_limit, the
+  workers pause between frames. They resume once CPU falls back below it.
+  CPU comes from psutil if installed, else GetSystemTimes on Windows or the
+  load average elsewhere; where none works, compaction pauses for as long as
+  recording runs.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+import cv2
+
+from chunk_index import load_index, with_keyframes, write_index
+from recorder import CODECS
+from storage import CHUNK_RE, INDEX_SUFFIX, remove_sidecars
+
+TMP_SUFFIX = ".compacting"
+# Chunks without a sidecar (older recordings) count as finished once untouched this long, seconds
+LEGACY_AGE = 600
+# Finished chunks are looked for again this often while running, seconds
+RESCAN_SECONDS = 300
+# Pause hysteresis: resume once CPU is this many points below cpu_limit
+RESUME_MARGIN = 15.0
+
+# in pool workers: multiprocessing.Events shared with TranscodeQueue
+_RUN = None    # cleared while paused
+_ABORT = None  # set by stop()
+
+
+def _init_worker(run_event, abort_event):
+    """Pool worker setup: below-normal priority, one OpenCV thread, shared pause/abort flags."""
+    global _RUN, _ABORT
+    _RUN, _ABORT = run_event, abort_event
+    try:
+        if hasattr(os, "nice"):
+            os.nice(10)
+        else:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x4000)  # BELOW_NORMAL_PRIORITY_CLASS
+    except Exception:
+        pass
+    cv2.setNumThreads(1)
+
+
+def _transcode(src, dst, fourcc, fps):
+    """Re-encode src into dst (runs in a pool worker). Returns (frames written, error or None)."""
+    cap = cv2.VideoCapture(src)
+    if not cap.isOpened():
+        return 0, "can't open source"
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(dst, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        cap.release()
+        return 0, f"codec {fourcc} unavailable"
+    frames = 0
+    try:
+        while True:
+            if _RUN is not None and frames % 30 == 0:
+                _RUN.wait()
+                if _ABORT.is_set():
+                    return frames, "stopped"
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+            frames += 1
+    finally:
+        cap.release()
+        writer.release()
+    return frames, None
+
+
+_last_times = None  # (idle, total) from the previous GetSystemTimes call
+
+
+def _windows_cpu_percent():
+    """CPU use since the previous call from GetSystemTimes (no psutil needed), or None."""
+    global _last_times
+    import ctypes
+    from ctypes import wintypes
+    idle, kernel, user = wintypes.FILETIME(), wintypes.FILETIME(), wintypes.FILETIME()
+    if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+        return None
+    ticks = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+    # kernel time includes idle time
+    sample = (ticks(idle), ticks(kernel) + ticks(user))
+    prev, _last_times = _last_times, sample
+    if prev is None:
+        # first call: take a short baseline
+        time.sleep(0.2)
+        return _windows_cpu_percent()
+    idle_delta, total = sample[0] - prev[0], sample[1] - prev[1]
+    if total <= 0:
+        return None
+    return max(0.0, min(100.0, 100.0 * (1.0 - idle_delta / total)))
+
+
+def cpu_percent():
+    """System-wide CPU use in percent, or None where it can't be measured."""
+    try:
+        import psutil
+        return psutil.cpu_percent(interval=None)
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        try:
+            return _windows_cpu_percent()
+        except (AttributeError, OSError):
+            return None
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1) * 100.0
+    except (AttributeError, OSError):
+        return None
+
+
+class TranscodeQueue:
+    """
+    Use:
+        q = TranscodeQueue(save_path, codec="h264", workers=1, recording=lambda: window.is_recording,
+                           storage=lambda: window.storage)
+        q.start()  # resumes: queues every finished chunk that isn't compacted yet
+        q.scan()   # e.g. after a recording session, to pick up its chunks
+        q.stop()
+    """
+
+    def __init__(self, save_dir, codec="h264", workers=1, cpu_limit=70.0, recording=None, storage=None, interval=2.0):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.save_dir = save_dir
+        self.codec = codec
+        self.workers = max(1, int(workers))
+        self.cpu_limit = float(cpu_limit)
+        self.recording = recording
+        self.storage = storage    # returns the loop-mode StorageManager (or None), told about replaced chunks
+        self.interval = interval
+
+        self._pending = []        # chunk paths, oldest first
+        self._running = {}        # future -> (src, tmp, index)
+        self._known = set()       # paths queued or running
+        self._lock = threading.Lock()
+        self._run = None          # multiprocessing.Events shared with the workers
+        self._abort = None
+        self._pool = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._rescan = threading.Event()
+        self.paused = False
+        self.unavailable = None   # error, once the target codec turned out not to open here
+
+        # counters (read with stats())
+        self.done = 0
+        self.kept = 0
+        self.failed = 0
+        self.bytes_saved = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._cleanup_temp()
+        ctx = multiprocessing.get_context("spawn")
+        self._run = ctx.Event()
+        self._run.set()
+        self._abort = ctx.Event()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=ctx, initializer=_init_worker, initargs=(self._run, self._abort)
+        )
+        self._stop.clear()
+        self._rescan.set()
+        self._thread = threading.Thread(target=self._loop, name="transcode", daemon=True)
+        self._thread.start()
+
+    def scan(self):
+        """Queue finished chunks that aren't compacted yet (done on the queue's thread)."""
+        self._rescan.set()
+
+    def _cleanup_temp(self):
+        try:
+            names = os.listdir(self.save_dir)
+        except OSError:
+            return
+        for name in names:
+            if TMP_SUFFIX in name:
+                try:
+                    os.remove(os.path.join(self.save_dir, name))
+                except OSError:
+                    pass
+
+    def _candidates(self):
+        out = []
+        try:
+            entries = sorted(os.scandir(self.save_dir), key=lambda e: e.name)
+        except OSError as e:
+            print("Failed to scan recordings folder:", e)
+            return out
+        now = time.time()
+        for entry in entries:
+            if not CHUNK_RE.match(entry.name) or entry.path in self._known:
+                continue
+            if not os.path.exists(entry.path + INDEX_SUFFIX):
+                # no sidecar: still being written, or a recording from before indexes
+                try:
+                    if now - entry.stat().st_mtime < LEGACY_AGE:
+                        continue
+                except OSError:
+                    continue
+            info = load_index(entry.path)
+            if info is None or info.get("compacted") or info.get("codec") == self.codec:
+                continue
+            out.append(entry.path)
+        return out
+
+    def _update_pause(self):
+        """Pause the workers while live recording is short of CPU, or while recording if CPU can't be measured."""
+        recording = bool(self.recording()) if self.recording is not None else False
+        cpu = cpu_percent() if recording else None
+        if self.paused:
+            resume = not recording or (cpu is not None and cpu < self.cpu_limit - RESUME_MARGIN)
+            if resume:
+                self.paused = False
+                self._run.set()
+        elif recording and (cpu is None or cpu >= self.cpu_limit):
+            self.paused = True
+            self._run.clear()
+
+    def _loop(self):
+        next_scan = 0.0
+        while not self._stop.is_set():
+            if self._rescan.is_set() or time.monotonic() >= next_scan:
+                self._rescan.clear()
+                found = self._candidates()
+                with self._lock:
+                    self._pending.extend(found)
+                    self._known.update(found)
+                next_scan = time.monotonic() + RESCAN_SECONDS
+            try:
+                self._update_pause()
+                self._collect()
+                if not self.paused:
+                    self._submit()
+            except Exception as e:
+                print("Transcode queue error:", e)
+            self._stop.wait(self.interval)
+
+    def _submit(self):
+        if self.unavailable:
+            return
+        with self._lock:
+            while self._pending and len(self._running) < self.workers:
+                src = self._pending.pop(0)
+                info = load_index(src)
+                if info is None or not os.path.exists(src):
+                    self._known.discard(src)
+                    continue
+                fourcc, ext = CODECS[self.codec]
+                tmp = os.path.splitext(src)[0] + TMP_SUFFIX + ext
+                future = self._pool.submit(_transcode, src, tmp, fourcc, float(info.get("fps") or 20.0))
+                self._running[future] = (src, tmp, info)
+
+    def _collect(self):
+        with self._lock:
+            finished = [f for f in self._running if f.done()]
+            jobs = [(f, self._running.pop(f)) for f in finished]
+        for future, (src, tmp, info) in jobs:
+            try:
+                frames, error = future.result()
+            except Exception as e:
+                frames, error = 0, str(e)
+            self._finish(src, tmp, info, frames, error)
+            with self._lock:
+                self._known.discard(src)
+
+    def _finish(self, src, tmp, info, frames, error):
+        if error is None and info.get("frames") and frames < info["frames"]:
+            error = f"only {frames} of {info['frames']} frames"
+        if error is None and not os.path.exists(src):
+            error = "source deleted meanwhile"
+        if error is not None:
+            self._remove(tmp)
+            if error.startswith("codec"):
+                # same for every chunk; stop until the next start()
+                if not self.unavailable:
+                    print(f"Compacting disabled: {error}")
+                self.unavailable = error
+                return
+            self.failed += 1
+            print(f"Compacting {os.path.basename(src)} failed: {error}")
+            return
+        before, after = os.path.getsize(src), os.path.getsize(tmp)
+        info = dict(info)
+        info.pop("path", None)
+        info.pop("estimated", None)
+        if after >= before:
+            # the live codec did better on this footage; keep the original
+            self._remove(tmp)
+            info["compacted"] = {"codec": self.codec, "bytes_before": before, "bytes_after": before}
+            write_index(src, info)
+            self.kept += 1
+            return
+        dst = os.path.splitext(src)[0] + CODECS[self.codec][1]
+        try:
+            os.replace(tmp, dst)
+        except OSError as e:
+            self.failed += 1
+            print(f"Compacting {os.path.basename(src)} failed:", e)
+            self._remove(tmp)
+            return
+        info.update(codec=self.codec, compacted={"codec": self.codec, "bytes_before": before, "bytes_after": after})
+        write_index(dst, with_keyframes(dst, info))
+        if dst != src:
+            # new container: the new file and its index are in place, drop the original
+            self._remove(src)
+            remove_sidecars(src)
+        storage = self.storage() if self.storage is not None else None
+        if storage is not None:
+            # keep the quota's index on the real path and size
+            storage.replace_chunk(src, dst)
+        self.done += 1
+        self.bytes_saved += before - after
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "running": len(self._running),
+                "paused": self.paused,
+                "unavailable": self.unavailable,
+                "done": self.done,
+                "kept": self.kept,
+                "failed": self.failed,
+                "bytes_saved": self.bytes_saved,
+            }
+
+    def stop(self):
+        """Stop taking jobs; running ones are abandoned and redone after the next start()."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        # workers notice within a few frames, even when paused
+        self._abort.set()
+        self._run.set()
+        self._pool.shutdown(wait=True)
+        self._pool = None
+        with self._lock:
+            for src, tmp, _ in self._running.values():
+                self._remove(tmp)
+            self._running.clear()
+            self._pending.clear()
+            self._known.clear()
@@ -4,22 +4,31 @@ import traceback
 import webbrowser
 import version
 
-import cv2
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout,
     QApplication, QLineEdit, QDialog, QFileDialog, QFrame, QGroupBox,
-    QFormLayout, QCheckBox, QDialogButtonBox
+    QFormLayout, QCheckBox, QDialogButtonBox, QComboBox
 )
-from PyQt5.QtGui import QImage, QPixmap, QFont
-from PyQt5.QtCore import QTimer, Qt, QSize
+from PyQt5.QtGui import QFont
+from PyQt5.QtCore import QTimer, Qt, QSize, QEvent
 
+# Only what the window itself needs is imported here. cv2, numpy and the
+# capture/recording modules load in MainWindow.finish_startup, after the
+# window has painted once (see startup_profile.py for the timings).
 from icon_loader import icon
-from settings_manager import load_settings, save_settings
-from camera_manager import CameraWidget, find_available_cameras
+from settings_manager import flush_settings, load_settings, save_settings
+from storage import StorageManager
+import startup_profile
 import theme
 
+# finish_startup runs after the first paint; this is the fallback if the window never paints (e.g. starts minimized)
+STARTUP_FALLBACK_MS = 1000
+# the startup profile is reported at the first frame, or after this long without one
+STARTUP_REPORT_TIMEOUT_MS = 30000
+
 
 def overlay_text(frame, text, x=10, y=20):
+    import cv2
     cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX,
                 0.6, (255, 255, 255), 1, cv2.LINE_AA)
 
@@ -66,17 +75,14 @@ class MainWindow(QWidget):
         self.chunk_minutes = self.settings.get("record_chunk_minutes", theme.RECORD_CHUNK_MINUTES)
         self.max_minutes = self.settings.get("max_record_minutes", theme.RECORD_MAX_MINUTES)
         self.enabled_map = self.settings.get("enabled_cameras", {})  # { "index": bool }
+        self.storage = None  # StorageManager for the current recording session
+        self.mosaic = None   # MosaicRecorder when recording in mosaic mode
 
-        # Cache cameras once (so opening Settings is instant)
-        self.all_cameras = find_available_cameras(8)  # list of dicts: {"index": int, "name": str}
-
-        # If labels were previously saved as a list, map them onto current cameras (by order)
-        if self.camera_labels_list and not self.camera_labels_map:
-            for i, cam in enumerate(self.all_cameras):
-                if i < len(self.camera_labels_list):
-                    lbl = self.camera_labels_list[i]
-                    if lbl:
-                        self.camera_labels_map[str(cam["index"])] = lbl
+        # Start from the last known-good camera set so a normal launch skips probing.
+        # Discovery runs in the background (first launch, or Refresh).
+        self.all_cameras = self.with_simulated(self.settings.get("known_cameras", []))  # list of dicts: {"index": int, "name": str}
+        self.discovery = None
+        self.map_legacy_labels()
 
         main_layout = QVBoxLayout()
         header = QHBoxLayout()
@@ -84,7 +90,7 @@ class MainWindow(QWidget):
         title.setStyleSheet(f"font-size:16pt; font-weight:bold; color:{theme.ACCENT};")
         header.addWidget(title)
         header.addStretch()
-        self.status_label = QLabel("Ready")
+        self.status_label = QLabel("Starting...")
         header.addWidget(self.status_label)
         main_layout.addLayout(header)
 
@@ -111,6 +117,14 @@ class MainWindow(QWidget):
         self.btn_refresh.clicked.connect(self.refresh_cameras)
         ctrl.addWidget(self.btn_refresh)
 
+        self.btn_playback = QPushButton()
+        self.btn_playback.setIcon(icon("playback", theme.ICON_MEDIUM))
+        self.btn_playback.setIconSize(QSize(theme.ICON_MEDIUM, theme.ICON_MEDIUM))
+        self.btn_playback.setStyleSheet(theme.ICON_BUTTON_STYLE)
+        self.btn_playback.setToolTip("Playback Recordings")
+        self.btn_playback.clicked.connect(self.open_playback)
+        ctrl.addWidget(self.btn_playback)
+
         self.btn_settings = QPushButton()
         self.btn_settings.setIcon(icon("settings", theme.ICON_MEDIUM))
         self.btn_settings.setIconSize(QSize(theme.ICON_MEDIUM, theme.ICON_MEDIUM))
@@ -139,10 +153,134 @@ class MainWindow(QWidget):
         self.blink_timer = QTimer()
         self.blink_timer.timeout.connect(self.blink_record_indicator)
         self.blink_state = False
-
-        self.detect_and_build()
+        self.is_recording = False
+        # created in finish_startup
+        self.governor = None
+        self.metrics = None
+        self.metrics_exporter = None
+        self.transcoder = None
+        self.opener = None
+        self._opening = set()  # camera indices whose capture is being opened in the background
+        self._cameras_ready = False  # the startup opens are done
+        self._started = False
+        self._startup_scheduled = False
+        QTimer.singleShot(STARTUP_FALLBACK_MS, self.finish_startup)
+
+    # ---------- Startup ----------
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._startup_scheduled:
+            # the window is on screen: load the rest once this paint is done
+            self._startup_scheduled = True
+            startup_profile.mark("window_shown")
+            QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        """Everything the window doesn't need to appear: the capture pipeline, metrics, compaction and the cameras."""
+        if self._started:
+            return
+        self._started = True
+        from camera_manager import CameraDiscovery, CaptureOpener
+        from metrics import MetricsRegistry
+        from preview_governor import PreviewGovernor
+        startup_profile.mark("pipeline_imported")
+        if startup_profile.ENABLED:
+            QTimer.singleShot(STARTUP_REPORT_TIMEOUT_MS, lambda: startup_profile.report("no frame yet"))
+
+        self.discovery = CameraDiscovery(self)
+        self.discovery.camera_found.connect(self.on_camera_found)
+        self.discovery.finished.connect(self.on_discovery_finished)
+        self.governor = PreviewGovernor(self, background_fps=self.settings.get("preview_background_fps", 5))
+        self.governor.enabled = bool(self.settings.get("preview_governor", True))
+        # per-camera pipeline metrics, written periodically next to the recordings while recording
+        self.metrics = MetricsRegistry()
+        # finished chunks are re-encoded smaller in the background (off by default)
+        self.start_transcoding()
+        # previews slow down or pause when nobody can see them; capture and recording don't
+        self.governor.start()
+
+        # every camera is opened off the UI thread; tiles appear as they answer
+        self.opener = CaptureOpener(self)
+        self.opener.opened.connect(self.on_capture_opened)
+        wanted = self.wanted_cameras()
+        if not wanted:
+            self.on_cameras_opened()
+            return
+        self.status_label.setText("Opening cameras...")
+        self.open_cameras(wanted)
+
+    def open_cameras(self, indices):
+        """Open cameras in the background (CaptureOpener); on_capture_opened adds or revives their tiles."""
+        indices = [i for i in indices if i not in self._opening]
+        if indices:
+            self._opening.update(indices)
+            self.opener.open(self.settings, indices)
+
+    def on_capture_opened(self, cam_index, opened):
+        self._opening.discard(cam_index)
+        cw = next((cw for cw in self.camera_widgets if cw.cam_index == cam_index), None)
+        cam = next((c for c in self.all_cameras if c["index"] == cam_index), None)
+        if cam is None or not self.enabled_map.get(str(cam_index), False) or (cw is not None and cw.worker):
+            # disabled or removed meanwhile, or already running
+            if opened[0] is not None:
+                opened[0].release()
+        elif cw is not None:
+            # retry of a tile whose camera had failed
+            if cw.open(opened):
+                cw.debug.setText("")
+                if self.btn_record.isChecked():
+                    self.start_camera_recording(cw)
+            else:
+                cw.debug.setText("Failed to open")
+        else:
+            self.add_camera_widget(cam, opened)
+            self.camera_widgets.sort(key=lambda cw: cw.cam_index)
+            self.layout_grid()
+        if self.mosaic:
+            self.mosaic.set_sources(self.mosaic_sources())
+        if self._opening:
+            return
+        if not self._cameras_ready:
+            self.on_cameras_opened()
+        else:
+            self.show_camera_status()
+
+    def on_cameras_opened(self):
+        """The startup opens are done."""
+        self._cameras_ready = True
+        startup_profile.mark("cameras_opened")
+        if not any(cw.worker for cw in self.camera_widgets):
+            startup_profile.report("no camera open")
+        if self.mosaic:
+            self.mosaic.set_sources(self.mosaic_sources())
+        self.show_camera_status()
+        self.sync_labels_from_widgets()
+        # probe if there is no cache, or a cached camera didn't come back
+        if not self.all_cameras or any(cw.worker is None for cw in self.camera_widgets):
+            self.start_discovery()
 
     # ---------- Helpers ----------
+    def map_legacy_labels(self):
+        """If labels were previously saved as a list, map them onto current cameras (by order)."""
+        if self.camera_labels_list and not self.camera_labels_map:
+            for i, cam in enumerate(self.all_cameras):
+                if i < len(self.camera_labels_list):
+                    lbl = self.camera_labels_list[i]
+                    if lbl:
+                        self.camera_labels_map[str(cam["index"])] = lbl
+
+    def with_simulated(self, cameras):
+        """Discovered cameras plus the frame_sources stand-ins (which take over a real index)."""
+        sources = self.settings.get("frame_sources") or {}
+        out = [dict(c) for c in cameras if str(c["index"]) not in sources]
+        for key, spec in sources.items():
+            try:
+                out.append({"index": int(key), "name": f"Simulated {key} ({spec.split(':')[0]})"})
+            except ValueError:
+                pass
+        out.sort(key=lambda c: c["index"])
+        return out
+
     def get_label_for(self, cam_index: int) -> str:
         """Return the user label if set, otherwise a default."""
         key = str(cam_index)
@@ -172,70 +310,229 @@ class MainWindow(QWidget):
             save_settings(self.settings)
 
     # ---------- UI building ----------
-    def detect_and_build(self):
-        # Clear old widgets
-        for w in self.camera_widgets:
-            try:
-                w.close()
-                w.setParent(None)
-            except Exception:
-                pass
-        self.camera_widgets.clear()
-        while self.grid.count():
-            item = self.grid.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-
-        # Use cached list for building. Only refresh_cameras() rescans.
-        all_cameras = self.all_cameras
-        if not all_cameras:
-            self.status_label.setText("No cameras found")
-            return
-        self.status_label.setText(f"Found {len(all_cameras)} cameras")
-
-        display_count = 0
-        cols = 2
-        for cam in all_cameras:
-            cam_index = cam["index"]
-            enabled = self.enabled_map.get(str(cam_index), False)
-            if not enabled:
-                continue  # skip disabled cameras
+    def reconcile_cameras(self):
+        """
+        Bring the grid in line with the enabled cameras. Only cameras that were
+        added or removed are opened or closed; tiles that stay keep their live
+        capture, fullscreen view and any recording in progress.
+        """
+        wanted = self.wanted_cameras()
+
+        # Close tiles that are no longer wanted
+        for cw in list(self.camera_widgets):
+            if cw.cam_index not in wanted:
+                self.remove_camera_widget(cw)
+
+        # Retry tiles whose camera failed to open, and let kept tiles pick up settings changes
+        retry = []
+        for cw in self.camera_widgets:
+            if cw.worker is None:
+                if not cw.reopening:
+                    cw.debug.setText("Opening...")
+                    retry.append(cw.cam_index)
+            else:
+                cw.apply_settings()
+
+        # Open newly enabled cameras; like the retries this happens in the background
+        # and their tiles are added once the capture is open (on_capture_opened)
+        have = {cw.cam_index for cw in self.camera_widgets}
+        self.open_cameras(retry + [i for i in wanted if i not in have])
+
+        # Keep grid order following camera index
+        self.camera_widgets.sort(key=lambda cw: wanted.index(cw.cam_index))
+        self.layout_grid()
+        if self.mosaic:
+            self.mosaic.set_sources(self.mosaic_sources())
+
+        self.show_camera_status()
 
-            label_text = self.get_label_for(cam_index)
-            cw = CameraWidget(cam_index, label_text, self.settings, parent=self)
+        # Persist any label changes that might have been done via edit icon
+        self.sync_labels_from_widgets()
 
-            opened = cw.open()
-            if not opened:
-                cw.debug.setText("Failed to open")
-            self.camera_widgets.append(cw)
-            row = display_count // cols
-            col = display_count % cols
-            self.grid.addWidget(cw, row, col)
-            display_count += 1
+    def wanted_cameras(self):
+        """Indices of the enabled cameras, in grid order."""
+        return [
+            cam["index"] for cam in self.all_cameras
+            if self.enabled_map.get(str(cam["index"]), False)
+        ]
 
-        if display_count == 0:
+    def show_camera_status(self):
+        if not self.all_cameras:
+            self.status_label.setText("No cameras found")
+        elif not self.camera_widgets:
             self.status_label.setText("No cameras enabled. Go to Settings to enable.")
+        elif not self.btn_record.isChecked():
+            self.status_label.setText(f"Found {len(self.all_cameras)} cameras")
 
-        # Persist any label changes that might have been done via edit icon
-        self.sync_labels_from_widgets()
+    def layout_grid(self):
+        """Re-place existing tiles in grid order without touching their streams."""
+        cols = 2
+        for cw in self.camera_widgets:
+            self.grid.removeWidget(cw)
+        for display_count, cw in enumerate(self.camera_widgets):
+            self.grid.addWidget(cw, display_count // cols, display_count % cols)
+
+    def remove_camera_widget(self, cw):
+        try:
+            cw.close()
+            self.grid.removeWidget(cw)
+            cw.setParent(None)
+            cw.deleteLater()
+        except Exception:
+            pass
+        if cw in self.camera_widgets:
+            self.camera_widgets.remove(cw)
+        self.metrics.remove(cw.cam_index)
+
+    def add_camera_widget(self, cam, opened):
+        """Place a tile for an enabled camera in the next grid cell; opened is its CaptureOpener result."""
+        from camera_manager import CameraWidget
+        cam_index = cam["index"]
+        enabled = self.enabled_map.get(str(cam_index), False)
+        if not enabled:
+            return None  # skip disabled cameras
+        if any(cw.cam_index == cam_index for cw in self.camera_widgets):
+            return None
+
+        label_text = self.get_label_for(cam_index)
+        cw = CameraWidget(cam_index, label_text, self.settings, parent=self, metrics=self.metrics.camera(cam_index))
+
+        if not cw.open(opened):
+            cw.debug.setText("Failed to open")
+        elif self.btn_record.isChecked():
+            # cameras that show up mid-session join the recording
+            self.start_camera_recording(cw)
+        cols = 2
+        display_count = len(self.camera_widgets)
+        self.camera_widgets.append(cw)
+        row = display_count // cols
+        col = display_count % cols
+        self.grid.addWidget(cw, row, col)
+        return cw
+
+    def start_metrics_export(self):
+        """(Re)start the metrics file export with the current save path and settings; it only runs while recording."""
+        from metrics import MetricsExporter
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+        if not self.is_recording:
+            return
+        self.metrics_exporter = MetricsExporter(
+            self.metrics, self.save_path,
+            interval=self.settings.get("metrics_interval", 10),
+            fmt=self.settings.get("metrics_export", "jsonl"),
+        )
+        self.metrics_exporter.start()
+
+    def start_transcoding(self):
+        """(Re)start background compaction of finished chunks if it's enabled."""
+        if self.transcoder:
+            self.transcoder.stop()
+            self.transcoder = None
+        if not self.settings.get("transcode_enabled", False):
+            return
+        from transcode import TranscodeQueue
+        self.transcoder = TranscodeQueue(
+            self.save_path,
+            codec=self.settings.get("transcode_codec", "h264"),
+            workers=self.settings.get("transcode_workers", 1),
+            cpu_limit=self.settings.get("transcode_cpu_limit", 70),
+            recording=lambda: self.is_recording,
+            storage=lambda: self.storage,
+        )
+        self.transcoder.start()
+
+    # ---------- Camera discovery ----------
+    def start_discovery(self):
+        # before finish_startup, or while the startup opens are still running
+        if self.discovery is None or not self._cameras_ready or self.discovery.is_running():
+            return
+        self.status_label.setText("Searching for cameras...")
+        # cameras that are streaming or being opened right now can't be opened twice; count them as found
+        live = [cw.cam_index for cw in self.camera_widgets if cw.worker and cw.worker.is_running()]
+        self.discovery.start(8, timeout=3.0, skip=live + sorted(self._opening))
+
+    def on_camera_found(self, cam):
+        # fill tiles in as cameras answer instead of waiting for the slowest probe
+        if any(c["index"] == cam["index"] for c in self.all_cameras):
+            return
+        self.all_cameras.append(cam)
+        self.all_cameras.sort(key=lambda c: c["index"])
+        if self.enabled_map.get(str(cam["index"]), False):
+            self.open_cameras([cam["index"]])
+        self.status_label.setText(f"Found {len(self.all_cameras)} cameras")
+
+    def on_discovery_finished(self, cameras):
+        self.all_cameras = self.with_simulated(cameras)
+        self.map_legacy_labels()
+        self.settings["known_cameras"] = cameras
+        save_settings(self.settings)
+        self.reconcile_cameras()
 
     def on_record_toggle(self, checked):
+        self.is_recording = checked
         if checked:
             self.status_label.setText("Recording...")
             self.record_indicator.setVisible(True)
             self.blink_timer.start(500)
-            for cw in self.camera_widgets:
-                cw.start_recording(self.save_path, self.chunk_minutes, self.max_minutes)
+            # loop mode: one shared index so quotas apply across all cameras (None otherwise, nothing is deleted)
+            self.storage = StorageManager.from_settings(self.save_path, self.settings)
+            if self.storage:
+                self.storage.enforce()
+            if self.settings.get("mosaic_recording", False):
+                self.start_mosaic()
+            else:
+                for cw in self.camera_widgets:
+                    self.start_camera_recording(cw)
+            self.start_metrics_export()
         else:
             self.status_label.setText("Ready")
             self.record_indicator.setVisible(False)
             self.blink_timer.stop()
+            if self.mosaic:
+                self.mosaic.stop()
+                self.mosaic = None
+                self.metrics.remove("mosaic")
             for cw in self.camera_widgets:
                 cw.stop_recording()
+            self.start_metrics_export()  # stops it, with a last snapshot
+            if self.transcoder:
+                # pick up the session's chunks
+                self.transcoder.scan()
         # Save labels just in case user renamed while recording
         self.sync_labels_from_widgets()
 
+    def start_camera_recording(self, cw):
+        """Join a tile to the running session (its own recorder, or a cell of the mosaic)."""
+        if self.mosaic:
+            self.mosaic.set_sources(self.mosaic_sources())
+        else:
+            cw.start_recording(self.save_path, self.chunk_minutes, self.max_minutes, storage=self.storage)
+
+    def mosaic_sources(self):
+        return [(cw.cam_index, cw.label_text, cw.worker.bus) for cw in self.camera_widgets if cw.worker]
+
+    def start_mosaic(self):
+        """One grid video of all cameras on a shared clock instead of one file per camera."""
+        from mosaic import MosaicRecorder
+        from recorder import CameraRecorder
+        fps = float(self.settings.get("record_target_fps", 20.0))
+        recorder = CameraRecorder.from_settings(
+            self.save_path, "mosaic", self.settings, self.chunk_minutes, self.max_minutes,
+            fps=fps, fps_mode="pace",
+            # the mosaic clock already paces frames; a short queue keeps the canvas pool small
+            queue_size=8,
+            storage=self.storage,
+            metrics=self.metrics.camera("mosaic"),
+        )
+        recorder.start()
+        cell_w, cell_h = self.settings.get("mosaic_cell_size", [640, 480])
+        self.mosaic = MosaicRecorder(recorder, fps=fps, cell_size=(int(cell_w), int(cell_h)))
+        self.mosaic.set_sources(self.mosaic_sources())
+        self.mosaic.start()
+        self.metrics.camera("mosaic").collect = self.mosaic.stats
+
     def blink_record_indicator(self):
         self.blink_state = not self.blink_state
         self.record_indicator.setVisible(self.blink_state)
@@ -243,9 +540,8 @@ class MainWindow(QWidget):
     def refresh_cameras(self):
         # Before rescanning, capture any label changes from current widgets
         self.sync_labels_from_widgets()
-        # Rescan hardware and rebuild
-        self.all_cameras = find_available_cameras(8)
-        self.detect_and_build()
+        # Rescan hardware in the background; the grid is reconciled when it finishes
+        self.start_discovery()
 
     def open_settings(self):
         # Use cached list to avoid lag
@@ -257,11 +553,16 @@ class MainWindow(QWidget):
     def apply_settings(self, data: dict):
         # Persist any label edits made on widgets before applying other settings
         self.sync_labels_from_widgets()
+        before = self.service_settings()
 
         self.save_path = data.get("save_path", self.save_path)
         self.chunk_minutes = data.get("record_chunk_minutes", self.chunk_minutes)
         self.max_minutes = data.get("max_record_minutes", self.max_minutes)
         self.enabled_map = data.get("enabled_cameras", self.enabled_map)
+        for key in ("record_codec", "mosaic_recording", "loop_recording", "storage_quota_gb", "camera_quota_gb",
+                    "min_free_gb", "record_trigger", "motion_sensitivity", "transcode_enabled"):
+            if key in data:
+                self.settings[key] = data[key]
 
         # Save to settings
         self.settings["save_path"] = self.save_path
@@ -275,14 +576,52 @@ class MainWindow(QWidget):
         ]
         save_settings(self.settings)
 
-        self.detect_and_build()
+        # restart background services only when their settings changed: a restart drops queued compaction jobs
+        after = self.service_settings()
+        if after["metrics"] != before["metrics"]:
+            self.start_metrics_export()
+        if after["transcode"] != before["transcode"]:
+            self.start_transcoding()
+        self.reconcile_cameras()
+
+    def service_settings(self):
+        """The settings the metrics export and the transcode queue are started with."""
+        def with_prefix(prefix):
+            return {k: v for k, v in self.settings.items() if k.startswith(prefix)}
+        return {
+            "metrics": (self.save_path, with_prefix("metrics_")),
+            "transcode": (self.save_path, with_prefix("transcode_")),
+        }
+
+    def open_playback(self):
+        from playback import PlaybackDialog
+        dlg = PlaybackDialog(self.save_path, labels=self.camera_labels_map, parent=self)
+        dlg.exec_()
 
     def open_instructions(self):
         webbrowser.open("https://github.com/solosightapp/solosight/blob/main/instructions")
 
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        # resume/pause previews right away instead of on the governor's next tick
+        if event.type() in (QEvent.WindowStateChange, QEvent.ActivationChange) and getattr(self, "governor", None):
+            self.governor.update()
+
     def closeEvent(self, event):
+        if self.is_recording:
+            # the encoder threads are daemons: finish the open chunks before the process exits
+            self.on_record_toggle(False)
+        if self.governor:
+            self.governor.stop()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+        if self.transcoder:
+            self.transcoder.stop()
         # Make sure latest labels are saved on close
         self.sync_labels_from_widgets()
+        for cw in self.camera_widgets:
+            cw.close()
+        flush_settings()
         super().closeEvent(event)
 
 
@@ -321,6 +660,43 @@ class SettingsDialog(QDialog):
         self.edit_max = QLineEdit(str(parent.max_minutes))
         form.addRow("Max session minutes (<=60)", self.edit_max)
 
+        # Codec for all cameras (per-camera overrides live in settings.json "record_codecs")
+        from recorder import CODECS
+        self.combo_codec = QComboBox()
+        for name, (fourcc, ext) in CODECS.items():
+            self.combo_codec.addItem(f"{name} ({fourcc}{ext})", name)
+        current = parent.settings.get("record_codec", "mp4v")
+        self.combo_codec.setCurrentIndex(max(0, self.combo_codec.findData(current)))
+        form.addRow("Recording codec", self.combo_codec)
+
+        self.chk_mosaic = QCheckBox("Mosaic recording (all cameras in one file)")
+        self.chk_mosaic.setChecked(bool(parent.settings.get("mosaic_recording", False)))
+        form.addRow(self.chk_mosaic)
+
+        # Loop recording: roll chunks forever and delete the oldest when storage limits are hit
+        settings = parent.settings
+        self.chk_loop = QCheckBox("Loop recording (delete oldest chunks)")
+        self.chk_loop.setChecked(bool(settings.get("loop_recording", False)))
+        form.addRow(self.chk_loop)
+        self.edit_quota = QLineEdit(str(settings.get("storage_quota_gb", 0)))
+        form.addRow("Folder quota GB (0 = none)", self.edit_quota)
+        self.edit_cam_quota = QLineEdit(str(settings.get("camera_quota_gb", 0)))
+        form.addRow("Per-camera quota GB (0 = none)", self.edit_cam_quota)
+        self.edit_min_free = QLineEdit(str(settings.get("min_free_gb", 2)))
+        form.addRow("Keep free GB", self.edit_min_free)
+
+        # Motion trigger: record only while something moves (per-camera sensitivity in "motion_sensitivities")
+        self.chk_motion = QCheckBox("Motion-triggered recording")
+        self.chk_motion.setChecked(settings.get("record_trigger") == "motion")
+        form.addRow(self.chk_motion)
+        self.edit_sensitivity = QLineEdit(str(settings.get("motion_sensitivity", 0.5)))
+        form.addRow("Motion sensitivity (0-1)", self.edit_sensitivity)
+
+        # Compaction: re-encode finished chunks smaller while the CPU is free (codec in "transcode_codec")
+        self.chk_transcode = QCheckBox("Compact finished recordings in the background")
+        self.chk_transcode.setChecked(bool(settings.get("transcode_enabled", False)))
+        form.addRow(self.chk_transcode)
+
         layout.addLayout(form)
 
         # Detected cameras with enable/disable checkboxes (labels come from parent's label map)
@@ -369,11 +745,21 @@ class SettingsDialog(QDialog):
             chunk = max(1, int(self.edit_chunk.text()))
         except Exception:
             chunk = 5
+        loop = self.chk_loop.isChecked()
         try:
-            mx = min(60, int(self.edit_max.text()))
+            mx = int(self.edit_max.text())
+            # loop mode never stops on its own, so the 60 minute cap doesn't apply
+            if not loop:
+                mx = min(60, mx)
         except Exception:
             mx = 60
 
+        def gb(edit, default):
+            try:
+                return max(0.0, float(edit.text()))
+            except Exception:
+                return default
+
         # Collect checkbox states
         enabled_map = {}
         for cb in self.camera_checkboxes:
@@ -384,7 +770,16 @@ class SettingsDialog(QDialog):
             "save_path": self.edit_path.text().strip() or "recordings",
             "record_chunk_minutes": chunk,
             "max_record_minutes": mx,
-            "enabled_cameras": enabled_map
+            "enabled_cameras": enabled_map,
+            "record_codec": self.combo_codec.currentData(),
+            "mosaic_recording": self.chk_mosaic.isChecked(),
+            "loop_recording": loop,
+            "storage_quota_gb": gb(self.edit_quota, 0),
+            "camera_quota_gb": gb(self.edit_cam_quota, 0),
+            "min_free_gb": gb(self.edit_min_free, 2),
+            "record_trigger": "motion" if self.chk_motion.isChecked() else "continuous",
+            "motion_sensitivity": min(1.0, gb(self.edit_sensitivity, 0.5)),
+            "transcode_enabled": self.chk_transcode.isChecked(),
         }
 
 